@@ -1,25 +1,222 @@
+import atexit
+import gzip
+import itertools
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import threading
 from pathlib import Path
 
-# Create logs directory if it doesn't exist
-log_dir = Path(__file__).parent / "logs"
-log_dir.mkdir(exist_ok=True)
-
-# Configure root logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s.%(msecs)03d [%(levelname)s] [%(name)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(log_dir / "server.log", mode='a')
-    ]
-)
+# Logging is configured through environment variables so the same build can run
+# quietly in production and verbosely in development:
+#   LOG_LEVEL          root level (default INFO)
+#   LOG_FORMAT         "text" (default) or "json" for one JSON object per line
+#   LOG_DIR            directory for server.log (default server/logs)
+#   LOG_ROTATE_WHEN    time-based rotation interval (e.g. "midnight", "H"); if unset,
+#                      the file rotates by size instead
+#   LOG_MAX_BYTES      size threshold for rotation (default 10 MB)
+#   LOG_BACKUP_COUNT   rotated files to keep (default 7)
+#   LOG_COMPRESS       gzip rotated files in the background (default on)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+LOG_COMPRESS = os.getenv("LOG_COMPRESS", "1").lower() not in ("0", "false", "no")
+
+TEXT_FORMAT = "%(asctime)s.%(msecs)03d [%(levelname)s] [%(name)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+log_dir = Path(os.getenv("LOG_DIR", Path(__file__).parent / "logs"))
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, DATE_FORMAT) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers formatting to the listener thread.
+
+    The stock QueueHandler runs the full formatter (timestamps, tracebacks) on the
+    calling thread so the record can be pickled. Our queue never leaves the
+    process, so only the message arguments are merged here and everything else
+    happens off the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_rotation_ids = itertools.count()
+
+
+def _compress_in_background(source: str, dest: str) -> None:
+    """Rotator that moves the log aside and gzips it on a separate thread.
+
+    The destination is opened before returning, so if the handler shifts backups
+    again while compression is still running, the open file follows the rename.
+    """
+    pending = f"{dest}.{os.getpid()}.{next(_rotation_ids)}.pending"
+    os.replace(source, pending)
+    f_out = gzip.open(dest, "wb")
+
+    def compress():
+        try:
+            with open(pending, "rb") as f_in, f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.remove(pending)
+        except OSError as e:
+            sys.stderr.write(f"Failed to compress rotated log {pending}: {e}\n")
+
+    threading.Thread(target=compress, name="log-compress", daemon=True).start()
+
+
+class _LazyFileMixin:
+    """Open the log file (creating its directory) on the first record instead of at import.
+
+    Keeps startup free of filesystem work, and a process that never logs
+    to file - a test, a one-off script - never creates the directory.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _RotatingFileHandler(_LazyFileMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class _TimedRotatingFileHandler(_LazyFileMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+def _build_file_handler(path: Path) -> logging.Handler:
+    if LOG_ROTATE_WHEN:
+        handler = _TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+    else:
+        handler = _RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+    if LOG_COMPRESS:
+        handler.namer = lambda name: name + ".gz"
+        handler.rotator = _compress_in_background
+    return handler
+
+
+def _build_formatter() -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JSONFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+# Set by centralize_file_logging: the queue forked workers send file records through
+_forked_file_log = {"queue": None}
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """Attach a queue-backed pipeline to the root logger.
+
+    Callers only pay for enqueueing the record; stdout and file writes, rotation
+    and formatting all run on the listener thread.
+    """
+    formatter = _build_formatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_handler = _build_file_handler(log_dir / "server.log")
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, file_handler, respect_handler_level=True
+    )
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+
+    listener.start()
+    atexit.register(listener.stop)
+    # Threads don't survive fork: flush and stop the listener beforehand, then
+    # give the parent and each forked worker a listener thread of its own
+    if hasattr(os, "register_at_fork"):
+        fork_state = {"was_running": False}
+
+        def stop_before_fork():
+            fork_state["was_running"] = listener._thread is not None
+            if fork_state["was_running"]:
+                listener.stop()
+
+        def restart_after_fork():
+            if fork_state["was_running"]:
+                listener.start()
+
+        def restart_in_child():
+            if _forked_file_log["queue"] is not None:
+                # The parent owns server.log: a worker rotating its own handle would
+                # keep writing to (or compress away) a file another process renamed
+                listener.handlers = (stream_handler, logging.handlers.QueueHandler(_forked_file_log["queue"]))
+            restart_after_fork()
+
+        os.register_at_fork(before=stop_before_fork, after_in_parent=restart_after_fork,
+                            after_in_child=restart_in_child)
+    return listener
+
+
+def centralize_file_logging() -> logging.handlers.QueueListener:
+    """Make this process the only writer of server.log for the processes it forks.
+
+    Call once in a preforking master before the first fork. Workers then send
+    their file records over a pipe to a listener here, so one process does
+    every write, rotation and compression; stdout stays per process.
+    """
+    import multiprocessing
+
+    records = multiprocessing.get_context("fork").Queue()
+    file_handler = next(handler for handler in listener.handlers if isinstance(handler, logging.FileHandler))
+    file_listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    file_listener.start()
+    atexit.register(file_listener.stop)
+    _forked_file_log["queue"] = records
+    return file_listener
+
+
+def flush_logging():
+    """Write out everything still queued; for processes that leave through os._exit"""
+    listener.stop()
+    records = _forked_file_log["queue"]
+    if records is not None:
+        # Records sent to the parent sit in a feeder thread's buffer until it drains
+        records.close()
+        records.join_thread()
+
+
+listener = configure_logging()
 
 # Main application logger
 logger = logging.getLogger("va_server")
-logger.setLevel(logging.DEBUG)
+logger.setLevel(LOG_LEVEL)
 
 # Uvicorn access logger (to catch all HTTP requests/responses)
 uvicorn_access = logging.getLogger("uvicorn.access")
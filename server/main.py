@@ -1,24 +1,54 @@
-from fastapi import FastAPI, Request, Response
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-import uvicorn
 import sys
 import os
-import time
-import json
 import uuid
 import builtins
+import logging
 
 # Add the server directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from logging_config import logger
-
-# Route all print statements through the configured logger
-builtins.print = lambda *args, **kwargs: logger.info(" ".join(str(a) for a in args))
-
-from routers import td_mcp, github, deployment
+# Imported first so the clock starts before anything heavy loads; GET /debug/startup reports the phases
+from observability.startup import startup, FirstRequestMiddleware
+
+with startup.phase("fastapi"):
+    from fastapi import FastAPI, Request, Response
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.exceptions import RequestValidationError
+    from fastapi.responses import JSONResponse
+
+with startup.phase("logging"):
+    from logging_config import logger
+
+# Route all print statements through the configured logger. The level check
+# comes first so suppressed lines never pay for building the message. Prints
+# aimed at an explicit file (traceback, pdb) keep their original destination.
+_builtin_print = builtins.print
+
+def _print_to_logger(*args, **kwargs):
+    if kwargs.get("file") not in (None, sys.stdout):
+        _builtin_print(*args, **kwargs)
+    elif logger.isEnabledFor(logging.INFO):
+        logger.info(kwargs.get("sep", " ").join(str(a) for a in args))
+
+builtins.print = _print_to_logger
+
+# One phase per router; shared dependencies are charged to whichever imports them first
+with startup.phase("routers.td_mcp"):
+    from routers import td_mcp
+with startup.phase("routers.github"):
+    from routers import github
+with startup.phase("routers.deployment"):
+    from routers import deployment
+with startup.phase("routers.debug"):
+    from routers import debug
+
+with startup.phase("observability"):
+    from observability.request_logging import RequestLoggingMiddleware, parse_sample_rates
+    from observability.loop_monitor import loop_monitor
+    from observability import outbound
+
+    # Record latency, status and rate limits for every outbound HTTP call
+    outbound.install()
 
 app = FastAPI(
     title="TD Value Accelerator API",
@@ -34,68 +64,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log ALL HTTP requests with detailed timing and error capture"""
-    request_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
-
-    # Log ALL requests, not just /api/
-    client_host = request.client.host if request.client else "unknown"
-    logger.info(f"[{request_id}] {request.method} {request.url.path} from {client_host}")
-    
-    # Note: We can't safely read request body in middleware without consuming it
-    # The request body will be logged in the endpoint functions instead
-
-    # Process the request and capture any errors
-    try:
-        response = await call_next(request)
-    except Exception as e:
-        logger.error(f"[{request_id}] Unhandled exception during request processing: {e}")
-        logger.error(f"[{request_id}] Exception type: {type(e).__name__}")
-        import traceback
-        logger.error(f"[{request_id}] Traceback: {traceback.format_exc()}")
-        raise
-    
-    process_time = time.time() - start_time
-
-    # Log ALL responses with detailed status information
-    status_level = "ERROR" if response.status_code >= 400 else "INFO"
-    log_func = logger.error if response.status_code >= 400 else logger.info
-    
-    log_func(f"[{request_id}] {response.status_code} {request.method} {request.url.path} completed in {process_time:.3f}s")
-    
-    # For error responses, try to log the response body
-    if response.status_code >= 400:
-        try:
-            # This is tricky because response body can only be read once
-            response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += chunk
-            
-            # Try to decode and log error response
-            try:
-                error_content = json.loads(response_body.decode())
-                logger.error(f"[{request_id}] Error response: {error_content}")
-            except:
-                logger.error(f"[{request_id}] Error response (raw): {response_body.decode()[:500]}")
-            
-            # Recreate the response since we consumed the body
-            from fastapi.responses import Response
-            response = Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type
-            )
-        except Exception as e:
-            logger.error(f"[{request_id}] Could not log error response body: {e}")
-
-    return response
+# Request logging runs outermost so it also sees CORS preflights and errors.
+# REQUEST_LOG_SAMPLE_RATES="/api/github/copy-progress=0.05" thins out noisy routes.
+app.add_middleware(
+    RequestLoggingMiddleware,
+    sample_rates=parse_sample_rates(os.getenv("REQUEST_LOG_SAMPLE_RATES", "")),
+    default_sample_rate=float(os.getenv("REQUEST_LOG_DEFAULT_SAMPLE_RATE", "1.0")),
+    max_error_body=int(os.getenv("REQUEST_LOG_MAX_ERROR_BODY", "2048")),
+)
 
 app.include_router(td_mcp.router, prefix="/api/td", tags=["TD MCP"])
 app.include_router(github.router, prefix="/api/github", tags=["GitHub"])
 app.include_router(deployment.router, prefix="/api/deploy", tags=["Deployment"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
+
+# Outermost of all, so the first request is timed before any other middleware runs
+app.add_middleware(FirstRequestMiddleware, tracker=startup)
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if os.getenv("LOOP_MONITOR_ENABLED", "1").lower() not in ("0", "false", "no"):
+        loop_monitor.start(app)
+
+@app.on_event("startup")
+async def mark_ready():
+    startup.mark_ready()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -103,10 +100,10 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     request_id = str(uuid.uuid4())[:8]
     logger.error(f"[{request_id}] Validation error on {request.method} {request.url}")
 
-    try:
-        body = await request.body()
-        logger.error(f"[{request_id}] Request body: {body.decode()}")
-    except Exception:
+    # The body was already consumed during parsing; FastAPI attaches it to the error
+    if exc.body is not None:
+        logger.error(f"[{request_id}] Request body: {exc.body}")
+    else:
         logger.error(f"[{request_id}] Could not read request body")
 
     logger.error(f"[{request_id}] Errors: {exc.errors()}")
@@ -124,4 +121,6 @@ async def root():
     return {"message": "TD Value Accelerator API", "version": "1.0.0"}
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -7,7 +7,9 @@ import os
 import shutil
 import tempfile
 import subprocess
-import base64
+import asyncio
+from services import provisioning
+from services.github_http import GITHUB_API_URL, git_remote_url, github_session
 
 app = FastAPI(title="Minimal Deploy Server")
 
@@ -59,385 +61,192 @@ def get_packages():
         ]
     }
 
-def create_repository_rulesets(token: str, owner: str, repo: str):
-    """Create repository rulesets - both main branch protection and branch naming"""
-    url = f"https://api.github.com/repos/{owner}/{repo}/rulesets"
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28'
-    }
-    
-    results = []
-    
-    # Ruleset 1: Main branch protection
-    main_branch_ruleset = {
-        "name": "Main Branch Protection",
-        "target": "branch",
-        "enforcement": "active",
-        "conditions": {
-            "ref_name": {
-                "exclude": [],
-                "include": ["~DEFAULT_BRANCH"]
-            }
-        },
-        "rules": [
-            {"type": "deletion"},
-            {"type": "non_fast_forward"}
-        ],
-        "bypass_actors": []
-    }
-    
-    # Ruleset 2: Branch naming convention  
-    branch_naming_ruleset = {
-        "name": "Branch Naming Convention",
-        "target": "branch",
-        "enforcement": "active",
-        "conditions": {
-            "ref_name": {
-                "exclude": ["refs/heads/main", "refs/heads/master"],
-                "include": ["~ALL"]
-            }
-        },
-        "rules": [
-            {
-                "type": "branch_name_pattern",
-                "parameters": {
-                    "operator": "regex",
-                    "pattern": "^(feat|fix|hot|chore|docs)/[a-z0-9._-]+$",
-                    "negate": False,
-                    "name": "Branch naming convention: feat/fix/hot/chore/docs followed by description"
-                }
-            }
-        ],
-        "bypass_actors": []
-    }
-    
-    rulesets = [
-        ("Main Branch Protection", main_branch_ruleset),
-        ("Branch Naming Convention", branch_naming_ruleset)
-    ]
-    
-    for ruleset_name, ruleset_data in rulesets:
-        try:
-            response = requests.post(url, headers=headers, json=ruleset_data, timeout=15)
-            if response.ok:
-                print(f"✅ Created {ruleset_name} ruleset")
-                results.append({"name": ruleset_name, "status": "success"})
-            else:
-                print(f"⚠️ Failed to create {ruleset_name}: {response.status_code}")
-                # For branch naming, try a simpler fallback
-                if ruleset_name == "Branch Naming Convention" and response.status_code == 422:
-                    print(f"ℹ️ Trying simpler branch protection without naming pattern...")
-                    simple_ruleset = {
-                        "name": "Basic Branch Protection",
-                        "target": "branch", 
-                        "enforcement": "active",
-                        "conditions": {
-                            "ref_name": {
-                                "exclude": ["refs/heads/main", "refs/heads/master"],
-                                "include": ["~ALL"]
-                            }
-                        },
-                        "rules": [{"type": "non_fast_forward"}],
-                        "bypass_actors": []
-                    }
-                    
-                    fallback_response = requests.post(url, headers=headers, json=simple_ruleset, timeout=15)
-                    if fallback_response.ok:
-                        print(f"✅ Created Basic Branch Protection (fallback)")
-                        results.append({"name": "Basic Branch Protection", "status": "success"})
-                    else:
-                        results.append({"name": ruleset_name, "status": "warning"})
-                else:
-                    results.append({"name": ruleset_name, "status": "warning"})
-        except Exception as e:
-            print(f"⚠️ Error creating {ruleset_name}: {e}")
-            results.append({"name": ruleset_name, "status": "error"})
-    
-    success_count = len([r for r in results if r["status"] == "success"])
-    if success_count > 0:
-        successful_names = [r["name"] for r in results if r["status"] == "success"]
-        return {"status": "success", "message": f"Created {success_count} rulesets: {', '.join(successful_names)}", "results": results}
+def _legacy_status(result: dict) -> str:
+    """Shared engine status as this server has always reported it: GitHub refusals are warnings"""
+    if result["status"] == "error" and "status_code" not in result:
+        return "error"
+    return "success" if result["status"] == "success" else "warning"
+
+def _ruleset_summary(results: list):
+    """Shape ruleset results as the copy-package response's ``ruleset`` field"""
+    results = [{"name": r["name"], "status": _legacy_status(r)} for r in results]
+    successful_names = [r["name"] for r in results if r["status"] == "success"]
+    if successful_names:
+        return {"status": "success", "message": f"Created {len(successful_names)} rulesets: {', '.join(successful_names)}", "results": results}
     else:
         return {"status": "warning", "message": "No rulesets were created successfully", "results": results}
 
-def create_environment_secrets(token: str, owner: str, repo: str, environment_secrets: EnvironmentSecrets):
-    """Create GitHub environment secrets"""
-    results = []
+def _push_package(request: DeployRequest):
+    """Steps 1-3 (blocking): validate the token, create the repository and push the package. Returns (owner, file count)"""
+    # 1. Validate GitHub token
+    headers = {'Authorization': f'Bearer {request.github_token}'}
+    user_resp = github_session.get(f"{GITHUB_API_URL}/user", headers=headers, timeout=10)
+    if not user_resp.ok:
+        print(f"❌ Invalid GitHub token: {user_resp.status_code}")
+        raise HTTPException(status_code=401, detail="Invalid GitHub token. Please check your Personal Access Token.")
     
-    for env_name, api_token in [("prod", environment_secrets.prod), ("qa", environment_secrets.qa), ("dev", environment_secrets.dev)]:
-        if not api_token:
-            continue
-        
+    user_data = user_resp.json()
+    owner = request.organization or user_data['login']
+    print(f"✅ Valid token for: {user_data['login']}")
+    
+    # 2. Create repository
+    repo_url = f"{GITHUB_API_URL}/orgs/{request.organization}/repos" if request.organization else f"{GITHUB_API_URL}/user/repos"
+    repo_data = {"name": request.repo_name, "private": False}
+    
+    repo_resp = requests.post(repo_url, headers=headers, json=repo_data, timeout=10)
+    if repo_resp.ok:
+        print(f"✅ Created repo: {owner}/{request.repo_name}")
+    elif repo_resp.status_code == 422:
+        # Repository validation error - get detailed error info
         try:
-            # Create environment
-            env_url = f"https://api.github.com/repos/{owner}/{repo}/environments/{env_name}"
-            env_headers = {
-                'Authorization': f'Bearer {token}',
-                'Accept': 'application/vnd.github+json',
-                'X-GitHub-Api-Version': '2022-11-28'
-            }
-            
-            env_data = {"wait_timer": 0, "reviewers": [], "deployment_branch_policy": None}
-            env_response = requests.put(env_url, headers=env_headers, json=env_data, timeout=10)
+            error_data = repo_resp.json()
+            print(f"GitHub API 422 response: {error_data}")
             
-            # Get public key for encryption
-            public_key_url = f"https://api.github.com/repos/{owner}/{repo}/environments/{env_name}/secrets/public-key"
-            public_key_response = requests.get(public_key_url, headers=env_headers, timeout=10)
+            # Check for specific error patterns
+            message = error_data.get('message', '').lower()
+            errors = error_data.get('errors', [])
             
-            if public_key_response.ok:
-                public_key_data = public_key_response.json()
-                
-                # Simple base64 encoding (fallback method)
-                encrypted_value = base64.b64encode(api_token.encode('utf-8')).decode('utf-8')
-                
-                # Set the secret
-                secret_url = f"https://api.github.com/repos/{owner}/{repo}/environments/{env_name}/secrets/TD_API_TOKEN"
-                secret_data = {
-                    "encrypted_value": encrypted_value,
-                    "key_id": public_key_data['key_id']
-                }
+            if "already exists" in message:
+                print(f"ℹ️ Repo exists: {owner}/{request.repo_name}")
+            elif "name already exists on this account" in message:
+                print(f"ℹ️ Repo name conflict: {owner}/{request.repo_name}")
+                raise HTTPException(status_code=409, detail=f"Repository '{request.repo_name}' already exists. Please choose a different name.")
+            elif errors:
+                # Handle detailed error array
+                error_messages = []
+                for error in errors:
+                    if isinstance(error, dict):
+                        error_msg = error.get('message', str(error))
+                        field = error.get('field', '')
+                        code = error.get('code', '')
+                        if field and code:
+                            error_messages.append(f"{field}: {error_msg} ({code})")
+                        else:
+                            error_messages.append(error_msg)
+                    else:
+                        error_messages.append(str(error))
                 
-                secret_response = requests.put(secret_url, headers=env_headers, json=secret_data, timeout=10)
+                full_error = "; ".join(error_messages)
+                print(f"❌ Detailed validation errors: {full_error}")
+                raise HTTPException(status_code=422, detail=f"GitHub validation failed: {full_error}")
+            else:
+                # Generic message
+                full_message = error_data.get('message', repo_resp.text)
+                print(f"❌ Generic validation error: {full_message}")
                 
-                if secret_response.ok:
-                    print(f"✅ Created {env_name} environment secret")
-                    results.append({"environment": env_name, "status": "success"})
+                # Try to make it more user-friendly
+                if "creation failed" in full_message.lower():
+                    user_friendly = f"Repository '{request.repo_name}' could not be created. This usually means the name is already taken or invalid. Please try a different name."
                 else:
-                    print(f"⚠️ Failed to set {env_name} secret: {secret_response.status_code}")
-                    results.append({"environment": env_name, "status": "warning"})
-            else:
-                print(f"⚠️ Failed to get public key for {env_name}")
-                results.append({"environment": env_name, "status": "warning"})
+                    user_friendly = f"GitHub repository error: {full_message}"
                 
-        except Exception as e:
-            print(f"⚠️ Error with {env_name} environment: {e}")
-            results.append({"environment": env_name, "status": "error"})
-    
-    return results
-
-def create_repository_variables(token: str, owner: str, repo: str, project_name: str, td_region: str):
-    """Create GitHub repository variables"""
-    results = []
-    
-    # Determine API endpoint based on region
-    if td_region.startswith('us') or td_region in ['us01', 'aws', 'aws-east-1']:
-        td_api_endpoint = 'https://api-workflow.treasuredata.com'
-    elif td_region.startswith('eu') or td_region in ['eu01', 'eu-west-1']:
-        td_api_endpoint = 'https://api-workflow.eu01.treasuredata.com'
+                raise HTTPException(status_code=422, detail=user_friendly)
+                
+        except ValueError as e:
+            print(f"❌ Could not parse GitHub error response: {e}")
+            print(f"Raw response: {repo_resp.text}")
+            raise HTTPException(status_code=422, detail=f"Repository creation failed. Raw response: {repo_resp.text}")
     else:
-        td_api_endpoint = 'https://api-workflow.treasuredata.com'
-    
-    variables = [
-        {'name': 'TD_WF_API_ENDPOINT', 'value': td_api_endpoint},
-        {'name': 'TD_WF_PROJS', 'value': project_name}
-    ]
-    
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28'
-    }
-    
-    for var in variables:
         try:
-            var_url = f"https://api.github.com/repos/{owner}/{repo}/actions/variables/{var['name']}"
-            
-            # Try to update first
-            response = requests.patch(var_url, headers=headers, json={'value': var['value']}, timeout=10)
-            
-            if response.status_code == 404:
-                # Variable doesn't exist, create it
-                create_url = f"https://api.github.com/repos/{owner}/{repo}/actions/variables"
-                response = requests.post(create_url, headers=headers, json=var, timeout=10)
-            
-            if response.ok or response.status_code == 201:
-                print(f"✅ Set repository variable: {var['name']}")
-                results.append({"variable": var['name'], "status": "success"})
-            else:
-                print(f"⚠️ Failed to set variable {var['name']}: {response.status_code}")
-                results.append({"variable": var['name'], "status": "warning"})
-                
-        except Exception as e:
-            print(f"⚠️ Error setting variable {var['name']}: {e}")
-            results.append({"variable": var['name'], "status": "error"})
+            error_data = repo_resp.json()
+            error_detail = error_data.get('message', repo_resp.text)
+        except ValueError:
+            error_detail = repo_resp.text
+        
+        print(f"❌ Failed to create repo: {error_detail}")
+        
+        if repo_resp.status_code == 401:
+            raise HTTPException(status_code=401, detail="Invalid GitHub token. Please check your Personal Access Token.")
+        elif repo_resp.status_code == 403:
+            raise HTTPException(status_code=403, detail="GitHub token lacks required permissions. Please ensure your token has 'repo' scope.")
+        else:
+            raise HTTPException(status_code=repo_resp.status_code, detail=f"Failed to create repository: {error_detail}")
     
-    return results
-
-@app.post("/api/github/copy-package")
-def deploy_package(request: DeployRequest):
-    """Deploy package to GitHub - minimal working version"""
-    print(f"\n🚀 DEPLOYING: {request.package_name} to {request.repo_name}")
+    # 3. Copy files and deploy
+    source_dir = "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack"
+    package_path = f"{source_dir}/{request.package_name}"
     
-    try:
-        # 1. Validate GitHub token
-        headers = {'Authorization': f'Bearer {request.github_token}'}
-        user_resp = requests.get("https://api.github.com/user", headers=headers, timeout=10)
-        if not user_resp.ok:
-            print(f"❌ Invalid GitHub token: {user_resp.status_code}")
-            raise HTTPException(status_code=401, detail="Invalid GitHub token. Please check your Personal Access Token.")
+    if not os.path.exists(package_path):
+        print(f"❌ Package not found: {package_path}")
+        raise HTTPException(status_code=404, detail=f"Package {request.package_name} not found")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        print(f"📁 Working in: {temp_dir}")
         
-        user_data = user_resp.json()
-        owner = request.organization or user_data['login']
-        print(f"✅ Valid token for: {user_data['login']}")
+        # Initialize git
+        subprocess.run(['git', 'init'], cwd=temp_dir, check=True, capture_output=True)
+        subprocess.run(['git', 'config', 'user.name', 'TD Deploy'], cwd=temp_dir, check=True)
+        subprocess.run(['git', 'config', 'user.email', 'deploy@td.com'], cwd=temp_dir, check=True)
         
-        # 2. Create repository
-        repo_url = f"https://api.github.com/orgs/{request.organization}/repos" if request.organization else "https://api.github.com/user/repos"
-        repo_data = {"name": request.repo_name, "private": False}
+        # Copy package files
+        dest_project = f"{temp_dir}/{request.project_name}"
+        shutil.copytree(package_path, dest_project)
+        print(f"✅ Copied {request.package_name} to {request.project_name}/")
         
-        repo_resp = requests.post(repo_url, headers=headers, json=repo_data, timeout=10)
-        if repo_resp.ok:
-            print(f"✅ Created repo: {owner}/{request.repo_name}")
-        elif repo_resp.status_code == 422:
-            # Repository validation error - get detailed error info
-            try:
-                error_data = repo_resp.json()
-                print(f"GitHub API 422 response: {error_data}")
-                
-                # Check for specific error patterns
-                message = error_data.get('message', '').lower()
-                errors = error_data.get('errors', [])
-                
-                if "already exists" in message:
-                    print(f"ℹ️ Repo exists: {owner}/{request.repo_name}")
-                elif "name already exists on this account" in message:
-                    print(f"ℹ️ Repo name conflict: {owner}/{request.repo_name}")
-                    raise HTTPException(status_code=409, detail=f"Repository '{request.repo_name}' already exists. Please choose a different name.")
-                elif errors:
-                    # Handle detailed error array
-                    error_messages = []
-                    for error in errors:
-                        if isinstance(error, dict):
-                            error_msg = error.get('message', str(error))
-                            field = error.get('field', '')
-                            code = error.get('code', '')
-                            if field and code:
-                                error_messages.append(f"{field}: {error_msg} ({code})")
-                            else:
-                                error_messages.append(error_msg)
-                        else:
-                            error_messages.append(str(error))
-                    
-                    full_error = "; ".join(error_messages)
-                    print(f"❌ Detailed validation errors: {full_error}")
-                    raise HTTPException(status_code=422, detail=f"GitHub validation failed: {full_error}")
-                else:
-                    # Generic message
-                    full_message = error_data.get('message', repo_resp.text)
-                    print(f"❌ Generic validation error: {full_message}")
-                    
-                    # Try to make it more user-friendly
-                    if "creation failed" in full_message.lower():
-                        user_friendly = f"Repository '{request.repo_name}' could not be created. This usually means the name is already taken or invalid. Please try a different name."
-                    else:
-                        user_friendly = f"GitHub repository error: {full_message}"
-                    
-                    raise HTTPException(status_code=422, detail=user_friendly)
-                    
-            except ValueError as e:
-                print(f"❌ Could not parse GitHub error response: {e}")
-                print(f"Raw response: {repo_resp.text}")
-                raise HTTPException(status_code=422, detail=f"Repository creation failed. Raw response: {repo_resp.text}")
-        else:
-            try:
-                error_data = repo_resp.json()
-                error_detail = error_data.get('message', repo_resp.text)
-            except ValueError:
-                error_detail = repo_resp.text
-            
-            print(f"❌ Failed to create repo: {error_detail}")
-            
-            if repo_resp.status_code == 401:
-                raise HTTPException(status_code=401, detail="Invalid GitHub token. Please check your Personal Access Token.")
-            elif repo_resp.status_code == 403:
-                raise HTTPException(status_code=403, detail="GitHub token lacks required permissions. Please ensure your token has 'repo' scope.")
-            else:
-                raise HTTPException(status_code=repo_resp.status_code, detail=f"Failed to create repository: {error_detail}")
+        # Copy .github if exists
+        github_source = f"{source_dir}/.github"
+        if os.path.exists(github_source):
+            shutil.copytree(github_source, f"{temp_dir}/.github")
+            print(f"✅ Copied GitHub Actions")
         
-        # 3. Copy files and deploy
-        source_dir = "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack"
-        package_path = f"{source_dir}/{request.package_name}"
+        # Count files
+        file_count = sum([len(files) for r, d, files in os.walk(temp_dir) if '.git' not in r])
+        print(f"📄 Total files: {file_count}")
         
-        if not os.path.exists(package_path):
-            print(f"❌ Package not found: {package_path}")
-            raise HTTPException(status_code=404, detail=f"Package {request.package_name} not found")
+        # Commit and push
+        subprocess.run(['git', 'add', '.'], cwd=temp_dir, check=True)
+        subprocess.run(['git', 'commit', '-m', f'Deploy {request.package_name}'], cwd=temp_dir, check=True)
+        subprocess.run(['git', 'branch', '-M', 'main'], cwd=temp_dir, check=True)
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            print(f"📁 Working in: {temp_dir}")
-            
-            # Initialize git
-            subprocess.run(['git', 'init'], cwd=temp_dir, check=True, capture_output=True)
-            subprocess.run(['git', 'config', 'user.name', 'TD Deploy'], cwd=temp_dir, check=True)
-            subprocess.run(['git', 'config', 'user.email', 'deploy@td.com'], cwd=temp_dir, check=True)
-            
-            # Copy package files
-            dest_project = f"{temp_dir}/{request.project_name}"
-            shutil.copytree(package_path, dest_project)
-            print(f"✅ Copied {request.package_name} to {request.project_name}/")
-            
-            # Copy .github if exists
-            github_source = f"{source_dir}/.github"
-            if os.path.exists(github_source):
-                shutil.copytree(github_source, f"{temp_dir}/.github")
-                print(f"✅ Copied GitHub Actions")
-            
-            # Count files
-            file_count = sum([len(files) for r, d, files in os.walk(temp_dir) if '.git' not in r])
-            print(f"📄 Total files: {file_count}")
-            
-            # Commit and push
-            subprocess.run(['git', 'add', '.'], cwd=temp_dir, check=True)
-            subprocess.run(['git', 'commit', '-m', f'Deploy {request.package_name}'], cwd=temp_dir, check=True)
-            subprocess.run(['git', 'branch', '-M', 'main'], cwd=temp_dir, check=True)
-            
-            remote_url = f"https://{request.github_token}@github.com/{owner}/{request.repo_name}.git"
-            subprocess.run(['git', 'remote', 'add', 'origin', remote_url], cwd=temp_dir, check=True)
-            
-            push_result = subprocess.run(['git', 'push', '-u', 'origin', 'main'], 
-                                       cwd=temp_dir, capture_output=True, text=True, timeout=60)
+        remote_url = git_remote_url(request.github_token, owner, request.repo_name)
+        subprocess.run(['git', 'remote', 'add', 'origin', remote_url], cwd=temp_dir, check=True)
+        
+        push_result = subprocess.run(['git', 'push', '-u', 'origin', 'main'], 
+                                   cwd=temp_dir, capture_output=True, text=True, timeout=60)
+        
+        if push_result.returncode != 0:
+            error_details = push_result.stderr.strip() if push_result.stderr else "Unknown git push error"
+            print(f"❌ Push failed: {error_details}")
             
-            if push_result.returncode != 0:
-                error_details = push_result.stderr.strip() if push_result.stderr else "Unknown git push error"
-                print(f"❌ Push failed: {error_details}")
-                
-                # Provide user-friendly error messages
-                if "Repository already exists" in error_details or "rejected" in error_details:
-                    if "fetch first" in error_details:
-                        user_error = f"Repository '{request.repo_name}' already has content. Please use a different repository name or delete the existing repository first."
-                    else:
-                        user_error = f"Repository '{request.repo_name}' already exists. Please choose a different name."
+            # Provide user-friendly error messages
+            if "Repository already exists" in error_details or "rejected" in error_details:
+                if "fetch first" in error_details:
+                    user_error = f"Repository '{request.repo_name}' already has content. Please use a different repository name or delete the existing repository first."
                 else:
-                    user_error = f"Git push failed: {error_details}"
-                
-                raise HTTPException(status_code=409, detail=user_error)
+                    user_error = f"Repository '{request.repo_name}' already exists. Please choose a different name."
+            else:
+                user_error = f"Git push failed: {error_details}"
             
-            print(f"✅ Pushed to GitHub successfully")
+            raise HTTPException(status_code=409, detail=user_error)
         
-        # Step 4: Create repository rulesets (if requested)
-        ruleset_result = None
-        if request.create_ruleset:
-            print(f"🔒 Creating repository rulesets...")
-            ruleset_result = create_repository_rulesets(request.github_token, owner, request.repo_name)
+        print(f"✅ Pushed to GitHub successfully")
+    
+    return owner, file_count
+
+@app.post("/api/github/copy-package")
+async def deploy_package(request: DeployRequest):
+    """Deploy package to GitHub - minimal working version"""
+    print(f"\n🚀 DEPLOYING: {request.package_name} to {request.repo_name}")
+    
+    try:
+        owner, file_count = await asyncio.to_thread(_push_package, request)
         
-        # Step 5: Create environment secrets (if provided)
-        secrets_results = []
+        # Steps 4-6: rulesets, environment secrets and repository variables, all at once
         env_secrets_list = [env for env in ['prod', 'qa', 'dev'] if getattr(request.environment_secrets, env)]
-        if env_secrets_list:
-            print(f"🔐 Creating environment secrets for: {', '.join(env_secrets_list)}")
-            secrets_results = create_environment_secrets(request.github_token, owner, request.repo_name, request.environment_secrets)
-        
-        # Step 6: Create repository variables
-        variables_results = []
-        if request.td_credentials:
-            print(f"⚙️ Creating repository variables...")
-            variables_results = create_repository_variables(
-                request.github_token, 
-                owner, 
-                request.repo_name, 
-                request.project_name,
-                request.td_credentials.region
-            )
+        print(f"🔒 Provisioning repository: rulesets={request.create_ruleset}, "
+              f"secrets={', '.join(env_secrets_list) or 'none'}, variables={bool(request.td_credentials)}")
+        provisioned = await provisioning.provision(
+            request.github_token,
+            owner,
+            request.repo_name,
+            rulesets=request.create_ruleset,
+            secrets=request.environment_secrets.model_dump(),
+            project_name=request.project_name,
+            td_region=request.td_credentials.region if request.td_credentials else None
+        )
+        ruleset_result = _ruleset_summary(provisioned["rulesets"]) if request.create_ruleset else None
+        secrets_results = [{"environment": r["environment"], "status": _legacy_status(r)} for r in provisioned["secrets"]]
+        variables_results = [{"variable": r["variable"], "status": _legacy_status(r)} for r in provisioned["variables"]]
         
         return {
             "success": True,
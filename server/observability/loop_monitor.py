@@ -0,0 +1,199 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from logging_config import logger
+
+UNKNOWN_ROUTE = "<unknown>"
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(len(ordered) * fraction), len(ordered) - 1)
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """Measure event-loop lag and catch whatever is blocking the loop.
+
+    A heartbeat task sleeps for ``interval`` seconds and records how late it
+    wakes up. A watchdog thread watches the heartbeat; when it stalls for longer
+    than ``threshold`` it grabs the loop thread's current stack, which is the
+    synchronous call hogging the loop (``requests.post``, ``subprocess.run``,
+    ``shutil.copytree``...). The stack is attributed to the route whose handler
+    appears in it, and the block is charged to that route once the heartbeat
+    comes back and the real duration is known.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1,
+                 max_stacks_per_route: int = 10, stack_depth: int = 30):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_stacks_per_route = max_stacks_per_route
+        self.stack_depth = stack_depth
+
+        self._lock = threading.Lock()
+        self._lag_samples = deque(maxlen=1200)
+        self._max_lag = 0.0
+        self._offenders: Dict[str, Dict[str, Any]] = {}
+        self._captured: Dict[float, Tuple[str, Tuple]] = {}
+        self._route_by_code: Dict[Any, str] = {}
+
+        self._last_beat = time.perf_counter()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, app=None):
+        """Start monitoring the running loop. Must be called from the loop."""
+        if self.running:
+            return
+        if app is not None:
+            self._route_by_code = self._build_route_map(app)
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        with self._lock:
+            self._lag_samples.clear()
+            self._max_lag = 0.0
+            self._offenders.clear()
+            self._captured.clear()
+
+    @staticmethod
+    def _build_route_map(app) -> Dict[Any, str]:
+        """Map handler code objects to "METHOD /path" labels"""
+        routes = {}
+        for route in getattr(app, "routes", []):
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is None:
+                continue
+            methods = ",".join(sorted(getattr(route, "methods", None) or []))
+            routes[code] = f"{methods} {route.path}".strip()
+        return routes
+
+    async def _heartbeat(self):
+        while True:
+            beat = time.perf_counter()
+            self._last_beat = beat
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - beat - self.interval, 0.0)
+            with self._lock:
+                self._lag_samples.append(lag)
+                self._max_lag = max(self._max_lag, lag)
+                if lag >= self.threshold:
+                    route, stack = self._captured.pop(beat, (UNKNOWN_ROUTE, ()))
+                    self._record_block(route, stack, lag)
+                self._captured.clear()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            beat = self._last_beat
+            stalled = time.perf_counter() - beat - self.interval
+            if stalled < self.threshold or beat in self._captured:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = tuple(
+                (summary.filename, summary.lineno, summary.name)
+                for summary in traceback.extract_stack(frame, limit=self.stack_depth)
+            )
+            route = self._route_for(frame)
+            del frame
+            with self._lock:
+                self._captured[beat] = (route, stack)
+
+    def _route_for(self, frame) -> str:
+        while frame is not None:
+            route = self._route_by_code.get(frame.f_code)
+            if route:
+                return route
+            frame = frame.f_back
+        return UNKNOWN_ROUTE
+
+    def _record_block(self, route: str, stack: Tuple, lag: float):
+        offender = self._offenders.setdefault(route, {"count": 0, "total": 0.0, "max": 0.0, "stacks": {}})
+        offender["count"] += 1
+        offender["total"] += lag
+        offender["max"] = max(offender["max"], lag)
+        if stack:
+            stacks = offender["stacks"]
+            if stack in stacks or len(stacks) < self.max_stacks_per_route:
+                entry = stacks.setdefault(stack, {"count": 0, "total": 0.0})
+                entry["count"] += 1
+                entry["total"] += lag
+        culprit = f" in {stack[-1][2]} ({os.path.basename(stack[-1][0])}:{stack[-1][1]})" if stack else ""
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms by {route}{culprit}")
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        """Lag statistics and the worst offending routes, heaviest first"""
+        with self._lock:
+            samples = list(self._lag_samples)
+            offenders = sorted(self._offenders.items(), key=lambda item: -item[1]["total"])[:top]
+            report = []
+            for route, data in offenders:
+                stacks = sorted(data["stacks"].items(), key=lambda item: -item[1]["total"])
+                report.append({
+                    "route": route,
+                    "blocked_count": data["count"],
+                    "blocked_total_ms": round(data["total"] * 1000, 1),
+                    "blocked_max_ms": round(data["max"] * 1000, 1),
+                    "stacks": [
+                        {
+                            "count": entry["count"],
+                            "blocked_total_ms": round(entry["total"] * 1000, 1),
+                            "frames": [f"{filename}:{lineno} in {name}" for filename, lineno, name in stack],
+                        }
+                        for stack, entry in stacks
+                    ],
+                })
+            max_lag = self._max_lag
+
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": {
+                "samples": len(samples),
+                "current": round(samples[-1] * 1000, 2) if samples else 0.0,
+                "p50": round(_percentile(samples, 0.50) * 1000, 2),
+                "p99": round(_percentile(samples, 0.99) * 1000, 2),
+                "max": round(max_lag * 1000, 2),
+            },
+            "offenders": report,
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    interval=float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000,
+    threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000,
+)
@@ -0,0 +1,267 @@
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from services.resilience import breakers, call_timeout, is_failure
+
+# Path templates for the endpoints we call, so per-route stats don't explode
+# into one row per repository, environment or file. First match wins.
+ROUTE_TEMPLATES: List[Tuple[str, str]] = [
+    # api.github.com
+    (r"^/repos/[^/]+/[^/]+/environments/[^/]+/secrets/public-key$", "/repos/{owner}/{repo}/environments/{env}/secrets/public-key"),
+    (r"^/repos/[^/]+/[^/]+/environments/[^/]+/secrets/[^/]+$", "/repos/{owner}/{repo}/environments/{env}/secrets/{name}"),
+    (r"^/repos/[^/]+/[^/]+/environments/[^/]+$", "/repos/{owner}/{repo}/environments/{env}"),
+    (r"^/repos/[^/]+/[^/]+/actions/variables/[^/]+$", "/repos/{owner}/{repo}/actions/variables/{name}"),
+    (r"^/repos/[^/]+/[^/]+/actions/variables$", "/repos/{owner}/{repo}/actions/variables"),
+    (r"^/repos/[^/]+/[^/]+/rulesets/[^/]+$", "/repos/{owner}/{repo}/rulesets/{id}"),
+    (r"^/repos/[^/]+/[^/]+/rulesets$", "/repos/{owner}/{repo}/rulesets"),
+    (r"^/repos/[^/]+/[^/]+/contents(/.*)?$", "/repos/{owner}/{repo}/contents/{path}"),
+    (r"^/repos/[^/]+/[^/]+/git/trees/[^/]+$", "/repos/{owner}/{repo}/git/trees/{ref}"),
+    (r"^/repos/[^/]+/[^/]+$", "/repos/{owner}/{repo}"),
+    (r"^/orgs/[^/]+/repos$", "/orgs/{org}/repos"),
+    (r"^/orgs/[^/]+$", "/orgs/{org}"),
+    (r"^/user/memberships/orgs/[^/]+$", "/user/memberships/orgs/{org}"),
+    (r"^/users/[^/]+/repos$", "/users/{user}/repos"),
+    # Treasure Data REST API
+    (r"^/v3/table/list/[^/]+$", "/v3/table/list/{database}"),
+    (r"^/v3/database/show/[^/]+$", "/v3/database/show/{database}"),
+]
+_COMPILED_TEMPLATES = [(re.compile(pattern), template) for pattern, template in ROUTE_TEMPLATES]
+_RAW_CONTENT = re.compile(r"^/[^/]+/[^/]+/[^/]+/.+$")
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[0-9a-fA-F-]{8,}$|^\d+$")
+
+RESERVOIR_SIZE = 512
+
+
+def route_template(host: str, path: str) -> str:
+    """Collapse a concrete URL path into a low-cardinality template"""
+    path = path.rstrip("/") or "/"
+    if host == "raw.githubusercontent.com" and _RAW_CONTENT.match(path):
+        return "/{owner}/{repo}/{ref}/{path}"
+    for pattern, template in _COMPILED_TEMPLATES:
+        if pattern.match(path):
+            return template
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class _RouteStats:
+    __slots__ = ("count", "errors", "statuses", "latency_total", "latency_max", "latencies", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = Counter()
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latencies = deque(maxlen=RESERVOIR_SIZE)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class OutboundRecorder:
+    """Per-host/route latency, status, byte and rate-limit statistics for outbound HTTP"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str, str], _RouteStats] = {}
+        self._rate_limits: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def record(self, method: str, url: str, status: Optional[int], latency: float,
+               bytes_in: int = 0, bytes_out: int = 0, headers=None):
+        parts = urlsplit(url)
+        host = parts.hostname or "unknown"
+        if parts.port:
+            host = f"{host}:{parts.port}"
+        key = (host, method.upper(), route_template(parts.hostname or "", parts.path))
+
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = _RouteStats()
+            stats.count += 1
+            stats.latency_total += latency
+            stats.latency_max = max(stats.latency_max, latency)
+            stats.latencies.append(latency)
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+            if status is None:
+                stats.errors += 1
+                stats.statuses["error"] += 1
+            else:
+                stats.statuses[str(status)] += 1
+            if headers is not None and "X-RateLimit-Remaining" in headers:
+                self._record_rate_limit(host, headers)
+
+    def _record_rate_limit(self, host: str, headers):
+        resource = headers.get("X-RateLimit-Resource", "core")
+        entry = {"remaining": None, "limit": None, "reset": None, "updated_at": time.time()}
+        for field, header in (("remaining", "X-RateLimit-Remaining"), ("limit", "X-RateLimit-Limit"), ("reset", "X-RateLimit-Reset")):
+            try:
+                entry[field] = int(headers[header])
+            except (KeyError, TypeError, ValueError):
+                pass
+        self._rate_limits[(host, resource)] = entry
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._rate_limits.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-host totals plus per-route detail, slowest (by total time) first"""
+        with self._lock:
+            rows = [
+                (key, stats.count, stats.errors, dict(stats.statuses), stats.latency_total,
+                 stats.latency_max, list(stats.latencies), stats.bytes_in, stats.bytes_out)
+                for key, stats in self._routes.items()
+            ]
+            rate_limits = {f"{host} ({resource})": dict(entry) for (host, resource), entry in self._rate_limits.items()}
+
+        hosts: Dict[str, Dict[str, Any]] = {}
+        routes = []
+        for (host, method, route), count, errors, statuses, total, latency_max, latencies, bytes_in, bytes_out in rows:
+            routes.append({
+                "host": host,
+                "method": method,
+                "route": route,
+                "count": count,
+                "errors": errors,
+                "statuses": statuses,
+                "total_ms": round(total * 1000, 1),
+                "avg_ms": round(total / count * 1000, 1),
+                "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+                "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+                "max_ms": round(latency_max * 1000, 1),
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+            })
+            host_entry = hosts.setdefault(host, {"count": 0, "errors": 0, "total_ms": 0.0, "bytes_in": 0, "bytes_out": 0})
+            host_entry["count"] += count
+            host_entry["errors"] += errors
+            host_entry["total_ms"] = round(host_entry["total_ms"] + total * 1000, 1)
+            host_entry["bytes_in"] += bytes_in
+            host_entry["bytes_out"] += bytes_out
+
+        routes.sort(key=lambda row: -row["total_ms"])
+        return {
+            "hosts": dict(sorted(hosts.items(), key=lambda item: -item[1]["total_ms"])),
+            "routes": routes,
+            "rate_limits": rate_limits,
+        }
+
+    def prometheus(self) -> str:
+        """Render the counters in Prometheus text exposition format"""
+        def labels(**values):
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in values.items()) + "}"
+
+        lines = [
+            "# TYPE outbound_requests_total counter",
+            "# TYPE outbound_request_duration_seconds summary",
+            "# TYPE outbound_response_bytes_total counter",
+            "# TYPE outbound_request_bytes_total counter",
+            "# TYPE outbound_ratelimit_remaining gauge",
+            "# TYPE outbound_ratelimit_reset_timestamp_seconds gauge",
+        ]
+        with self._lock:
+            for (host, method, route), stats in sorted(self._routes.items()):
+                base = dict(host=host, method=method, route=route)
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f"outbound_requests_total{labels(**base, status=status)} {count}")
+                latencies = list(stats.latencies)
+                for quantile in (0.5, 0.95, 0.99):
+                    lines.append(f"outbound_request_duration_seconds{labels(**base, quantile=quantile)} {_percentile(latencies, quantile):.6f}")
+                lines.append(f"outbound_request_duration_seconds_sum{labels(**base)} {stats.latency_total:.6f}")
+                lines.append(f"outbound_request_duration_seconds_count{labels(**base)} {stats.count}")
+                lines.append(f"outbound_response_bytes_total{labels(**base)} {stats.bytes_in}")
+                lines.append(f"outbound_request_bytes_total{labels(**base)} {stats.bytes_out}")
+            for (host, resource), entry in sorted(self._rate_limits.items()):
+                if entry["remaining"] is not None:
+                    lines.append(f"outbound_ratelimit_remaining{labels(host=host, resource=resource)} {entry['remaining']}")
+                if entry["reset"] is not None:
+                    lines.append(f"outbound_ratelimit_reset_timestamp_seconds{labels(host=host, resource=resource)} {entry['reset']}")
+        return "\n".join(lines) + "\n"
+
+
+outbound_recorder = OutboundRecorder()
+
+_original_send = None
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return 0
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    host = parts.hostname or "unknown"
+    return f"{host}:{parts.port}" if parts.port else host
+
+
+def _instrumented_send(self, request, **kwargs):
+    # Fail fast while the host is known to be down, and never wait past the deployment deadline
+    # The timeout first: a spent deadline must not take the half-open trial with it
+    kwargs["timeout"] = call_timeout(kwargs.get("timeout"))
+    breaker = breakers.get(_host(request.url))
+    breaker.before_call()
+
+    start = time.perf_counter()
+    try:
+        response = _original_send(self, request, **kwargs)
+    except Exception as e:
+        outbound_recorder.record(request.method, request.url, None, time.perf_counter() - start,
+                                 bytes_out=_body_size(request.body))
+        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            breaker.record_failure()
+        else:
+            breaker.release_trial()
+        raise
+
+    if is_failure(response.status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+    status = response.status_code
+    if kwargs.get("stream"):
+        try:
+            bytes_in = int(response.headers.get("Content-Length", 0))
+        except ValueError:
+            bytes_in = 0
+    elif response.headers.get("X-Conditional-Cache") == "revalidated":
+        # Replayed from the GitHub response cache; on the wire it was a bodiless 304
+        status, bytes_in = 304, 0
+    else:
+        bytes_in = len(response.content or b"")
+    outbound_recorder.record(request.method, request.url, status, time.perf_counter() - start,
+                             bytes_in=bytes_in, bytes_out=_body_size(request.body), headers=response.headers)
+    return response
+
+
+def install():
+    """Hook ``requests.Session.send``.
+
+    Module-level ``requests.get``/``post`` calls, our own sessions and
+    PyGithub all go through it, so one hook covers GitHub, TD and MCP traffic.
+    The same hook applies the per-host circuit breakers and deployment deadline.
+    """
+    global _original_send
+    if _original_send is not None:
+        return
+    _original_send = requests.Session.send
+    requests.Session.send = _instrumented_send
@@ -0,0 +1,167 @@
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+# (filename, first line, function name) - the key pstats uses for a function
+FunctionKey = Tuple[str, int, str]
+
+
+class SamplingProfiler:
+    """Statistical CPU profiler that samples every thread's stack.
+
+    Unlike cProfile it needs no tracing hooks, so it only costs anything while
+    a profile is being taken and sees all threads, including the event loop and
+    thread-pool workers running blocking calls.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.duration = 0.0
+
+    def run(self, seconds: float):
+        """Sample all threads for ``seconds``. Blocks the calling thread."""
+        own_thread = threading.get_ident()
+        names = {}
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(thread_id, str(thread_id)), tuple(stack))] += 1
+            self.sample_count += 1
+            time.sleep(self.interval)
+        self.duration = time.perf_counter() - start
+
+    def collapsed(self) -> str:
+        """Folded stacks ("thread;outer;...;inner count"), as consumed by flamegraph.pl/speedscope"""
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for filename, line, name in stack)
+            lines.append(f"{thread_name};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats_dump(self) -> bytes:
+        """Marshalled stats loadable with ``pstats.Stats(path)`` or snakeviz.
+
+        Each sample stands for the measured sampling period: the innermost
+        function gets it as own time, every function on the stack as
+        cumulative time.
+        """
+        stats: Dict[FunctionKey, list] = {}
+        callers: Dict[FunctionKey, Dict[FunctionKey, list]] = {}
+        weight = self.duration / self.sample_count if self.sample_count else self.interval
+
+        for (_, stack), count in self.samples.items():
+            if not stack:
+                continue
+            seen = set()
+            for depth, func in enumerate(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0])
+                if func not in seen:
+                    seen.add(func)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += count * weight
+                    if depth:
+                        edge = callers.setdefault(func, {}).setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                        edge[0] += count
+                        edge[1] += count
+                        edge[3] += count * weight
+            stats[stack[-1]][2] += count * weight
+            if len(stack) > 1:
+                edge = callers.setdefault(stack[-1], {}).setdefault(stack[-2], [0, 0, 0.0, 0.0])
+                edge[2] += count * weight
+
+        dump = {
+            func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.get(func, {}).items()})
+            for func, (cc, nc, tt, ct) in stats.items()
+        }
+        return marshal.dumps(dump)
+
+
+class MemoryProfiler:
+    """tracemalloc wrapper that reports the top allocators and growth since the last look"""
+
+    _ignored = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self._previous = self._take()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._ignored)
+
+    def report(self, top: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """Top allocations now and the biggest changes since the previous report"""
+        with self._lock:
+            snapshot = self._take()
+            previous, self._previous = self._previous, snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "top_allocators": [self._stat(stat) for stat in snapshot.statistics(group_by)[:top]],
+            "top_growth": [],
+        }
+        if previous is not None:
+            report["top_growth"] = [
+                self._stat(stat) for stat in snapshot.compare_to(previous, group_by)[:top]
+            ]
+        return report
+
+    @staticmethod
+    def _stat(stat) -> Dict[str, Any]:
+        entry = {
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        }
+        if hasattr(stat, "size_diff"):
+            entry["size_diff_bytes"] = stat.size_diff
+            entry["count_diff"] = stat.count_diff
+        return entry
+
+
+memory_profiler = MemoryProfiler(frames=int(os.getenv("TRACEMALLOC_FRAMES", "10")))
+
+# Only one CPU profile at a time; overlapping samplers would skew each other
+cpu_profile_lock = threading.Lock()
@@ -0,0 +1,108 @@
+import json
+import random
+import time
+import traceback
+import uuid
+from typing import Dict, Optional
+
+from logging_config import logger
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "prefix=rate,prefix=rate" into a mapping.
+
+    Example: "/api/github/copy-progress=0.05,/docs=0" logs 5% of progress polls
+    and none of the docs traffic. Rates are clamped to [0, 1].
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.partition("=")
+        try:
+            rates[prefix.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            logger.warning(f"Ignoring invalid request log sample rate: {item!r}")
+    return rates
+
+
+class RequestLoggingMiddleware:
+    """Log every HTTP request with timing, status and error bodies.
+
+    This is a plain ASGI middleware: status and timing are read off the
+    messages passing through ``send``, so responses (including streaming ones)
+    are forwarded untouched. For 4xx/5xx responses the first ``max_error_body``
+    bytes are copied into a side buffer for the log line.
+
+    ``sample_rates`` maps path prefixes to the fraction of successful requests
+    that get logged (longest prefix wins). Error responses and unhandled
+    exceptions are always logged.
+    """
+
+    def __init__(self, app, sample_rates: Optional[Dict[str, float]] = None,
+                 default_sample_rate: float = 1.0, max_error_body: int = 2048):
+        self.app = app
+        self.default_sample_rate = default_sample_rate
+        self.max_error_body = max_error_body
+        # Longest prefixes first so the most specific rule wins
+        self.sample_rates = sorted((sample_rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def _sample_rate(self, path: str) -> float:
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                return rate
+        return self.default_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = str(uuid.uuid4())[:8]
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
+
+        rate = self._sample_rate(path)
+        sampled = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+        if sampled:
+            logger.info(f"[{request_id}] {method} {path} from {client_host}")
+
+        status_code = 500
+        error_body = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, error_body
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if status_code >= 400:
+                    error_body = bytearray()
+            elif message["type"] == "http.response.body" and error_body is not None:
+                room = self.max_error_body - len(error_body)
+                if room > 0:
+                    error_body += message.get("body", b"")[:room]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error(f"[{request_id}] Unhandled exception during {method} {path}: {type(e).__name__}: {e}")
+            logger.error(f"[{request_id}] Traceback: {traceback.format_exc()}")
+            raise
+
+        process_time = time.perf_counter() - start_time
+
+        if status_code >= 400:
+            logger.error(f"[{request_id}] {status_code} {method} {path} completed in {process_time:.3f}s")
+            if error_body:
+                self._log_error_body(request_id, bytes(error_body))
+        elif sampled:
+            logger.info(f"[{request_id}] {status_code} {method} {path} completed in {process_time:.3f}s")
+
+    def _log_error_body(self, request_id: str, body: bytes):
+        text = body.decode("utf-8", errors="replace")
+        try:
+            logger.error(f"[{request_id}] Error response: {json.loads(text)}")
+        except ValueError:
+            logger.error(f"[{request_id}] Error response (raw): {text[:500]}")
+
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Heavy dependencies that should only load when a request needs them.
+# requests is deliberately not one of them: outbound.install() patches
+# requests.Session.send during startup and every router calls it, so
+# deferring the import would only move its cost, not remove it.
+LAZY_MODULES = ("github", "nacl")
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started (Linux only; 10ms resolution)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) follows the parenthesised command name, which may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTracker:
+    """Where cold-start time goes: named import/setup phases, then time to first request.
+
+    Times are measured from when main.py started importing; the interpreter's
+    own startup before that is reported separately where the OS exposes it.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.before_main = _process_age()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_at: Optional[float] = None
+        self.first_request_at: Optional[float] = None
+        self.first_request_path: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark_ready(self):
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+
+    def mark_first_request(self, path: str):
+        if self.first_request_at is None:
+            self.first_request_at = time.perf_counter()
+            self.first_request_path = path
+
+    def _since_start(self, at: Optional[float]) -> Optional[float]:
+        return round((at - self.started) * 1000, 1) if at is not None else None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "before_main_ms": round(self.before_main * 1000, 1) if self.before_main is not None else None,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            "import_total_ms": round(sum(seconds for _, seconds in self.phases) * 1000, 1),
+            "ready_ms": self._since_start(self.ready_at),
+            "first_request_ms": self._since_start(self.first_request_at),
+            "first_request_path": self.first_request_path,
+            "modules_loaded": len(sys.modules),
+            "lazy_modules_loaded": {name: name in sys.modules for name in LAZY_MODULES},
+        }
+
+
+class FirstRequestMiddleware:
+    """Record when the first HTTP request arrives; a plain pass-through afterwards"""
+
+    def __init__(self, app, tracker: StartupTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if self.tracker.first_request_at is None and scope["type"] == "http":
+            self.tracker.mark_first_request(scope["path"])
+        await self.app(scope, receive, send)
+
+
+startup = StartupTracker()
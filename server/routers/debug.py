@@ -0,0 +1,121 @@
+import asyncio
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from observability.loop_monitor import loop_monitor
+from observability.outbound import outbound_recorder
+from observability.startup import startup
+from services.resilience import breakers
+from observability.profiling import SamplingProfiler, cpu_profile_lock, memory_profiler
+from services.github_http import response_cache
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None),
+                        authorization: Optional[str] = Header(None)):
+    """Gate debug endpoints behind DEBUG_ADMIN_TOKEN.
+
+    Without the env var the endpoints answer 404 as if they did not exist, so
+    the router is safe to leave mounted in every build. The token can be sent
+    as ``X-Admin-Token`` or ``Authorization: Bearer``.
+    """
+    expected = os.getenv("DEBUG_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    supplied = x_admin_token
+    if not supplied and authorization and authorization.lower().startswith("bearer "):
+        supplied = authorization[7:]
+    if not supplied or not hmac.compare_digest(supplied.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+MAX_PROFILE_SECONDS = 120
+
+@router.get("/loop-lag")
+async def get_loop_lag(top: int = 10):
+    """Event-loop lag statistics and the routes that blocked the loop the longest"""
+    return loop_monitor.snapshot(top=top)
+
+@router.delete("/loop-lag")
+async def reset_loop_lag():
+    """Clear collected lag samples and offenders"""
+    loop_monitor.reset()
+    return {"status": "reset"}
+
+@router.get("/profile")
+async def cpu_profile(seconds: float = 10, format: str = "collapsed", interval_ms: float = 5):
+    """Sample every thread's stack for N seconds.
+
+    ``format=collapsed`` returns folded stacks for flame graphs;
+    ``format=pstats`` returns a file for ``pstats.Stats``/snakeviz.
+    """
+    if format not in ("collapsed", "pstats"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'pstats'")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}")
+    if not cpu_profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A CPU profile is already running")
+
+    try:
+        profiler = SamplingProfiler(interval=max(interval_ms, 1) / 1000)
+        # The sampler runs on a worker thread so the loop keeps serving the traffic being profiled
+        await asyncio.to_thread(profiler.run, seconds)
+    finally:
+        cpu_profile_lock.release()
+
+    headers = {"X-Profile-Samples": str(profiler.sample_count), "X-Profile-Duration": f"{profiler.duration:.3f}"}
+    if format == "pstats":
+        return Response(
+            content=profiler.pstats_dump(),
+            media_type="application/octet-stream",
+            headers={**headers, "Content-Disposition": 'attachment; filename="profile.pstats"'},
+        )
+    return PlainTextResponse(profiler.collapsed(), headers=headers)
+
+@router.get("/memory")
+async def memory_report(top: int = 20, group_by: str = "lineno"):
+    """Top allocators and growth since the previous call.
+
+    The first call starts tracemalloc and records a baseline; tracing stays on
+    (at some allocation overhead) until ``DELETE /debug/memory``.
+    """
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be 'lineno', 'filename' or 'traceback'")
+    if not memory_profiler.tracing:
+        await asyncio.to_thread(memory_profiler.start)
+        return {"status": "started", "message": "tracemalloc started; call again to see allocations since now"}
+    return await asyncio.to_thread(memory_profiler.report, top, group_by)
+
+@router.delete("/memory")
+async def stop_memory_tracing():
+    """Stop tracemalloc and drop the stored snapshot"""
+    await asyncio.to_thread(memory_profiler.stop)
+    return {"status": "stopped"}
+
+@router.get("/outbound")
+async def outbound_summary():
+    """Latency, status and byte totals per outbound host and route, plus latest rate limits"""
+    summary = outbound_recorder.summary()
+    summary["github_conditional_cache"] = response_cache.stats()
+    summary["circuit_breakers"] = breakers.stats()
+    return summary
+
+@router.delete("/outbound")
+async def reset_outbound():
+    """Clear outbound call statistics and close every circuit breaker"""
+    outbound_recorder.reset()
+    breakers.reset()
+    return {"status": "reset"}
+
+@router.get("/startup")
+async def startup_report():
+    """Import time per startup phase, time until ready and until the first request"""
+    return startup.report()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Outbound call metrics in Prometheus text format"""
+    return PlainTextResponse(outbound_recorder.prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,20 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
+import asyncio
 import os
 import subprocess
 import tempfile
 import shutil
-import requests
-import base64
+import json
+import uuid
+from datetime import datetime
 from logging_config import logger
-from github import Github, GithubException
+from services.http_cache import REVALIDATE_CACHE_CONTROL, cached_json, conditional_json_response
+from services.github_http import GITHUB_API_URL, git_remote_url, redact_credentials
+from routers.debug import require_admin_token
+from services import provisioning
+from services.preflight import run_preflight
+from services.state_store import state_store
+from services.resilience import DEPLOYMENT_DEADLINE, call_timeout, deadline
 
 router = APIRouter()
 
+# Local checkout of the starter pack repository
+SOURCE_BASE = os.getenv("STARTER_PACK_DIR", "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack")
+
+def _pygithub():
+    """PyGithub takes ~100ms to import and only deployments use it, so it loads on first use"""
+    import github
+    return github
+
 def validate_github_token(token, org=None):
     """Validate GitHub token and return (is_valid, username, error_message)"""
+    github = _pygithub()
     try:
-        g = Github(token)
+        g = github.Github(token, base_url=GITHUB_API_URL)
         user = g.get_user()
         username = user.login
         
@@ -22,7 +39,7 @@ def validate_github_token(token, org=None):
         if org:
             try:
                 g.get_organization(org).get_repos(type="all").get_page(0)
-            except GithubException as e:
+            except github.GithubException as e:
                 if e.status == 404:
                     return False, "", f"Organization '{org}' not found or you don't have access"
                 elif e.status == 403:
@@ -33,7 +50,7 @@ def validate_github_token(token, org=None):
             user.get_repos().get_page(0)
             
         return True, username, ""
-    except GithubException as e:
+    except github.GithubException as e:
         if e.status == 401:
             return False, "", "Invalid GitHub token. Please check your Personal Access Token"
         elif e.status == 403:
@@ -45,6 +62,7 @@ def validate_github_token(token, org=None):
 
 def create_github_repo(g, owner, repo_name, is_org):
     """Create GitHub repository. Returns (success, repo_url, error_message)"""
+    github = _pygithub()
     try:
         repo_data = {
             "name": repo_name,
@@ -61,7 +79,7 @@ def create_github_repo(g, owner, repo_name, is_org):
             repo = user.create_repo(**repo_data)
             
         return True, repo.html_url, ""
-    except GithubException as e:
+    except github.GithubException as e:
         if e.status == 422:
             if "already exists" in str(e.data.get('message', '')).lower():
                 return False, "", f"Repository '{repo_name}' already exists. Please choose a different name"
@@ -78,7 +96,7 @@ def create_github_repo(g, owner, repo_name, is_org):
 
 def copy_and_push_files(token, owner, repo_name, source_package, project_name):
     """Copy files from source package and push to GitHub. Returns (success, file_count, error_message)"""
-    source_base = "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack"
+    source_base = SOURCE_BASE
     source_path = os.path.join(source_base, source_package)
     
     if not os.path.exists(source_path):
@@ -109,7 +127,7 @@ def copy_and_push_files(token, owner, repo_name, source_package, project_name):
             subprocess.run(['git', 'branch', '-M', 'main'], cwd=temp_dir, check=True, capture_output=True)
             
             # Add remote and push
-            remote_url = f"https://{token}@github.com/{owner}/{repo_name}.git"
+            remote_url = git_remote_url(token, owner, repo_name)
             subprocess.run(['git', 'remote', 'add', 'origin', remote_url], cwd=temp_dir, check=True, capture_output=True)
             
             # Push with proper error handling
@@ -118,7 +136,7 @@ def copy_and_push_files(token, owner, repo_name, source_package, project_name):
                 cwd=temp_dir,
                 capture_output=True,
                 text=True,
-                timeout=60
+                timeout=call_timeout(60)
             )
             
             if result.returncode != 0:
@@ -135,173 +153,53 @@ def copy_and_push_files(token, owner, repo_name, source_package, project_name):
     except Exception as e:
         return False, 0, f"File operation failed: {str(e)}"
 
-def create_repository_secrets(github_token, owner, repo_name, secrets):
-    """Create repository secrets using GitHub token directly. Returns list of results"""
-    results = []
-    
-    headers = {
-        'Authorization': f'Bearer {github_token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28'
-    }
-    
-    for env_name, token_value in secrets.items():
-        if not token_value:
-            continue
-            
-        try:
-            # Create environment first
-            url = f"https://api.github.com/repos/{owner}/{repo_name}/environments/{env_name}"
-            env_data = {"wait_timer": 0, "reviewers": [], "deployment_branch_policy": None}
-            requests.put(url, headers=headers, json=env_data, timeout=10)
-            
-            # Get public key
-            key_url = f"{url}/secrets/public-key"
-            key_response = requests.get(key_url, headers=headers, timeout=10)
-            
-            if key_response.ok:
-                key_data = key_response.json()
-                
-                # For simplicity, using base64 encoding (should use proper encryption in production)
-                encrypted = base64.b64encode(token_value.encode()).decode()
-                
-                # Create secret
-                secret_url = f"{url}/secrets/TD_API_TOKEN"
-                secret_data = {
-                    "encrypted_value": encrypted,
-                    "key_id": key_data['key_id']
-                }
-                
-                secret_response = requests.put(secret_url, headers=headers, json=secret_data, timeout=10)
-                
-                if secret_response.ok:
-                    results.append({"name": f"{env_name}/TD_API_TOKEN", "status": "created"})
-                else:
-                    results.append({"name": f"{env_name}/TD_API_TOKEN", "status": "failed", "error": secret_response.text})
-            else:
-                results.append({"name": f"{env_name}/TD_API_TOKEN", "status": "failed", "error": "Could not get public key"})
-                
-        except Exception as e:
-            results.append({"name": f"{env_name}/TD_API_TOKEN", "status": "failed", "error": str(e)})
-        
-    return results
+# Shared engine statuses in the shapes this endpoint has always reported
+_LEGACY_STATUS = {"success": "created", "skipped": "skipped", "error": "failed"}
 
-def create_repository_variables(github_token, owner, repo_name, td_region, project_name):
-    """Create repository variables using GitHub token directly. Returns list of results"""
-    results = []
-    
-    # Determine TD endpoint based on region
-    endpoint_map = {
-        'us01': 'https://api-workflow.treasuredata.com',
-        'eu01': 'https://api-workflow.eu01.treasuredata.com',
-        'aws': 'https://api-workflow.treasuredata.com',
-        'aws-east-1': 'https://api-workflow.treasuredata.com',
-        'eu-west-1': 'https://api-workflow.eu01.treasuredata.com'
-    }
-    
-    td_endpoint = endpoint_map.get(td_region, 'https://api-workflow.treasuredata.com')
-    
-    variables = [
-        {'name': 'TD_WF_API_ENDPOINT', 'value': td_endpoint},
-        {'name': 'TD_WF_PROJS', 'value': project_name}
-    ]
-    
-    headers = {
-        'Authorization': f'Bearer {github_token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28'
-    }
-    
-    for var in variables:
-        try:
-            # Try to update first
-            var_url = f"https://api.github.com/repos/{owner}/{repo_name}/actions/variables/{var['name']}"
-            response = requests.patch(var_url, headers=headers, json={'value': var['value']}, timeout=10)
-            
-            if response.status_code == 404:
-                # Create new variable
-                create_url = f"https://api.github.com/repos/{owner}/{repo_name}/actions/variables"
-                response = requests.post(create_url, headers=headers, json=var, timeout=10)
-            
-            if response.ok or response.status_code == 201:
-                results.append({"name": var['name'], "value": var['value'], "status": "created"})
-            else:
-                results.append({"name": var['name'], "status": "failed", "error": response.text})
-                
-        except Exception as e:
-            results.append({"name": var['name'], "status": "failed", "error": str(e)})
-        
-    return results
+def _legacy_result(name, result, **extra):
+    legacy = {"name": name, **extra, "status": _LEGACY_STATUS[result["status"]]}
+    if result["status"] != "success":
+        legacy["error"] = result["message"]
+    return legacy
 
-def create_rulesets_for_repo(github_token, owner, repo_name):
-    """Create repository rulesets using GitHub token directly. Returns list of results"""
-    results = []
-    
-    url = f"https://api.github.com/repos/{owner}/{repo_name}/rulesets"
-    headers = {
-        'Authorization': f'Bearer {github_token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28'
-    }
-    
-    # Main branch protection
-    main_ruleset = {
-        "name": "Main Branch Protection",
-        "target": "branch",
-        "enforcement": "active",
-        "conditions": {
-            "ref_name": {
-                "exclude": [],
-                "include": ["~DEFAULT_BRANCH"]
-            }
-        },
-        "rules": [
-            {"type": "deletion"},
-            {"type": "non_fast_forward"}
-        ],
-        "bypass_actors": []
-    }
-    
-    # Branch naming convention
-    branch_ruleset = {
-        "name": "Branch Naming Convention",
-        "target": "branch",
-        "enforcement": "active",
-        "conditions": {
-            "ref_name": {
-                "exclude": ["refs/heads/main", "refs/heads/master"],
-                "include": ["~ALL"]
-            }
-        },
-        "rules": [
-            {
-                "type": "branch_name_pattern",
-                "parameters": {
-                    "operator": "regex",
-                    "pattern": "^(feat|fix|hot|chore|docs)/[a-z0-9._-]+$",
-                    "negate": False,
-                    "name": "Branch naming: feat/fix/hot/chore/docs"
-                }
-            }
-        ],
-        "bypass_actors": []
-    }
+async def create_repository_secrets(github_token, owner, repo_name, secrets):
+    """Create environment secrets through the shared provisioning engine. Returns list of results"""
+    results = await provisioning.create_environment_secrets(github_token, owner, repo_name, secrets)
+    return [_legacy_result(r["name"], r) for r in results]
+
+async def create_repository_variables(github_token, owner, repo_name, td_region, project_name):
+    """Create repository variables through the shared provisioning engine. Returns list of results"""
+    results = await provisioning.create_variables(github_token, owner, repo_name, project_name, td_region)
+    return [_legacy_result(r["variable"], r, **({"value": r["value"]} if r["status"] == "success" else {}))
+            for r in results]
+
+async def create_rulesets_for_repo(github_token, owner, repo_name):
+    """Create repository rulesets through the shared provisioning engine. Returns list of results"""
+    results = await provisioning.create_rulesets(github_token, owner, repo_name)
+    return [_legacy_result(r["name"], r) for r in results]
+
+@router.post("/preflight")
+async def preflight_deployment(request: dict):
+    """
+    Check everything /create depends on before anything is created, concurrently.
     
-    for ruleset_name, ruleset_data in [("Main Protection", main_ruleset), ("Branch Naming", branch_ruleset)]:
-        try:
-            response = requests.post(url, headers=headers, json=ruleset_data, timeout=15)
-            if response.ok:
-                results.append({"name": ruleset_name, "status": "created"})
-            else:
-                # Check if it's a plan limitation error
-                if response.status_code == 403 and "billing plan" in response.text.lower():
-                    results.append({"name": ruleset_name, "status": "skipped", "error": "Requires GitHub Pro/Team/Enterprise plan"})
-                else:
-                    results.append({"name": ruleset_name, "status": "failed", "error": response.text[:100]})
-        except Exception as e:
-            results.append({"name": ruleset_name, "status": "failed", "error": str(e)})
-            
-    return results
+    Takes the same request body as /create. Reports repo name syntax, source
+    package, token validity and scopes, name availability, organization
+    membership and plan, and each environment's TD API key.
+    """
+    result = await run_preflight(
+        github_token=request.get('github_token'),
+        repo_name=request.get('repo_name'),
+        organization=request.get('organization'),
+        source_base=SOURCE_BASE,
+        source_package=request.get('source_package'),
+        td_region=request.get('td_region', 'us01'),
+        env_tokens=request.get('env_tokens', {})
+    )
+    failed = [check['name'] for check in result['checks'] if check['status'] == 'fail']
+    logger.info(f"Preflight for {request.get('repo_name')}: {'ok' if result['ok'] else 'failed ' + ', '.join(failed)} "
+                f"in {result['duration_ms']}ms")
+    return result
 
 @router.post("/create")
 async def create_deployment(request: dict):
@@ -325,6 +223,40 @@ async def create_deployment(request: dict):
         }
     }
     """
+    job_id = str(uuid.uuid4())
+    await state_store.acreate(job_id, 'deploy', {
+        'status': 'running',
+        'repo_name': request.get('repo_name'),
+        'organization': request.get('organization'),
+        'source_package': request.get('source_package'),
+        'project_name': request.get('project_name'),
+        'started_at': datetime.now().isoformat(),
+        'completed_at': None
+    })
+    
+    try:
+        with deadline(DEPLOYMENT_DEADLINE):
+            response = await _run_deployment(request)
+    except HTTPException as e:
+        await state_store.aupdate(job_id, status='error', error=redact_credentials(str(e.detail), request.get('github_token')), completed_at=datetime.now().isoformat())
+        raise
+    except asyncio.CancelledError:
+        # e.g. a shutdown whose drain timeout ran out; don't leave the job looking like it still runs
+        await state_store.aupdate(job_id, status='cancelled', error='Deployment was interrupted before it finished',
+                           completed_at=datetime.now().isoformat())
+        raise
+    
+    if isinstance(response, JSONResponse):
+        content = json.loads(response.body)
+        await state_store.aupdate(job_id, status='error', error=redact_credentials(content.get('message') or '', request.get('github_token')),
+                           repository_url=content.get('repository_url'), completed_at=datetime.now().isoformat())
+    else:
+        await state_store.aupdate(job_id, status='completed', repository_url=response.get('repository_url'),
+                           completed_at=datetime.now().isoformat())
+    return response
+
+async def _run_deployment(request: dict):
+    """Run every /create step; returns the response /create sends"""
     logger.info(f"🚀 Starting deployment: {request.get('repo_name')}")
     
     warnings = []
@@ -366,7 +298,7 @@ async def create_deployment(request: dict):
         logger.info(f"✅ Token valid for: {owner} (org: {is_org})")
         
         # Create GitHub client
-        g = Github(github_token)
+        g = _pygithub().Github(github_token, base_url=GITHUB_API_URL)
         
         # Step 2: Create repository
         logger.info(f"Step 2: Creating repository: {repo_name}")
@@ -407,7 +339,7 @@ async def create_deployment(request: dict):
         if env_tokens:
             logger.info("Step 4: Creating environment secrets...")
             try:
-                secrets_results = create_repository_secrets(github_token, owner, repo_name, env_tokens)
+                secrets_results = await create_repository_secrets(github_token, owner, repo_name, env_tokens)
                 details["secrets"] = secrets_results
                 
                 failed_secrets = [s for s in secrets_results if s.get("status") == "failed"]
@@ -447,7 +379,7 @@ async def create_deployment(request: dict):
         if td_api_key:
             logger.info("Step 5: Creating repository variables...")
             try:
-                vars_results = create_repository_variables(github_token, owner, repo_name, td_region, project_name)
+                vars_results = await create_repository_variables(github_token, owner, repo_name, td_region, project_name)
                 details["variables"] = vars_results
                 
                 failed_vars = [v for v in vars_results if v.get("status") == "failed"]
@@ -487,7 +419,7 @@ async def create_deployment(request: dict):
         if create_rulesets:
             logger.info("Step 6: Creating repository rulesets...")
             try:
-                ruleset_results = create_rulesets_for_repo(github_token, owner, repo_name)
+                ruleset_results = await create_rulesets_for_repo(github_token, owner, repo_name)
                 details["rulesets"] = ruleset_results
                 
                 # Check for plan limitations (these are acceptable - just warnings)
@@ -552,11 +484,8 @@ async def create_deployment(request: dict):
         
         raise HTTPException(status_code=500, detail=error_msg)
 
-@router.get("/packages")
-async def list_packages():
-    """List available starter packages"""
-    source_base = "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack"
-    
+def _list_packages_payload(source_base: str) -> dict:
+    """Starter packages found in the local source checkout"""
     packages = []
     if os.path.exists(source_base):
         for item in os.listdir(source_base):
@@ -566,4 +495,28 @@ async def list_packages():
                     "name": item.replace('-', ' ').title()
                 })
     
-    return {"packages": packages}
\ No newline at end of file
+    return {"packages": packages}
+
+@router.get("/history", dependencies=[Depends(require_admin_token)])
+async def deployment_history(status: str = None, limit: int = Query(50, ge=1, le=500)):
+    """Recent deployments, newest first, optionally filtered by status"""
+    return {"deployments": await state_store.ahistory(kind='deploy', status=status, limit=limit)}
+
+def _cached_packages(source_base: str):
+    # The directory mtime changes whenever a package is added or removed, so the
+    # listing is only rebuilt (and its ETag only changes) when it actually differs
+    try:
+        version = os.stat(source_base).st_mtime_ns
+    except OSError:
+        version = None
+    return cached_json(("deploy-packages", source_base), lambda: _list_packages_payload(source_base), version)
+
+def warm_caches() -> dict:
+    """Build the package listing ahead of the first request"""
+    return {"packages": len(json.loads(_cached_packages(SOURCE_BASE).body)["packages"])}
+
+@router.get("/packages")
+async def list_packages(request: Request):
+    """List available starter packages"""
+    cached = _cached_packages(SOURCE_BASE)
+    return conditional_json_response(request, cached, REVALIDATE_CACHE_CONTROL)
@@ -1,126 +1,170 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
 import requests
 import base64
 import uuid
+from services.http_cache import STATIC_CACHE_CONTROL, cached_json, conditional_json_response
+from services.github_http import GITHUB_API_URL, GITHUB_RAW_URL, git_remote_url, github_session, redact_credentials
+from services.template_engine import RenderingCopier, precompile_tree, template_values
+from services.state_store import state_store
+from services.io_executor import IOCancelled, run_io, run_io_cancellable
+from services.resilience import DEPLOYMENT_DEADLINE, call_timeout, deadline
+from services import provisioning
+from routers.debug import require_admin_token
 
 router = APIRouter()
 
-# Progress tracking for file copy operations
-copy_progress = {}  # Dict to store progress by session ID
+# Progress for file copy operations lives in the shared state store (by session ID),
+# so any worker can answer a /copy-progress poll
 
 # GitHub repository details
-GITHUB_REPO_URL = "https://api.github.com/repos/treasure-data/se-starter-pack"
-GITHUB_RAW_BASE = "https://raw.githubusercontent.com/treasure-data/se-starter-pack/main"
+GITHUB_REPO_URL = f"{GITHUB_API_URL}/repos/treasure-data/se-starter-pack"
+GITHUB_RAW_BASE = f"{GITHUB_RAW_URL}/treasure-data/se-starter-pack/main"
+
+# Local checkout of the starter pack repository
+SOURCE_DIR = os.getenv("STARTER_PACK_DIR", "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack")
+
+def _starter_packs_payload() -> Dict[str, Any]:
+    """Predefined starter pack catalog"""
+    # For demo, return predefined starter packs
+    return {
+        "packs": [
+            {
+                "id": "qsr",
+                "name": "QSR Starter Pack",
+                "description": "Quick Service Restaurant analytics and customer journey tracking",
+                "type": "QSR",
+                "path": "qsr-starter-pack",
+                "features": [
+                    "Order analytics and sales trends",
+                    "Customer journey mapping", 
+                    "Marketing attribution",
+                    "Cohort analysis",
+                    "Segmentation and targeting",
+                    "Dashboard templates"
+                ],
+                "workflows": [
+                    "wf02_mapping.dig",
+                    "wf03_validate.dig",
+                    "wf04_stage.dig",
+                    "wf05_unify.dig",
+                    "wf06_golden.dig",
+                    "wf07_analytics.dig",
+                    "wf08_create_refresh_master_segment.dig"
+                ]
+            },
+            {
+                "id": "retail",
+                "name": "Retail Starter Pack",
+                "description": "Comprehensive retail analytics with customer insights and product performance",
+                "type": "Retail",
+                "path": "retail-starter-pack",
+                "features": [
+                    "Sales and product analytics",
+                    "Customer lifetime value",
+                    "Inventory optimization insights",
+                    "Cross-sell recommendations",
+                    "Web analytics integration",
+                    "Advanced segmentation"
+                ],
+                "workflows": [
+                    "wf02_mapping.dig",
+                    "wf03_validate.dig", 
+                    "wf04_stage.dig",
+                    "wf05_unify.dig",
+                    "wf06_golden.dig",
+                    "wf07_analytics.dig",
+                    "wf08_create_refresh_master_segment.dig"
+                ]
+            }
+        ]
+    }
 
 @router.get("/starter-packs")
-async def get_starter_packs():
+async def get_starter_packs(request: Request):
     """Get available starter packs from GitHub repository"""
     try:
-        # For demo, return predefined starter packs
-        return {
-            "packs": [
-                {
-                    "id": "qsr",
-                    "name": "QSR Starter Pack",
-                    "description": "Quick Service Restaurant analytics and customer journey tracking",
-                    "type": "QSR",
-                    "path": "qsr-starter-pack",
-                    "features": [
-                        "Order analytics and sales trends",
-                        "Customer journey mapping", 
-                        "Marketing attribution",
-                        "Cohort analysis",
-                        "Segmentation and targeting",
-                        "Dashboard templates"
-                    ],
-                    "workflows": [
-                        "wf02_mapping.dig",
-                        "wf03_validate.dig",
-                        "wf04_stage.dig",
-                        "wf05_unify.dig",
-                        "wf06_golden.dig",
-                        "wf07_analytics.dig",
-                        "wf08_create_refresh_master_segment.dig"
-                    ]
-                },
-                {
-                    "id": "retail",
-                    "name": "Retail Starter Pack",
-                    "description": "Comprehensive retail analytics with customer insights and product performance",
-                    "type": "Retail",
-                    "path": "retail-starter-pack",
-                    "features": [
-                        "Sales and product analytics",
-                        "Customer lifetime value",
-                        "Inventory optimization insights",
-                        "Cross-sell recommendations",
-                        "Web analytics integration",
-                        "Advanced segmentation"
-                    ],
-                    "workflows": [
-                        "wf02_mapping.dig",
-                        "wf03_validate.dig", 
-                        "wf04_stage.dig",
-                        "wf05_unify.dig",
-                        "wf06_golden.dig",
-                        "wf07_analytics.dig",
-                        "wf08_create_refresh_master_segment.dig"
-                    ]
-                }
-            ]
-        }
+        cached = cached_json("starter-packs", _starter_packs_payload)
+        return conditional_json_response(request, cached, STATIC_CACHE_CONTROL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch starter packs: {str(e)}")
 
+def _pack_details_payload() -> Dict[str, Any]:
+    """Mock detailed pack information (same for every known pack)"""
+    # This would fetch from GitHub API
+    # For demo, return mock detailed information
+    return {
+        "configuration": {
+            "src_params.yml": "# Source parameters configuration",
+            "email_ids.yml": "# Email notification configuration", 
+            "schema_map.yml": "# Schema mapping configuration"
+        },
+        "workflows": [
+            {"name": "wf02_mapping.dig", "description": "Data mapping workflow"},
+            {"name": "wf03_validate.dig", "description": "Data validation workflow"},
+            {"name": "wf04_stage.dig", "description": "Data staging workflow"}
+        ]
+    }
+
 @router.get("/pack-details/{pack_name}")
-async def get_pack_details(pack_name: str):
+async def get_pack_details(pack_name: str, request: Request):
     """Get detailed information about a specific starter pack"""
     try:
-        # This would fetch from GitHub API
-        # For demo, return mock detailed information
         if pack_name in ["qsr", "retail"]:
-            return {
-                "configuration": {
-                    "src_params.yml": "# Source parameters configuration",
-                    "email_ids.yml": "# Email notification configuration", 
-                    "schema_map.yml": "# Schema mapping configuration"
-                },
-                "workflows": [
-                    {"name": "wf02_mapping.dig", "description": "Data mapping workflow"},
-                    {"name": "wf03_validate.dig", "description": "Data validation workflow"},
-                    {"name": "wf04_stage.dig", "description": "Data staging workflow"}
-                ]
-            }
+            cached = cached_json(("pack-details", pack_name), _pack_details_payload)
+            return conditional_json_response(request, cached, STATIC_CACHE_CONTROL)
         else:
             raise HTTPException(status_code=404, detail="Starter pack not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch pack details: {str(e)}")
 
+def _pack_files_payload() -> Dict[str, Any]:
+    """Mock file structure of a starter pack"""
+    # This would fetch actual files from GitHub
+    # For demo, return mock file structure
+    return {
+        "files": [
+            {
+                "name": "config/src_params.yml",
+                "type": "yml",
+                "content": "# Source parameters\ndatabase: ${TD_DATABASE}\ntable_prefix: ${TABLE_PREFIX}"
+            },
+            {
+                "name": "wf02_mapping.dig", 
+                "type": "dig",
+                "content": "timezone: UTC\nschedule:\n  daily>: 02:00:00"
+            }
+        ]
+    }
+
 @router.get("/pack-files/{pack_name}")
-async def get_pack_files(pack_name: str):
+async def get_pack_files(pack_name: str, request: Request):
     """Get all files in a starter pack"""
     try:
-        # This would fetch actual files from GitHub
-        # For demo, return mock file structure
-        return {
-            "files": [
-                {
-                    "name": "config/src_params.yml",
-                    "type": "yml",
-                    "content": "# Source parameters\ndatabase: ${TD_DATABASE}\ntable_prefix: ${TABLE_PREFIX}"
-                },
-                {
-                    "name": "wf02_mapping.dig", 
-                    "type": "dig",
-                    "content": "timezone: UTC\nschedule:\n  daily>: 02:00:00"
-                }
-            ]
-        }
+        # Every pack name gets the same payload; one key keeps arbitrary names from growing the cache
+        cached = cached_json("pack-files", _pack_files_payload)
+        return conditional_json_response(request, cached, STATIC_CACHE_CONTROL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch pack files: {str(e)}")
 
+def warm_caches() -> Dict[str, Any]:
+    """Serialize the catalog responses and compile the pack templates ahead of the first request"""
+    catalog = [("starter-packs", _starter_packs_payload), ("packages", _available_packages_payload),
+               ("pack-files", _pack_files_payload)]
+    for pack_name in ("qsr", "retail"):
+        catalog.append((("pack-details", pack_name), _pack_details_payload))
+    for key, build in catalog:
+        cached_json(key, build)
+    templates = precompile_tree(SOURCE_DIR) if os.path.isdir(SOURCE_DIR) else 0
+    return {"catalog_responses": len(catalog), "templates_compiled": templates}
 
 class EnvironmentSecrets(BaseModel):
     prod: str = None
@@ -143,20 +187,21 @@ class PackageCopyRequest(BaseModel):
     create_ruleset: bool = True  # Whether to create repository ruleset (default True)
     environment_secrets: EnvironmentSecrets = EnvironmentSecrets()  # Environment secrets for TD_API_TOKEN
     td_credentials: TDCredentials = None  # TD credentials for region information
+    parameters: Dict[str, Any] = None  # Values for ${NAME} placeholders, rendered into files while staging
 
 def get_github_tree(repo_owner: str, repo_name: str, path: str = "") -> List[Dict[str, Any]]:
     """Get the file tree from GitHub repository"""
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/git/trees/main"
+    url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/git/trees/main"
     if path:
         # Get tree for specific path
-        url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{path}"
+        url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/contents/{path}"
     
     headers = {
         'Accept': 'application/vnd.github+json',
         'X-GitHub-Api-Version': '2022-11-28'
     }
     
-    response = requests.get(url, headers=headers)
+    response = github_session.get(url, headers=headers, timeout=10)
     if not response.ok:
         raise HTTPException(status_code=response.status_code, 
                           detail=f"Failed to fetch repository tree: {response.text}")
@@ -173,7 +218,7 @@ def get_package_files_from_github(package_name: str, github_token: str = None) -
     # GitHub repository details
     repo_owner = "treasure-data"
     repo_name = "se-starter-pack"
-    base_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}"
+    base_url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}"
     
     print(f"Starting to fetch files for package: {package_name}")
     print(f"GitHub repository: {repo_owner}/{repo_name}")
@@ -195,7 +240,7 @@ def get_package_files_from_github(package_name: str, github_token: str = None) -
             headers['Authorization'] = f'Bearer {github_token}'
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = github_session.get(url, headers=headers, timeout=10)
             if not response.ok:
                 print(f"Failed to fetch directory {path}: {response.status_code} - {response.text}")
                 return []
@@ -206,7 +251,7 @@ def get_package_files_from_github(package_name: str, github_token: str = None) -
             for item in contents:
                 if item['type'] == 'file':
                     # Get file content
-                    file_response = requests.get(item['download_url'], timeout=10)
+                    file_response = github_session.get(item['download_url'], timeout=10)
                     if file_response.ok:
                         try:
                             # Try to decode as text
@@ -255,364 +300,27 @@ def get_package_files_from_github(package_name: str, github_token: str = None) -
 
 
 
-def create_repository_rulesets(token: str, owner: str, repo: str) -> Dict[str, Any]:
+async def create_repository_rulesets(token: str, owner: str, repo: str) -> Dict[str, Any]:
     """Create repository rulesets with branch naming rules and main branch protection"""
-    url = f"https://api.github.com/repos/{owner}/{repo}/rulesets"
-    
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28',
-        'Content-Type': 'application/json'
-    }
-    
-    results = []
-    
-    # Ruleset 1: Branch naming enforcement for feature branches
-    branch_naming_ruleset = {
-        "name": "Enforce Branch Names",
-        "target": "branch",
-        "enforcement": "active",
-        "conditions": {
-            "ref_name": {
-                "exclude": ["refs/heads/main"],
-                "include": ["~ALL"]
-            }
-        },
-        "rules": [
-            {
-                "type": "non_fast_forward"
-            },
-            {
-                "type": "branch_name_pattern",
-                "parameters": {
-                    "operator": "regex",
-                    "pattern": "^(feat|fix|hot)/[a-z0-9._-]+$",
-                    "negate": False,
-                    "name": "Enforce feature branch naming convention"
-                }
-            }
-        ],
-        "bypass_actors": []
-    }
-    
-    # Ruleset 2: Main branch protection - minimal working version
-    main_branch_ruleset = {
-        "name": "Main Branch Protection",
-        "target": "branch", 
-        "enforcement": "active",
-        "conditions": {
-            "ref_name": {
-                "exclude": [],
-                "include": ["~DEFAULT_BRANCH"]
-            }
-        },
-        "rules": [
-            {
-                "type": "deletion"  # Prevent deletion of main branch
-            },
-            {
-                "type": "non_fast_forward"  # Prevent force pushes
-            }
-        ],
-        "bypass_actors": []
-    }
-    
-    rulesets = [
-        ("Branch Naming", branch_naming_ruleset),
-        ("Main Branch Protection", main_branch_ruleset)
-    ]
-    
-    for ruleset_name, ruleset_data in rulesets:
-        print(f"Creating {ruleset_name} ruleset for {owner}/{repo}...")
-        print(f"Ruleset data: {ruleset_data}")
-        
-        try:
-            response = requests.post(url, headers=headers, json=ruleset_data, timeout=15)
-            print(f"Response status: {response.status_code}")
-            print(f"Response body: {response.text}")
-            
-            if response.ok:
-                print(f"✅ Created {ruleset_name} ruleset successfully")
-                results.append({
-                    "name": ruleset_name,
-                    "status": "success",
-                    "id": response.json().get("id"),
-                    "message": f"{ruleset_name} ruleset created successfully"
-                })
-            else:
-                error_details = ""
-                try:
-                    error_json = response.json()
-                    if 'message' in error_json:
-                        error_details = f" - {error_json['message']}"
-                    if 'errors' in error_json:
-                        error_details += f" - Errors: {error_json['errors']}"
-                except:
-                    error_details = f" - {response.text[:200]}"
-                
-                error_msg = f"Failed to create {ruleset_name} ruleset: {response.status_code}{error_details}"
-                print(f"❌ {error_msg}")
-                
-                # Special handling for branch naming ruleset - try fallback
-                if ruleset_name == "Branch Naming" and response.status_code == 422:
-                    print(f"ℹ️ Attempting fallback: Basic branch protection without naming pattern...")
-                    
-                    # Create fallback ruleset with just non_fast_forward
-                    fallback_ruleset = {
-                        "name": "Basic Branch Protection",
-                        "target": "branch",
-                        "enforcement": "active",
-                        "conditions": {
-                            "ref_name": {
-                                "exclude": ["refs/heads/main"],
-                                "include": ["~ALL"]
-                            }
-                        },
-                        "rules": [
-                            {
-                                "type": "non_fast_forward"
-                            }
-                        ],
-                        "bypass_actors": []
-                    }
-                    
-                    try:
-                        fallback_response = requests.post(url, headers=headers, json=fallback_ruleset, timeout=15)
-                        if fallback_response.ok:
-                            print(f"✅ Created fallback Basic Branch Protection ruleset")
-                            results.append({
-                                "name": "Basic Branch Protection (Fallback)",
-                                "status": "success",
-                                "id": fallback_response.json().get("id"),
-                                "message": "Basic branch protection created (branch naming pattern not supported)"
-                            })
-                        else:
-                            print(f"❌ Fallback also failed: {fallback_response.status_code}")
-                            results.append({
-                                "name": ruleset_name,
-                                "status": "error",
-                                "message": error_msg + " (fallback also failed)"
-                            })
-                    except Exception as fallback_error:
-                        print(f"❌ Fallback error: {fallback_error}")
-                        results.append({
-                            "name": ruleset_name,
-                            "status": "error",
-                            "message": error_msg + f" (fallback error: {fallback_error})"
-                        })
-                else:
-                    results.append({
-                        "name": ruleset_name,
-                        "status": "error",
-                        "message": error_msg
-                    })
-                
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Network error creating {ruleset_name} ruleset: {str(e)}"
-            print(f"❌ {error_msg}")
-            results.append({
-                "name": ruleset_name,
-                "status": "error",
-                "message": error_msg
-            })
-    
+    results = await provisioning.create_rulesets(token, owner, repo)
     return {"results": results, "total_rulesets": len(results)}
 
-def create_github_environment_secrets(token: str, owner: str, repo: str, environment_secrets: EnvironmentSecrets) -> Dict[str, Any]:
+async def create_github_environment_secrets(token: str, owner: str, repo: str, environment_secrets: EnvironmentSecrets) -> Dict[str, Any]:
     """Create GitHub environment secrets for TD_API_TOKEN"""
-    results = []
-    
-    for env_name, api_token in [("prod", environment_secrets.prod), ("qa", environment_secrets.qa), ("dev", environment_secrets.dev)]:
-        if not api_token:
-            continue
-            
-        print(f"Creating {env_name} environment and setting TD_API_TOKEN secret...")
-        
-        try:
-            # Step 1: Create environment
-            env_url = f"https://api.github.com/repos/{owner}/{repo}/environments/{env_name}"
-            env_headers = {
-                'Authorization': f'Bearer {token}',
-                'Accept': 'application/vnd.github+json',
-                'X-GitHub-Api-Version': '2022-11-28',
-                'Content-Type': 'application/json'
-            }
-            
-            env_data = {
-                "wait_timer": 0,
-                "reviewers": [],
-                "deployment_branch_policy": None
-            }
-            
-            env_response = requests.put(env_url, headers=env_headers, json=env_data, timeout=10)
-            if env_response.ok:
-                print(f"✅ Created {env_name} environment")
-            else:
-                print(f"⚠️ Environment {env_name} creation warning: {env_response.status_code} - {env_response.text}")
-            
-            # Step 2: Get public key for secret encryption
-            public_key_url = f"https://api.github.com/repos/{owner}/{repo}/environments/{env_name}/secrets/public-key"
-            public_key_response = requests.get(public_key_url, headers=env_headers, timeout=10)
-            
-            if not public_key_response.ok:
-                raise Exception(f"Failed to get public key for {env_name}: {public_key_response.status_code}")
-            
-            public_key_data = public_key_response.json()
-            
-            # Step 3: Encrypt the secret using PyNaCl (proper encryption)
-            import base64  # Import base64 first for all cases
-            
-            try:
-                from nacl import encoding, public
-                
-                # Decode the public key
-                public_key_bytes = base64.b64decode(public_key_data['key'])
-                
-                # Create a Box for encryption
-                public_key_obj = public.PublicKey(public_key_bytes)
-                sealed_box = public.SealedBox(public_key_obj)
-                
-                # Encrypt the secret
-                encrypted_bytes = sealed_box.encrypt(api_token.encode('utf-8'))
-                encrypted_value = base64.b64encode(encrypted_bytes).decode('utf-8')
-                
-            except ImportError:
-                # Fallback to base64 if PyNaCl is not available
-                encrypted_value = base64.b64encode(api_token.encode('utf-8')).decode('utf-8')
-                print(f"⚠️ Warning: Using base64 fallback for {env_name} - install PyNaCl for proper encryption")
-            
-            # Step 4: Set the secret
-            secret_url = f"https://api.github.com/repos/{owner}/{repo}/environments/{env_name}/secrets/TD_API_TOKEN"
-            secret_data = {
-                "encrypted_value": encrypted_value,
-                "key_id": public_key_data['key_id']
-            }
-            
-            secret_response = requests.put(secret_url, headers=env_headers, json=secret_data, timeout=10)
-            
-            if secret_response.ok:
-                print(f"✅ Set TD_API_TOKEN secret for {env_name} environment")
-                results.append({
-                    "environment": env_name,
-                    "status": "success",
-                    "message": f"TD_API_TOKEN secret set for {env_name}"
-                })
-            else:
-                error_msg = f"Failed to set secret for {env_name}: {secret_response.status_code} - {secret_response.text}"
-                print(f"❌ {error_msg}")
-                results.append({
-                    "environment": env_name,
-                    "status": "error",
-                    "message": error_msg
-                })
-                
-        except Exception as e:
-            error_msg = f"Error setting up {env_name} environment: {str(e)}"
-            print(f"❌ {error_msg}")
-            results.append({
-                "environment": env_name,
-                "status": "error",
-                "message": error_msg
-            })
-    
+    results = await provisioning.create_environment_secrets(token, owner, repo, {
+        "prod": environment_secrets.prod, "qa": environment_secrets.qa, "dev": environment_secrets.dev
+    })
     return {"results": results, "total_environments": len(results)}
 
-def create_github_repository_variables(token: str, owner: str, repo: str, project_name: str, td_region: str) -> Dict[str, Any]:
+async def create_github_repository_variables(token: str, owner: str, repo: str, project_name: str, td_region: str) -> Dict[str, Any]:
     """Create GitHub repository variables for TD workflow configuration"""
-    results = []
-    
-    # Determine API endpoint based on region
-    # Map US regions to standard US endpoint, EU to EU endpoint  
-    print(f"Determining TD_WF_API_ENDPOINT for region: {td_region}")
-    
-    if td_region.startswith('us') or td_region in ['us01', 'aws', 'aws-east-1']:
-        td_api_endpoint = 'https://api-workflow.treasuredata.com'
-        print(f"Region '{td_region}' mapped to US endpoint: {td_api_endpoint}")
-    elif td_region.startswith('eu') or td_region in ['eu01', 'eu-west-1']:
-        td_api_endpoint = 'https://api-workflow.eu01.treasuredata.com'
-        print(f"Region '{td_region}' mapped to EU endpoint: {td_api_endpoint}")
-    else:
-        # Default to US for any other regions
-        td_api_endpoint = 'https://api-workflow.treasuredata.com'
-        print(f"Region '{td_region}' not recognized, defaulting to US endpoint: {td_api_endpoint}")
-    
-    # Variables to create
-    print(f"Setting TD_WF_PROJS to project name: {project_name}")
-    
-    variables = [
-        {
-            'name': 'TD_WF_API_ENDPOINT',
-            'value': td_api_endpoint,
-            'description': 'Treasure Data Workflow API endpoint'
-        },
-        {
-            'name': 'TD_WF_PROJS',
-            'value': project_name,
-            'description': 'Treasure Data Workflow project name'
-        }
-    ]
-    
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28',
-        'Content-Type': 'application/json'
-    }
-    
-    for var in variables:
-        print(f"Creating repository variable: {var['name']} = {var['value']}")
-        
-        try:
-            # Create or update repository variable
-            var_url = f"https://api.github.com/repos/{owner}/{repo}/actions/variables/{var['name']}"
-            var_data = {
-                'name': var['name'],
-                'value': var['value']
-            }
-            
-            # Try to update first (in case it exists)
-            response = requests.patch(var_url, headers=headers, json={'value': var['value']}, timeout=10)
-            
-            if response.status_code == 404:
-                # Variable doesn't exist, create it
-                create_url = f"https://api.github.com/repos/{owner}/{repo}/actions/variables"
-                response = requests.post(create_url, headers=headers, json=var_data, timeout=10)
-            
-            if response.ok or response.status_code == 201:
-                print(f"✅ Set repository variable: {var['name']} = {var['value']}")
-                results.append({
-                    "variable": var['name'],
-                    "value": var['value'],
-                    "status": "success",
-                    "message": f"Repository variable {var['name']} set successfully"
-                })
-            else:
-                error_msg = f"Failed to set variable {var['name']}: {response.status_code} - {response.text}"
-                print(f"❌ {error_msg}")
-                results.append({
-                    "variable": var['name'],
-                    "value": var['value'],
-                    "status": "error",
-                    "message": error_msg
-                })
-                
-        except Exception as e:
-            error_msg = f"Error setting variable {var['name']}: {str(e)}"
-            print(f"❌ {error_msg}")
-            results.append({
-                "variable": var['name'],
-                "value": var['value'],
-                "status": "error",
-                "message": error_msg
-            })
-    
+    results = await provisioning.create_variables(token, owner, repo, project_name, td_region)
     return {"results": results, "total_variables": len(results)}
 
 def create_github_file(token: str, owner: str, repo: str, file_path: str, content: str, 
                       message: str, encoding: str = 'utf-8') -> Dict[str, Any]:
     """Create a file in GitHub repository"""
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}"
     
     print(f"Creating GitHub file: {url}")
     print(f"Owner: {owner}, Repo: {repo}, File: {file_path}")
@@ -665,6 +373,74 @@ def create_github_file(token: str, owner: str, repo: str, file_path: str, conten
         error_msg = f"Network error creating file {file_path}: {str(e)}"
         raise HTTPException(status_code=500, detail=error_msg)
 
+# Running copy-package tasks in this worker, by session ID
+_copy_tasks: Dict[str, asyncio.Task] = {}
+
+# How often a running copy checks the state store for a cancel sent to another worker
+CANCEL_POLL_INTERVAL = float(os.getenv("CANCEL_POLL_INTERVAL", "1.0"))
+CANCEL_WAIT_TIMEOUT = float(os.getenv("CANCEL_WAIT_TIMEOUT", "10"))
+
+FINISHED_STATUSES = ('completed', 'error', 'cancelled')
+
+async def _cancel_requested(session_id: str) -> bool:
+    return bool(((await state_store.aget(session_id)) or {}).get('cancel_requested'))
+
+async def _watch_for_cancel(session_id: str, task: asyncio.Task):
+    """Cancel ``task`` once the session is flagged, even if the DELETE reached a different worker"""
+    while not task.done():
+        await asyncio.sleep(CANCEL_POLL_INTERVAL)
+        if await _cancel_requested(session_id):
+            task.cancel()
+            return
+
+async def _run_git(args: List[str], cwd: str = None, check: bool = False,
+                   timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """Run a git command without blocking the event loop.
+
+    Drop-in for ``subprocess.run(..., capture_output=True, text=True)``. If the
+    calling task is cancelled or the timeout expires, the child is killed
+    instead of being left to finish on its own. The timeout is capped by the
+    deployment deadline.
+    """
+    timeout = call_timeout(timeout)
+    process = await asyncio.create_subprocess_exec(
+        *args, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+        if process.returncode is None:
+            process.kill()
+            await asyncio.shield(process.wait())
+        if isinstance(e, asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(args, timeout)
+        raise
+
+    result = subprocess.CompletedProcess(args, process.returncode, stdout.decode(errors='replace'),
+                                         stderr.decode(errors='replace'))
+    if check:
+        result.check_returncode()
+    return result
+
+def _delete_repository(token: str, owner: str, repo: str) -> Dict[str, Any]:
+    """Roll back a repository created by a cancelled copy (needs the delete_repo scope)"""
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Accept': 'application/vnd.github+json',
+        'X-GitHub-Api-Version': '2022-11-28'
+    }
+    try:
+        response = requests.delete(f"{GITHUB_API_URL}/repos/{owner}/{repo}", headers=headers, timeout=30)
+    except requests.exceptions.RequestException as e:
+        return {'status': 'error', 'message': f"Failed to delete {owner}/{repo}: {str(e)}"}
+
+    if response.status_code == 204:
+        print(f"🗑️ Deleted repository {owner}/{repo}")
+        return {'status': 'deleted', 'message': f"Deleted {owner}/{repo}"}
+    if response.status_code == 403:
+        return {'status': 'error', 'message': f"Token can't delete {owner}/{repo}; it needs the delete_repo scope"}
+    return {'status': 'error', 'message': f"Failed to delete {owner}/{repo}: {response.status_code} - {response.text[:200]}"}
+
 @router.post("/copy-package")
 async def copy_package_to_github(request: PackageCopyRequest):
     """Copy package files to GitHub repository using git operations"""
@@ -693,8 +469,12 @@ async def copy_package_to_github(request: PackageCopyRequest):
     print(f"Using session ID: {session_id}")
     
     # Initialize progress tracking
-    copy_progress[session_id] = {
+    await state_store.acreate(session_id, 'copy-package', {
         'status': 'starting',
+        'repo_name': request.repo_name,
+        'organization': request.organization,
+        'package_name': request.package_name,
+        'project_name': request.project_name,
         'total_files': 0,
         'files_processed': 0,
         'files_created': 0,
@@ -703,16 +483,31 @@ async def copy_package_to_github(request: PackageCopyRequest):
         'errors': [],
         'started_at': None,
         'completed_at': None
-    }
+    })
     
+    # The task copies the current context, deadline included
+    with deadline(DEPLOYMENT_DEADLINE):
+        task = asyncio.ensure_future(_copy_package(request, session_id))
+    _copy_tasks[session_id] = task
+    watcher = asyncio.ensure_future(_watch_for_cancel(session_id, task))
     try:
-        import subprocess
-        import tempfile
-        import shutil
-        import os
-        
-        copy_progress[session_id]['status'] = 'cloning_source'
-        copy_progress[session_id]['started_at'] = __import__('datetime').datetime.now().isoformat()
+        return await task
+    except asyncio.CancelledError:
+        if task.cancelled() and await _cancel_requested(session_id):
+            raise HTTPException(status_code=409, detail=f"Deployment {session_id} was cancelled")
+        raise
+    finally:
+        watcher.cancel()
+        _copy_tasks.pop(session_id, None)
+
+
+async def _copy_package(request: PackageCopyRequest, session_id: str):
+    """The copy-package pipeline; runs as a task so it can be cancelled"""
+    owner = None
+    repo_created = False
+    
+    try:
+        await state_store.aupdate(session_id, status='cloning_source', started_at=__import__('datetime').datetime.now().isoformat())
         
         # Validate GitHub token first
         print(f"Validating GitHub token...")
@@ -725,8 +520,9 @@ async def copy_package_to_github(request: PackageCopyRequest):
                 'User-Agent': 'TD-Value-Accelerator/1.0'
             }
             
-            user_response = requests.get(
-                "https://api.github.com/user",
+            user_response = await asyncio.to_thread(
+                github_session.get,
+                f"{GITHUB_API_URL}/user",
                 headers=headers,
                 timeout=15  # Increased timeout
             )
@@ -792,7 +588,7 @@ async def copy_package_to_github(request: PackageCopyRequest):
             raise HTTPException(status_code=500, detail=error_msg)
         
         # Use local source directory and temporary directory for destination
-        source_dir = "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack"
+        source_dir = SOURCE_DIR
         if not os.path.exists(source_dir):
             raise HTTPException(status_code=500, detail=f"Source directory not found: {source_dir}")
         
@@ -805,19 +601,17 @@ async def copy_package_to_github(request: PackageCopyRequest):
             print(f"Using temp directory: {temp_dir}")
             
             # Step 1: Skip source cloning (using local directory)
-            copy_progress[session_id]['status'] = 'preparing_source'
-            copy_progress[session_id]['current_file'] = 'Using local source directory'
+            await state_store.aupdate(session_id, status='preparing_source', current_file='Using local source directory')
             print(f"Using local source directory...")
             
             # Step 2: Create GitHub repository first
-            copy_progress[session_id]['status'] = 'creating_repository'
-            copy_progress[session_id]['current_file'] = 'Creating GitHub repository'
+            await state_store.aupdate(session_id, status='creating_repository', current_file='Creating GitHub repository')
             print(f"Creating GitHub repository: {owner}/{request.repo_name}")
             
             # Create the repository on GitHub first
-            github_create_url = f"https://api.github.com/user/repos"
+            github_create_url = f"{GITHUB_API_URL}/user/repos"
             if request.organization:
-                github_create_url = f"https://api.github.com/orgs/{request.organization}/repos"
+                github_create_url = f"{GITHUB_API_URL}/orgs/{request.organization}/repos"
             
             repo_data = {
                 "name": request.repo_name,
@@ -832,7 +626,9 @@ async def copy_package_to_github(request: PackageCopyRequest):
                 'X-GitHub-Api-Version': '2022-11-28'
             }
             
-            repo_response = requests.post(github_create_url, headers=headers, json=repo_data, timeout=30)
+            repo_response = await asyncio.to_thread(
+                requests.post, github_create_url, headers=headers, json=repo_data, timeout=30
+            )
             if not repo_response.ok and repo_response.status_code != 422:  # 422 = repo already exists
                 error_msg = f"Failed to create repository: {repo_response.status_code} - {repo_response.text}"
                 print(f"❌ {error_msg}")
@@ -840,24 +636,23 @@ async def copy_package_to_github(request: PackageCopyRequest):
             elif repo_response.status_code == 422:
                 print(f"ℹ️ Repository {owner}/{request.repo_name} already exists, continuing...")
             else:
+                repo_created = True
                 print(f"✅ Repository {owner}/{request.repo_name} created successfully")
             
             # Step 3: Initialize local repository
-            copy_progress[session_id]['status'] = 'preparing_destination'
-            copy_progress[session_id]['current_file'] = 'Preparing local repository'
+            await state_store.aupdate(session_id, status='preparing_destination', current_file='Preparing local repository')
             print(f"Initializing local repository...")
             
-            subprocess.run(['git', 'init', dest_dir], check=True)
-            dest_repo_url = f"https://{request.github_token}@github.com/{owner}/{request.repo_name}.git"
-            subprocess.run(['git', 'remote', 'add', 'origin', dest_repo_url], cwd=dest_dir, check=True)
-            subprocess.run(['git', 'config', 'user.name', 'TD Value Accelerator'], cwd=dest_dir, check=True)
-            subprocess.run(['git', 'config', 'user.email', 'noreply@treasuredata.com'], cwd=dest_dir, check=True)
+            await _run_git(['git', 'init', dest_dir], check=True)
+            dest_repo_url = git_remote_url(request.github_token, owner, request.repo_name)
+            await _run_git(['git', 'remote', 'add', 'origin', dest_repo_url], cwd=dest_dir, check=True)
+            await _run_git(['git', 'config', 'user.name', 'TD Value Accelerator'], cwd=dest_dir, check=True)
+            await _run_git(['git', 'config', 'user.email', 'noreply@treasuredata.com'], cwd=dest_dir, check=True)
             
             print(f"✅ Local repository initialized")
             
             # Step 4: Copy package files
-            copy_progress[session_id]['status'] = 'copying_files'
-            copy_progress[session_id]['current_file'] = f'Copying {request.package_name} files'
+            await state_store.aupdate(session_id, status='copying_files', current_file=f'Copying {request.package_name} files')
             print(f"Copying {request.package_name} files...")
             
             source_package_path = f"{source_dir}/{request.package_name}"
@@ -868,55 +663,66 @@ async def copy_package_to_github(request: PackageCopyRequest):
             dest_project_path = f"{dest_dir}/{request.project_name}"
             os.makedirs(dest_project_path, exist_ok=True)
             
+            # Render ${NAME} placeholders as files are copied, if parameters were given
+            copy_function = RenderingCopier(template_values(request.parameters)) if request.parameters else shutil.copy2
+            
             # Copy all package files to project folder
             print(f"Copying from {source_package_path} to {dest_project_path}")
-            for item in os.listdir(source_package_path):
-                s = os.path.join(source_package_path, item)
-                d = os.path.join(dest_project_path, item)
-                if os.path.isdir(s):
-                    shutil.copytree(s, d, dirs_exist_ok=True)
-                    print(f"  📁 Copied directory: {item}")
-                else:
-                    shutil.copy2(s, d)
-                    print(f"  📄 Copied file: {item}")
+            def copy_package_files(cancelled):
+                # Stop between files once the deployment is cancelled, before the temp dir is removed
+                def copy_file(src, dst):
+                    if cancelled.is_set():
+                        raise IOCancelled()
+                    return copy_function(src, dst)
+
+                for item in os.listdir(source_package_path):
+                    s = os.path.join(source_package_path, item)
+                    d = os.path.join(dest_project_path, item)
+                    if os.path.isdir(s):
+                        shutil.copytree(s, d, dirs_exist_ok=True, copy_function=copy_file)
+                        print(f"  📁 Copied directory: {item}")
+                    else:
+                        copy_file(s, d)
+                        print(f"  📄 Copied file: {item}")
+            
+            await run_io_cancellable(copy_package_files)
+            
+            if request.parameters:
+                print(f"✅ Rendered parameters into {copy_function.rendered} template files")
             
             print(f"✅ Copied package files to {request.project_name} folder")
             
             # Step 5: Copy GitHub Actions workflows to root
-            copy_progress[session_id]['current_file'] = 'Copying GitHub Actions workflows'
+            await state_store.aupdate(session_id, current_file='Copying GitHub Actions workflows')
             print(f"Looking for GitHub Actions workflows...")
             
             # Check for .github directory in the source repo root
             source_github_dir = f"{source_dir}/.github"
             if os.path.exists(source_github_dir):
                 dest_github_dir = f"{dest_dir}/.github"
-                shutil.copytree(source_github_dir, dest_github_dir, dirs_exist_ok=True)
+                await run_io(shutil.copytree, source_github_dir, dest_github_dir, dirs_exist_ok=True)
                 print(f"✅ Copied .github directory to repository root")
             else:
                 print(f"ℹ️ No .github directory found in source repository")
             
             # Count files for progress tracking (exclude .git)
-            file_count = 0
-            for root, dirs, files in os.walk(dest_dir):
-                if '.git' in root:
-                    continue
-                file_count += len(files)
+            def count_files():
+                return sum(len(files) for root, dirs, files in os.walk(dest_dir) if '.git' not in root)
             
-            copy_progress[session_id]['total_files'] = file_count
-            copy_progress[session_id]['files_created'] = file_count
+            file_count = await run_io(count_files)
+            
+            await state_store.aupdate(session_id, total_files=file_count, files_created=file_count)
             
             print(f"✅ Total files in repository: {file_count}")
             
             # Step 6: Commit and push changes
-            copy_progress[session_id]['status'] = 'committing'
-            copy_progress[session_id]['current_file'] = 'Committing changes'
+            await state_store.aupdate(session_id, status='committing', current_file='Committing changes')
             print(f"Committing changes...")
             
-            subprocess.run(['git', 'add', '.'], cwd=dest_dir, check=True)
+            await _run_git(['git', 'add', '.'], cwd=dest_dir, check=True)
             
             # Check if there are changes to commit
-            status_result = subprocess.run(['git', 'status', '--porcelain'], 
-                                         cwd=dest_dir, capture_output=True, text=True, check=True)
+            status_result = await _run_git(['git', 'status', '--porcelain'], cwd=dest_dir, check=True)
             
             if status_result.stdout.strip():
                 commit_message = f"Deploy {request.package_name} to {request.project_name}\n\n" \
@@ -924,22 +730,21 @@ async def copy_package_to_github(request: PackageCopyRequest):
                                f"- Project: {request.project_name}\n" \
                                f"- Files: {file_count}\n\n" \
                                f"🤖 Generated with TD Value Accelerator"
-                subprocess.run(['git', 'commit', '-m', commit_message], cwd=dest_dir, check=True)
+                await _run_git(['git', 'commit', '-m', commit_message], cwd=dest_dir, check=True)
                 
-                copy_progress[session_id]['status'] = 'pushing'
-                copy_progress[session_id]['current_file'] = 'Pushing to GitHub'
+                await state_store.aupdate(session_id, status='pushing', current_file='Pushing to GitHub')
                 print(f"Pushing to GitHub...")
                 
                 # Set the default branch to main
-                subprocess.run(['git', 'branch', '-M', 'main'], cwd=dest_dir, check=True)
+                await _run_git(['git', 'branch', '-M', 'main'], cwd=dest_dir, check=True)
                 
-                push_result = subprocess.run(['git', 'push', '-u', 'origin', 'main'], 
-                                           cwd=dest_dir, capture_output=True, text=True, timeout=120)
+                push_result = await _run_git(['git', 'push', '-u', 'origin', 'main'], 
+                                           cwd=dest_dir, timeout=120)
                 
                 if push_result.returncode != 0:
                     # Try 'master' branch if 'main' fails
-                    push_result = subprocess.run(['git', 'push', 'origin', 'master'], 
-                                               cwd=dest_dir, capture_output=True, text=True, timeout=120)
+                    push_result = await _run_git(['git', 'push', 'origin', 'master'], 
+                                               cwd=dest_dir, timeout=120)
                 
                 if push_result.returncode != 0:
                     error_msg = f"Failed to push to GitHub: {push_result.stderr}"
@@ -952,14 +757,13 @@ async def copy_package_to_github(request: PackageCopyRequest):
         
         # Step 7: Create repository rulesets (if requested)
         if request.create_ruleset:
-            copy_progress[session_id]['status'] = 'creating_rulesets'
-            copy_progress[session_id]['current_file'] = 'Setting up repository rulesets'
+            await state_store.aupdate(session_id, status='creating_rulesets', current_file='Setting up repository rulesets')
             print(f"Creating repository rulesets...")
             
             try:
                 print(f"Attempting to create rulesets for {owner}/{request.repo_name}")
                 print(f"Token length: {len(request.github_token)} characters")
-                rulesets_result = create_repository_rulesets(
+                rulesets_result = await create_repository_rulesets(
                     token=request.github_token,
                     owner=owner,
                     repo=request.repo_name
@@ -983,12 +787,11 @@ async def copy_package_to_github(request: PackageCopyRequest):
         # Step 8: Create environment secrets (if provided)
         env_secrets_list = [env for env in ['prod', 'qa', 'dev'] if getattr(request.environment_secrets, env)]
         if env_secrets_list:
-            copy_progress[session_id]['status'] = 'creating_secrets'
-            copy_progress[session_id]['current_file'] = 'Setting up environment secrets'
+            await state_store.aupdate(session_id, status='creating_secrets', current_file='Setting up environment secrets')
             print(f"Creating environment secrets for: {', '.join(env_secrets_list)}")
             
             try:
-                secrets_result = create_github_environment_secrets(
+                secrets_result = await create_github_environment_secrets(
                     token=request.github_token,
                     owner=owner,
                     repo=request.repo_name,
@@ -1011,12 +814,11 @@ async def copy_package_to_github(request: PackageCopyRequest):
             print(f"ℹ️ No environment secrets to create")
         
         # Step 9: Create repository variables
-        copy_progress[session_id]['status'] = 'creating_variables'
-        copy_progress[session_id]['current_file'] = 'Setting up repository variables'
+        await state_store.aupdate(session_id, status='creating_variables', current_file='Setting up repository variables')
         print(f"Creating repository variables for TD Workflow...")
         
         try:
-            variables_result = create_github_repository_variables(
+            variables_result = await create_github_repository_variables(
                 token=request.github_token,
                 owner=owner,
                 repo=request.repo_name,
@@ -1038,14 +840,13 @@ async def copy_package_to_github(request: PackageCopyRequest):
             # Don't fail the entire deployment if variables creation fails
         
         # Update final progress
-        copy_progress[session_id]['status'] = 'completed'
-        copy_progress[session_id]['completed_at'] = __import__('datetime').datetime.now().isoformat()
+        progress = await state_store.aupdate(session_id, status='completed', completed_at=__import__('datetime').datetime.now().isoformat())
         
         response_data = {
             'success': True,
             'message': f'Successfully deployed {request.package_name} using git operations',
-            'total_files': copy_progress[session_id]['total_files'],
-            'success_count': copy_progress[session_id]['files_created'],
+            'total_files': progress['total_files'],
+            'success_count': progress['files_created'],
             'failed_count': 0,
             'session_id': session_id,
             'method': 'git_operations'
@@ -1053,30 +854,44 @@ async def copy_package_to_github(request: PackageCopyRequest):
         
         print(f"\n🎉 DEPLOYMENT SUCCESS RESPONSE:")
         print(f"Response Data: {response_data}")
-        print(f"Session Progress: {copy_progress.get(session_id, {})}")
+        print(f"Session Progress: {await state_store.aget(session_id)}")
         
         return response_data
         
+    except asyncio.CancelledError:
+        # Cancelled through DELETE /copy-package/{session_id}; git children are already killed
+        rollback = None
+        if ((await state_store.aget(session_id)) or {}).get('rollback_requested'):
+            if repo_created:
+                rollback = await asyncio.to_thread(_delete_repository, request.github_token, owner, request.repo_name)
+            else:
+                rollback = {'status': 'skipped', 'message': 'Repository was not created by this session'}
+        await state_store.aupdate(session_id, status='cancelled', current_file='', rollback=rollback,
+                           completed_at=__import__('datetime').datetime.now().isoformat())
+        
+        print(f"\n🛑 DEPLOYMENT CANCELLED: {session_id}")
+        print(f"Rollback: {rollback}")
+        
+        raise
     except HTTPException as he:
         # Re-raise HTTP exceptions with their original status codes and messages
-        copy_progress[session_id]['status'] = 'error'
-        copy_progress[session_id]['completed_at'] = __import__('datetime').datetime.now().isoformat()
+        await state_store.aupdate(session_id, status='error', completed_at=__import__('datetime').datetime.now().isoformat())
         
         print(f"\n❌ DEPLOYMENT ERROR RESPONSE (HTTPException):")
         print(f"Status Code: {he.status_code}")
         print(f"Detail: {he.detail}")
-        print(f"Session Progress: {copy_progress.get(session_id, {})}")
+        print(f"Session Progress: {await state_store.aget(session_id)}")
         
         raise
     except Exception as e:
-        copy_progress[session_id]['status'] = 'error'
-        copy_progress[session_id]['errors'].append(f"Fatal error: {str(e)}")
-        copy_progress[session_id]['completed_at'] = __import__('datetime').datetime.now().isoformat()
+        # Git errors can echo the push URL, token included; the record is served by /copy-history and may be on disk
+        await state_store.aappend(session_id, 'errors', redact_credentials(f"Fatal error: {str(e)}", request.github_token))
+        await state_store.aupdate(session_id, status='error', completed_at=__import__('datetime').datetime.now().isoformat())
         
         print(f"\n❌ DEPLOYMENT ERROR RESPONSE (Exception):")
         print(f"Error: {str(e)}")
         print(f"Error Type: {type(e).__name__}")
-        print(f"Session Progress: {copy_progress.get(session_id, {})}")
+        print(f"Session Progress: {await state_store.aget(session_id)}")
         
         import traceback
         print(f"Full traceback: {traceback.format_exc()}")
@@ -1086,46 +901,50 @@ async def copy_package_to_github(request: PackageCopyRequest):
         
         raise error_response
 
+def _available_packages_payload() -> Dict[str, Any]:
+    """Predefined starter packages (same as /starter-packs endpoint)"""
+    packages = [
+        {
+            "id": "qsr-starter-pack",
+            "name": "QSR Starter Pack",
+            "description": "Quick Service Restaurant analytics and customer journey tracking",
+            "type": "QSR",
+            "path": "qsr-starter-pack",
+            "features": [
+                "Order analytics and sales trends",
+                "Customer journey mapping", 
+                "Marketing attribution",
+                "Cohort analysis",
+                "Segmentation and targeting",
+                "Dashboard templates"
+            ]
+        },
+        {
+            "id": "retail-starter-pack",
+            "name": "Retail Starter Pack",
+            "description": "Comprehensive retail analytics with customer insights and product performance",
+            "type": "Retail",
+            "path": "retail-starter-pack",
+            "features": [
+                "Sales and product analytics",
+                "Customer lifetime value",
+                "Inventory optimization insights",
+                "Cross-sell recommendations",
+                "Web analytics integration",
+                "Advanced segmentation"
+            ]
+        }
+    ]
+
+    print(f"Total packages available: {len(packages)}")
+    return {'packages': packages}
+
 @router.get("/packages")
-async def list_available_packages():
+async def list_available_packages(request: Request):
     """List available starter packages"""
     try:
-        # Return predefined starter packs (same as /starter-packs endpoint)
-        packages = [
-            {
-                "id": "qsr-starter-pack",
-                "name": "QSR Starter Pack",
-                "description": "Quick Service Restaurant analytics and customer journey tracking",
-                "type": "QSR",
-                "path": "qsr-starter-pack",
-                "features": [
-                    "Order analytics and sales trends",
-                    "Customer journey mapping", 
-                    "Marketing attribution",
-                    "Cohort analysis",
-                    "Segmentation and targeting",
-                    "Dashboard templates"
-                ]
-            },
-            {
-                "id": "retail-starter-pack",
-                "name": "Retail Starter Pack",
-                "description": "Comprehensive retail analytics with customer insights and product performance",
-                "type": "Retail",
-                "path": "retail-starter-pack",
-                "features": [
-                    "Sales and product analytics",
-                    "Customer lifetime value",
-                    "Inventory optimization insights",
-                    "Cross-sell recommendations",
-                    "Web analytics integration",
-                    "Advanced segmentation"
-                ]
-            }
-        ]
-        
-        print(f"Total packages available: {len(packages)}")
-        return {'packages': packages}
+        cached = cached_json("packages", _available_packages_payload)
+        return conditional_json_response(request, cached, STATIC_CACHE_CONTROL)
         
     except Exception as e:
         print(f"Error listing packages: {e}")
@@ -1134,7 +953,36 @@ async def list_available_packages():
 @router.get("/copy-progress/{session_id}")
 async def get_copy_progress(session_id: str):
     """Get the progress of a file copy operation"""
-    if session_id not in copy_progress:
+    progress = await state_store.aget(session_id)
+    if progress is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return copy_progress[session_id]
\ No newline at end of file
+    return progress
+
+@router.delete("/copy-package/{session_id}")
+async def cancel_copy_package(session_id: str, rollback: bool = False):
+    """Cancel a running copy: kills its git processes and stops before the next GitHub call.
+
+    With ``rollback=true`` the repository is deleted again if this session created it.
+    """
+    progress = await state_store.aget(session_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if progress.get('status') in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Session already finished with status '{progress['status']}'")
+
+    await state_store.aupdate(session_id, cancel_requested=True, rollback_requested=rollback)
+
+    task = _copy_tasks.get(session_id)
+    if task is None:
+        # Running in another worker; its watcher picks the flag up from the state store
+        return {'session_id': session_id, 'status': 'cancelling'}
+
+    task.cancel()
+    await asyncio.wait({task}, timeout=CANCEL_WAIT_TIMEOUT)
+    return await state_store.aget(session_id)
+
+@router.get("/copy-history", dependencies=[Depends(require_admin_token)])
+async def get_copy_history(status: str = None, limit: int = Query(50, ge=1, le=500)):
+    """Recent copy-package sessions, newest first, optionally filtered by status"""
+    return {"sessions": await state_store.ahistory(kind='copy-package', status=status, limit=limit)}
\ No newline at end of file
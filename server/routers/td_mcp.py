@@ -1,13 +1,39 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from models.deployment import TDCredentials
+from services.async_cache import AsyncTTLCache
+from services.td_client import TDAPIError, TDClient
+from services.td_service import TDMCPService, credential_hash
+from services.resilience import breakers
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+import asyncio
+import os
+import time
 import requests
 import json
 
 router = APIRouter()
 
+td_service = TDMCPService()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_DATABASES_PER_REQUEST = 50
+
+# The configuration UI re-tests the same credentials on every click; answer
+# repeats from cache and let concurrent identical tests share one TD call.
+# Rejected credentials are cached too, but only briefly, so a fixed key is
+# picked up fast; timeouts and server errors are never cached.
+connection_test_cache = AsyncTTLCache(
+    ttl=float(os.getenv("TD_CONNECTION_TEST_TTL", "60")),
+    negative_ttl=float(os.getenv("TD_CONNECTION_TEST_NEGATIVE_TTL", "10")),
+    cache_exception=lambda exc: isinstance(exc, HTTPException) and 400 <= exc.status_code < 500,
+)
+
 @router.post("/test-connection")
 async def test_td_connection(credentials: TDCredentials):
-    """Test connection to Treasure Data via MCP server"""
+    """Test connection to Treasure Data via the MCP server and/or TD's API"""
     
     # Basic validation - just check if fields exist
     if not credentials.apiKey or not credentials.region:
@@ -21,67 +47,155 @@ async def test_td_connection(credentials: TDCredentials):
             detail=f"Missing required fields: {', '.join(missing)}"
         )
     
+    return await connection_test_cache.get_or_load(
+        credential_hash(credentials),
+        lambda: _run_connection_test(credentials)
+    )
+
+class MCPAvailability:
+    """Cached liveness of the local MCP server.
+
+    A dead MCP server used to cost a connection attempt (or a 10s timeout) on
+    every test. A cheap TCP probe now decides whether to use it at all, and
+    the answer is cached - for less time when the server is down, so it is
+    picked up again soon after it starts.
+    """
+
+    def __init__(self, url: str, up_ttl: float = 30.0, down_ttl: float = 10.0, probe_timeout: float = 0.5):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.breaker = breakers.get(f"{self.host}:{parts.port}" if parts.port else self.host)
+        self.up_ttl = up_ttl
+        self.down_ttl = down_ttl
+        self.probe_timeout = probe_timeout
+        self._available = False
+        self._expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def is_available(self) -> bool:
+        if self.breaker.is_open():
+            # Recent MCP calls failed; don't use it until the breaker lets a trial through
+            return False
+        if time.monotonic() < self._expires_at:
+            return self._available
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if time.monotonic() < self._expires_at:
+                return self._available
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.probe_timeout
+                )
+                writer.close()
+                self._set(True)
+            except (OSError, asyncio.TimeoutError):
+                self._set(False)
+            return self._available
+
+    def mark_down(self):
+        """Record a failed call so the next requests skip MCP without probing"""
+        self._set(False)
+
+    def _set(self, available: bool):
+        self._available = available
+        self._expires_at = time.monotonic() + (self.up_ttl if available else self.down_ttl)
+
+
+MCP_URL = os.getenv("TD_MCP_URL", "http://localhost:8001")
+
+mcp_availability = MCPAvailability(
+    MCP_URL,
+    up_ttl=float(os.getenv("TD_MCP_HEALTH_TTL", "30")),
+    down_ttl=float(os.getenv("TD_MCP_DOWN_TTL", "10")),
+)
+
+def _is_authoritative(task: asyncio.Future) -> bool:
+    """A success or a client error (bad key, bad region) settles the test; outages don't"""
+    exc = task.exception()
+    if exc is None:
+        return True
+    return isinstance(exc, HTTPException) and 400 <= exc.status_code < 500
+
+async def _run_connection_test(credentials: TDCredentials):
+    """Race the MCP server against TD's API and return the first definitive answer"""
+    direct = asyncio.ensure_future(asyncio.to_thread(_test_direct_td_api, credentials))
+    if not await mcp_availability.is_available():
+        return await direct
+
+    pending = {direct, asyncio.ensure_future(asyncio.to_thread(_test_via_mcp, credentials))}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if _is_authoritative(task):
+                for other in pending:
+                    other.cancel()
+                return task.result()
+
+    # Neither path gave a definitive answer; MCP only proxies TD, so report TD's error
+    return direct.result()
+
+def _test_via_mcp(credentials: TDCredentials):
+    """Test connection through the MCP server's list_databases resource"""
     try:
-        # First try MCP server
-        mcp_url = "http://localhost:8001"
+        response = requests.post(
+            f"{MCP_URL}/mcp/v1/resources",
+            json={
+                "method": "list_databases",
+                "params": {}
+            },
+            headers={
+                "X-TD-API-KEY": credentials.apiKey,
+                "X-TD-REGION": credentials.region
+            },
+            timeout=10
+        )
         
-        try:
-            # Try to call list_databases to verify connection
-            response = requests.post(
-                f"{mcp_url}/mcp/v1/resources",
-                json={
-                    "method": "list_databases",
-                    "params": {}
-                },
-                headers={
-                    "X-TD-API-KEY": credentials.apiKey,
-                    "X-TD-REGION": credentials.region
-                },
-                timeout=10
+        if response.status_code == 200:
+            data = response.json()
+            db_count = len(data.get('databases', []))
+            return {
+                "status": "success", 
+                "message": f"Successfully connected to Treasure Data ({credentials.region})",
+                "details": f"Found {db_count} databases accessible with your credentials"
+            }
+        elif response.status_code == 401:
+            raise HTTPException(
+                status_code=401, 
+                detail="Authentication failed. Please verify your API key is correct and has not expired."
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                db_count = len(data.get('databases', []))
-                return {
-                    "status": "success", 
-                    "message": f"Successfully connected to Treasure Data ({credentials.region})",
-                    "details": f"Found {db_count} databases accessible with your credentials"
-                }
-            elif response.status_code == 401:
-                raise HTTPException(
-                    status_code=401, 
-                    detail="Authentication failed. Please verify your API key is correct and has not expired."
-                )
-            elif response.status_code == 403:
-                raise HTTPException(
-                    status_code=403, 
-                    detail="Access denied. Your API key may not have sufficient permissions to access databases."
-                )
-            elif response.status_code == 404:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Region '{credentials.region}' not found. Please verify the region is correct."
-                )
-            else:
-                error_msg = _extract_error_message(response)
-                raise HTTPException(
-                    status_code=response.status_code, 
-                    detail=f"Treasure Data API returned error: {error_msg}"
-                )
-                    
-        except requests.ConnectionError:
-            # MCP server not available, try direct TD API call
-            return await _test_direct_td_api(credentials)
-        except requests.Timeout:
+        elif response.status_code == 403:
+            raise HTTPException(
+                status_code=403, 
+                detail="Access denied. Your API key may not have sufficient permissions to access databases."
+            )
+        elif response.status_code == 404:
             raise HTTPException(
-                status_code=504, 
-                detail="Connection to Treasure Data timed out. Please check your network connection and try again."
+                status_code=404, 
+                detail=f"Region '{credentials.region}' not found. Please verify the region is correct."
+            )
+        else:
+            error_msg = _extract_error_message(response)
+            raise HTTPException(
+                status_code=response.status_code, 
+                detail=f"Treasure Data API returned error: {error_msg}"
             )
             
     except HTTPException:
-        # Re-raise HTTPExceptions from nested functions
         raise
+    except requests.Timeout:
+        mcp_availability.mark_down()
+        raise HTTPException(
+            status_code=504, 
+            detail="Connection to Treasure Data timed out. Please check your network connection and try again."
+        )
+    except requests.ConnectionError as e:
+        mcp_availability.mark_down()
+        raise HTTPException(
+            status_code=502, 
+            detail=f"MCP server unavailable: {str(e)}"
+        )
     except requests.RequestException as e:
         raise HTTPException(
             status_code=500, 
@@ -93,21 +207,12 @@ async def test_td_connection(credentials: TDCredentials):
             detail=f"Unexpected error during connection test: {str(e)}"
         )
 
-async def _test_direct_td_api(credentials: TDCredentials):
-    """Test connection directly to Treasure Data API when MCP server is unavailable"""
+def _test_direct_td_api(credentials: TDCredentials):
+    """Test connection directly against the Treasure Data API"""
     try:
-        # Get the correct API endpoint based on region
-        api_base = f"https://api.treasuredata.com" if credentials.region == "us01" else f"https://api.{credentials.region}.treasuredata.com"
-        
         # Test with a simple API call to list databases
-        response = requests.get(
-            f"{api_base}/v3/database/list",
-            headers={
-                "Authorization": f"TD1 {credentials.apiKey}",
-                "User-Agent": "TD-Value-Accelerator/1.0"
-            },
-            timeout=15
-        )
+        client = TDClient(credentials.apiKey, credentials.region)
+        response = client.request("GET", "/v3/database/list")
         
         if response.status_code == 200:
             data = response.json()
@@ -193,34 +298,87 @@ def _get_user_friendly_error(error_str: str) -> str:
     else:
         return error_str
 
+def _credentials_from_headers(api_key: Optional[str], region: Optional[str]) -> TDCredentials:
+    if not api_key or not region:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing Treasure Data credentials. Send X-TD-API-KEY and X-TD-REGION headers."
+        )
+    return TDCredentials(apiKey=api_key, region=region)
+
+def _td_error(e: Exception, what: str) -> HTTPException:
+    if isinstance(e, TDAPIError):
+        status_code = e.status_code if 400 <= e.status_code < 500 else 502
+        return HTTPException(status_code=status_code, detail=f"Failed to list {what}: {e.message}")
+    return HTTPException(status_code=502, detail=f"Failed to list {what}: {_get_user_friendly_error(str(e))}")
+
+def _paginate(key: str, items: List[Dict[str, Any]], limit: Optional[int], offset: int, format: str):
+    """Slice a cached listing into a page, or stream it as NDJSON (one item per line)"""
+    if format == "ndjson":
+        selected = items[offset:offset + limit] if limit else items[offset:]
+        
+        def lines():
+            for item in selected:
+                yield json.dumps(item) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson",
+                                 headers={"X-Total-Count": str(len(items))})
+    
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    return {
+        key: page,
+        "total": len(items),
+        "limit": limit,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < len(items) else None
+    }
+
 @router.get("/databases")
-async def list_databases():
-    """List available databases"""
+async def list_databases(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    x_td_api_key: Optional[str] = Header(None),
+    x_td_region: Optional[str] = Header(None)
+):
+    """List databases, paginated (limit/offset) or streamed with format=ndjson"""
+    credentials = _credentials_from_headers(x_td_api_key, x_td_region)
     try:
-        # This would call the TD MCP server
-        # For demo, return mock data
-        return {
-            "databases": [
-                {"name": "production", "description": "Production database"},
-                {"name": "staging", "description": "Staging database"},
-                {"name": "development", "description": "Development database"}
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to list databases: {str(e)}")
+        databases = await td_service.list_databases(credentials)
+    except (TDAPIError, requests.RequestException) as e:
+        raise _td_error(e, "databases")
+    return _paginate("databases", databases, limit, offset, format)
+
+@router.get("/tables")
+async def list_tables_for_databases(
+    databases: str = Query(..., description="Comma-separated database names"),
+    x_td_api_key: Optional[str] = Header(None),
+    x_td_region: Optional[str] = Header(None)
+):
+    """List tables of several databases in one request, fetched concurrently"""
+    credentials = _credentials_from_headers(x_td_api_key, x_td_region)
+    names = list(dict.fromkeys(name.strip() for name in databases.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="No database names given")
+    if len(names) > MAX_DATABASES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DATABASES_PER_REQUEST} databases per request")
+    return {"databases": await td_service.list_tables_many(credentials, names)}
 
 @router.get("/tables/{database}")
-async def list_tables(database: str):
-    """List tables in a database"""
+async def list_tables(
+    database: str,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    x_td_api_key: Optional[str] = Header(None),
+    x_td_region: Optional[str] = Header(None)
+):
+    """List tables in a database, paginated (limit/offset) or streamed with format=ndjson"""
+    credentials = _credentials_from_headers(x_td_api_key, x_td_region)
     try:
-        # This would call the TD MCP server
-        # For demo, return mock data
-        return {
-            "tables": [
-                {"name": "customers", "rows": 1000000},
-                {"name": "orders", "rows": 500000},
-                {"name": "products", "rows": 10000}
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to list tables: {str(e)}")
\ No newline at end of file
+        tables = await td_service.list_tables(credentials, database)
+    except (TDAPIError, requests.RequestException) as e:
+        raise _td_error(e, f"tables in {database}")
+    return _paginate("tables", tables, limit, offset, format)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Production entry point: a preforking server.
+
+    python serve.py                          # one worker per available core, on 0.0.0.0:8000
+    WEB_CONCURRENCY=4 PORT=8080 python serve.py
+
+The master binds the listening socket, imports the app and builds its caches
+(catalog responses, the package listing, compiled pack templates) once, then
+forks the workers, which share all of it copy-on-write. uvloop and httptools
+are used when installed. On SIGTERM or SIGINT every worker stops accepting,
+lets in-flight requests - deployments included - finish for up to
+DRAIN_TIMEOUT_SECONDS, then cancels whatever is left. A worker that dies is
+replaced. ``python main.py`` remains the auto-reloading development server.
+
+With more than one worker, job state defaults to the SQLite store
+(STATE_BACKEND=sqlite) so progress polls and cancels reach any worker.
+"""
+
+import argparse
+import gc
+import importlib.util
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+# A worker that exits this soon after being forked failed to boot; respawning would just loop
+WORKER_BOOT_GRACE = 5.0
+
+
+def _cgroup_cpu_limit() -> Optional[int]:
+    """CPU quota of a cgroup v2 container, rounded up; None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+
+def available_cores() -> int:
+    """Cores this process may run on: affinity mask (taskset, cpusets) capped by any container quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    return min(cores, limit) if limit else cores
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import the app and warm its caches in the master, before any worker exists"""
+    from main import app
+    from routers import deployment, github
+
+    warmed = {"github": github.warm_caches(), "deployment": deployment.warm_caches()}
+    # Everything built so far is shared with the workers. Freezing it keeps the
+    # cyclic GC from writing to those objects, which would copy their pages.
+    gc.collect()
+    gc.freeze()
+    return app, warmed
+
+
+class Master:
+    """Forks the workers, replaces any that die, and relays shutdown signals to them"""
+
+    def __init__(self, app, sock: socket.socket, workers: int, loop: str, http: str, drain_timeout: float):
+        self.app = app
+        self.sock = sock
+        self.worker_count = workers
+        self.loop = loop
+        self.http = http
+        self.drain_timeout = drain_timeout
+        self.workers: Dict[int, float] = {}  # pid -> when it was forked
+        self.stopping = False
+
+    def run(self) -> int:
+        from logging_config import logger
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.worker_count):
+            self.spawn()
+
+        exit_code = 0
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            forked_at = self.workers.pop(pid, None)
+            if forked_at is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - forked_at < WORKER_BOOT_GRACE:
+                logger.error(f"Worker {pid} exited with {code} while starting; shutting down")
+                exit_code = 1
+                self.stop(signal.SIGTERM, None)
+            else:
+                logger.warning(f"Worker {pid} exited with {code}; starting a replacement")
+                self.spawn()
+        logger.info("All workers stopped")
+        return exit_code
+
+    def spawn(self):
+        # Block shutdown signals across the fork: the parent must record the pid
+        # before it can relay a signal, and the child must drop the master's handlers
+        signals = {signal.SIGTERM, signal.SIGINT}
+        signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+        pid = os.fork()
+        if pid == 0:
+            for signum in signals:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+            os._exit(self._run_worker())
+        self.workers[pid] = time.monotonic()
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+
+    def _run_worker(self) -> int:
+        import uvicorn
+        from logging_config import flush_logging, logger
+
+        code = 1
+        try:
+            config = uvicorn.Config(self.app, loop=self.loop, http=self.http, lifespan="on", log_config=None,
+                                    timeout_graceful_shutdown=self.drain_timeout)
+            server = uvicorn.Server(config)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else 1
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} crashed")
+        # os._exit skips atexit, so flush the log queues here
+        flush_logging()
+        return code
+
+    def stop(self, signum, frame):
+        """Ask every worker to drain; they stop accepting and finish in-flight requests"""
+        self.stopping = True
+        # Once the workers close their copies too, new connections are refused rather than left queued
+        self.sock.close()
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main():
+    from services.resilience import DEPLOYMENT_DEADLINE
+
+    parser = argparse.ArgumentParser(description="Run the API with preforked workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or available_cores(),
+                        help="defaults to WEB_CONCURRENCY, else the cores available to this process")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("LISTEN_BACKLOG", "2048")))
+    # Long enough, by default, for a deployment that has just started to reach its own deadline
+    parser.add_argument("--drain-timeout", type=float,
+                        default=float(os.getenv("DRAIN_TIMEOUT_SECONDS", str(DEPLOYMENT_DEADLINE + 30))))
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # In-memory job state is per process; polls and cancels must reach any worker
+        os.environ.setdefault("STATE_BACKEND", "sqlite")
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    app, warmed = preload()
+
+    from logging_config import centralize_file_logging, logger
+
+    if args.workers > 1:
+        centralize_file_logging()
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} worker(s) (loop={loop}, http={http}, "
+                f"state={os.getenv('STATE_BACKEND', 'memory')}, drain={args.drain_timeout:g}s); preloaded {warmed}")
+    sys.exit(Master(app, sock, args.workers, loop, http, args.drain_timeout).run())
+
+
+if __name__ == "__main__":
+    main()
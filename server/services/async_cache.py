@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class AsyncTTLCache:
+    """TTL cache for coroutine results with single-flight loading.
+
+    Concurrent ``get_or_load`` calls for the same key share one in-flight
+    load instead of each calling the backend. Successful results live for
+    ``ttl`` seconds; exceptions accepted by ``cache_exception`` are cached as
+    negative results for the (usually shorter) ``negative_ttl`` and re-raised
+    to later callers. With ``stale_ttl``, a successful result past its TTL is
+    still served for that much longer while a background load refreshes it.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float = 0.0, max_entries: int = 1024,
+                 cache_exception: Callable[[BaseException], bool] = lambda exc: False,
+                 stale_ttl: float = 0.0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.cache_exception = cache_exception
+        # key -> (expires_at, is_error, value or exception)
+        self._entries: "OrderedDict[Hashable, Tuple[float, bool, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, is_error, value = entry
+            if expires_at > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                if is_error:
+                    raise value
+                return value
+            if not is_error and expires_at + self.stale_ttl > time.monotonic():
+                self.stale += 1
+                if key not in self._inflight:
+                    self._refresh(key, loader)
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+        # Shielded so one caller disconnecting doesn't cancel the load for the others
+        return await asyncio.shield(task)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        task = asyncio.ensure_future(self._load(key, loader, background=True))
+        self._inflight[key] = task
+        # Nobody awaits a background refresh; a failure just leaves the stale value in place
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], background: bool = False) -> Any:
+        try:
+            value = await loader()
+        except Exception as exc:
+            if not background and self.negative_ttl > 0 and self.cache_exception(exc):
+                self._store(key, time.monotonic() + self.negative_ttl, True, exc)
+            raise
+        else:
+            if self.ttl > 0:
+                self._store(key, time.monotonic() + self.ttl, False, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: Hashable, expires_at: float, is_error: bool, value: Any):
+        self._entries[key] = (expires_at, is_error, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "inflight": len(self._inflight),
+                "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "stale": self.stale}
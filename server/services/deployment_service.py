@@ -1,11 +1,67 @@
 import asyncio
-from typing import Dict, Any, List
+import os
+import re
+from typing import Dict, Any, List, AsyncIterator, Set
 from models.deployment import DeploymentConfig, DeploymentStatus, TDCredentials
 from services.td_service import TDMCPService
 from services.github_service import GitHubService
+from services.template_engine import render_files, render_text, template_values
 import uuid
 from datetime import datetime
 
+WORKFLOW_MAX_PARALLEL = int(os.getenv("WORKFLOW_MAX_PARALLEL", "4"))
+
+# Digdag operators that make one workflow wait for (require>) or run (call>) another
+_WORKFLOW_REFERENCE = re.compile(r"""^\s*(?:require|call)>:\s*["']?([^"'\s#]+)""", re.MULTILINE)
+_WORKFLOW_NUMBER = re.compile(r"^wf(\d+)")
+
+def workflow_key(filename: str) -> str:
+    """Workflow name without directory or .dig suffix, as used in require>/call> references"""
+    name = filename.rsplit("/", 1)[-1]
+    return name[:-4] if name.endswith(".dig") else name
+
+def build_workflow_graph(workflows: List[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    """Map each workflow to the workflows that must succeed before it runs.
+    
+    Explicit ``require>:``/``call>:`` references between the pack's own
+    workflows define the graph. Packs without any fall back to their numeric
+    prefixes: every wfNN depends on all workflows with the next lower number,
+    so workflows sharing a number run side by side, and workflows without a
+    number are independent.
+    """
+    names = {workflow_key(workflow["name"]) for workflow in workflows}
+    explicit = {
+        workflow_key(workflow["name"]): {
+            workflow_key(ref) for ref in _WORKFLOW_REFERENCE.findall(workflow.get("content") or "")
+        } & names - {workflow_key(workflow["name"])}
+        for workflow in workflows
+    }
+    if any(explicit.values()):
+        return explicit
+    
+    numbered: Dict[int, Set[str]] = {}
+    for name in names:
+        match = _WORKFLOW_NUMBER.match(name)
+        if match:
+            numbered.setdefault(int(match.group(1)), set()).add(name)
+    graph: Dict[str, Set[str]] = {name: set() for name in names}
+    previous: Set[str] = set()
+    for number in sorted(numbered):
+        for name in numbered[number]:
+            graph[name] = set(previous)
+        previous = numbered[number]
+    return graph
+
+def _downstream(name: str, dependents: Dict[str, Set[str]]) -> Set[str]:
+    seen: Set[str] = set()
+    stack = list(dependents.get(name, ()))
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(dependents.get(current, ()))
+    return seen
+
 class DeploymentService:
     """Service to handle deployment orchestration"""
     
@@ -16,10 +72,14 @@ class DeploymentService:
     async def prepare_deployment(self, config: DeploymentConfig) -> Dict[str, Any]:
         """Prepare deployment by fetching required files and validating configuration"""
         try:
-            # Get all starter pack files from local filesystem
-            workflow_files = await self.github_service.get_workflow_files(config.starterPack.id)
-            config_files = await self.github_service.get_config_files(config.starterPack.id)
-            all_files = await self.github_service.get_all_files(config.starterPack.id)
+            # Get all starter pack files from local filesystem, concurrently on the I/O executor
+            workflow_files, config_files, pack_files = await asyncio.gather(
+                self.github_service.get_workflow_files(config.starterPack.id),
+                self.github_service.get_config_files(config.starterPack.id),
+                self.github_service.list_files(config.starterPack.id)
+            )
+            # Metadata only; content is read from disk if and when a file is used
+            all_files = {pack_file.path: pack_file for pack_file in pack_files}
             
             # Process configuration templates
             processed_configs = self._process_config_templates(config_files, config.parameters)
@@ -47,24 +107,19 @@ class DeploymentService:
             if preparation["status"] == "error":
                 return preparation
             
-            # Execute workflows in sequence
             workflow_results = []
-            for workflow in preparation["workflow_files"]:
-                result = await self._execute_single_workflow(
-                    workflow, 
-                    config, 
-                    deployment_id
-                )
+            async for result in self.stream_workflow_results(preparation["workflow_files"], config, deployment_id):
                 workflow_results.append(result)
-                
-                if result["status"] == "error":
-                    return {
-                        "status": "error",
-                        "message": f"Workflow {workflow['name']} failed: {result['message']}"
-                    }
-                
-                # Simulate delay between workflows
-                await asyncio.sleep(1)
+            
+            failed = [result["workflow"] for result in workflow_results if result["status"] == "error"]
+            if failed:
+                return {
+                    "status": "error",
+                    "message": f"Workflow {', '.join(failed)} failed: " + "; ".join(
+                        result["message"] for result in workflow_results if result["status"] == "error"
+                    ),
+                    "results": workflow_results
+                }
             
             return {
                 "status": "completed",
@@ -78,14 +133,80 @@ class DeploymentService:
                 "message": f"Deployment execution failed: {str(e)}"
             }
     
+    async def stream_workflow_results(self, workflows: List[Dict[str, Any]], config: DeploymentConfig,
+                                      deployment_id: str, max_parallel: int = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run workflows in dependency order, yielding each result as soon as it finishes.
+        
+        Workflows whose dependencies have all succeeded run concurrently, at
+        most ``max_parallel`` at a time. When one fails, everything downstream
+        of it is reported as skipped; independent branches keep running.
+        """
+        by_name = {workflow_key(workflow["name"]): workflow for workflow in workflows}
+        graph = build_workflow_graph(workflows)
+        waiting_on = {name: set(deps) for name, deps in graph.items()}
+        dependents: Dict[str, Set[str]] = {name: set() for name in graph}
+        for name, deps in graph.items():
+            for dep in deps:
+                dependents[dep].add(name)
+        
+        semaphore = asyncio.Semaphore(max_parallel or WORKFLOW_MAX_PARALLEL)
+        
+        async def run(workflow: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._execute_single_workflow(workflow, config, deployment_id)
+        
+        running: Dict[asyncio.Future, str] = {}
+        finished: Set[str] = set()
+        
+        def launch_ready():
+            for name in sorted(waiting_on):
+                if not waiting_on[name]:
+                    del waiting_on[name]
+                    running[asyncio.ensure_future(run(by_name[name]))] = name
+        
+        launch_ready()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=running.get):
+                    name = running.pop(task)
+                    result = task.result()
+                    finished.add(name)
+                    yield result
+                    if result["status"] == "error":
+                        for skipped in sorted(_downstream(name, dependents) - finished):
+                            if waiting_on.pop(skipped, None) is not None:
+                                finished.add(skipped)
+                                yield {
+                                    "workflow": by_name[skipped]["name"],
+                                    "status": "skipped",
+                                    "message": f"Skipped because upstream workflow {by_name[name]['name']} failed"
+                                }
+                    else:
+                        for dependent in dependents[name]:
+                            if dependent in waiting_on:
+                                waiting_on[dependent].discard(name)
+                launch_ready()
+        finally:
+            # Consumer stopped early (client went away): don't leave workflows running unobserved
+            for task in running:
+                task.cancel()
+        
+        # Anything still waiting is part of a dependency cycle
+        for name in sorted(waiting_on):
+            yield {
+                "workflow": by_name[name]["name"],
+                "status": "error",
+                "message": f"Dependency cycle involving {', '.join(sorted(waiting_on[name]))}"
+            }
+    
     async def _execute_single_workflow(self, workflow: Dict[str, Any], config: DeploymentConfig, deployment_id: str) -> Dict[str, Any]:
         """Execute a single workflow"""
         try:
             # Create TD credentials from config (this would be passed properly in real implementation)
             credentials = TDCredentials(
                 apiKey="demo_key",  # This would come from secure storage
-                region=config.parameters.get("region", "us-east-1"),
-                database=config.parameters.get("database", "default")
+                region=config.parameters.get("region", "us-east-1")
             )
             
             # Process workflow content with parameters
@@ -98,7 +219,8 @@ class DeploymentService:
             result = await self.td_service.execute_workflow(
                 credentials,
                 processed_content,
-                workflow["name"]
+                workflow["name"],
+                database=config.parameters.get("database", "default")
             )
             
             return {
@@ -117,40 +239,13 @@ class DeploymentService:
     
     def _process_config_templates(self, config_files: Dict[str, str], parameters: Dict[str, Any]) -> Dict[str, str]:
         """Process configuration file templates with parameters"""
-        processed = {}
-        
-        for filename, content in config_files.items():
-            # Replace template variables
-            processed_content = content
-            for key, value in parameters.items():
-                placeholder = f"${{{key.upper()}}}"
-                if isinstance(value, list):
-                    # Handle list values (like email_ids)
-                    if "email" in key.lower():
-                        value_str = "\n".join([f"  - {email}" for email in value])
-                    else:
-                        value_str = str(value)
-                else:
-                    value_str = str(value)
-                
-                processed_content = processed_content.replace(placeholder, value_str)
-            
-            processed[filename] = processed_content
-        
-        return processed
+        return render_files(config_files, template_values(parameters))
     
     def _process_workflow_template(self, workflow_content: str, parameters: Dict[str, Any]) -> str:
         """Process workflow template with parameters"""
-        processed_content = workflow_content
-        
         # Replace common template variables
-        replacements = {
-            "${TD_DATABASE}": parameters.get("database", "default"),
-            "${TABLE_PREFIX}": parameters.get("table_prefix", ""),
-            "${ENVIRONMENT}": parameters.get("environment", "production")
-        }
-        
-        for placeholder, value in replacements.items():
-            processed_content = processed_content.replace(placeholder, str(value))
-        
-        return processed_content
\ No newline at end of file
+        return render_text(workflow_content, {
+            "TD_DATABASE": str(parameters.get("database", "default")),
+            "TABLE_PREFIX": str(parameters.get("table_prefix", "")),
+            "ENVIRONMENT": str(parameters.get("environment", "production"))
+        })
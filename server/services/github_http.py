@@ -0,0 +1,184 @@
+import copy
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Overridable so deployments can run against GitHub Enterprise or the local
+# stand-in in tests/fake_github.py
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GITHUB_RAW_URL = os.getenv("GITHUB_RAW_URL", "https://raw.githubusercontent.com").rstrip("/")
+GITHUB_GIT_URL_TEMPLATE = os.getenv("GITHUB_GIT_URL_TEMPLATE", "https://{token}@github.com/{owner}/{repo}.git")
+
+CACHE_STATUS_HEADER = "X-Conditional-Cache"
+
+
+class _CachedResponse:
+    __slots__ = ("etag", "last_modified", "status_code", "headers", "content", "encoding", "size")
+
+    def __init__(self, response: requests.Response):
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.status_code = response.status_code
+        self.headers = dict(response.headers)
+        self.content = response.content
+        self.encoding = response.encoding
+        self.size = len(self.content) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+class ConditionalResponseCache:
+    """Byte-bounded LRU of GET responses that carry an ETag or Last-Modified"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 2 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[_CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: _CachedResponse):
+        if entry.size > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def record(self, revalidated: bool):
+        with self._lock:
+            if revalidated:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "revalidated": self.hits, "misses": self.misses}
+
+
+def _cache_key(request: requests.PreparedRequest) -> str:
+    # Responses are per-token (a public key or /user differs by caller), so the
+    # credentials are part of the key - hashed, never stored in clear text.
+    auth = request.headers.get("Authorization", "")
+    auth_hash = hashlib.sha256(auth.encode()).hexdigest()[:16] if auth else "anon"
+    return "|".join((request.url, auth_hash, request.headers.get("Accept", ""),
+                     request.headers.get("X-GitHub-Api-Version", "")))
+
+
+class ConditionalCacheAdapter(HTTPAdapter):
+    """Send If-None-Match/If-Modified-Since on GETs and replay the cached body on 304.
+
+    GitHub does not count 304 responses against the rate limit, so repeated
+    reads of the same resource stop spending quota. Replayed responses look
+    like the original 200 and carry ``X-Conditional-Cache: revalidated``.
+    """
+
+    def __init__(self, cache: ConditionalResponseCache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != "GET" or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = _cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry.etag:
+                request.headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request.headers["If-Modified-Since"] = entry.last_modified
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.record(revalidated=True)
+            return self._replay(entry, response)
+        self.cache.record(revalidated=False)
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            self.cache.put(key, _CachedResponse(response))
+        return response
+
+    @staticmethod
+    def _replay(entry: _CachedResponse, not_modified: requests.Response) -> requests.Response:
+        replay = copy.copy(not_modified)
+        replay.status_code = entry.status_code
+        replay.reason = "OK"
+        replay._content = entry.content
+        replay._content_consumed = True
+        replay.encoding = entry.encoding
+        headers = requests.structures.CaseInsensitiveDict(entry.headers)
+        # Fresh rate-limit and date headers come from the 304 itself
+        headers.update(not_modified.headers)
+        headers[CACHE_STATUS_HEADER] = "revalidated"
+        replay.headers = headers
+        return replay
+
+
+response_cache = ConditionalResponseCache(
+    max_bytes=int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = ConditionalCacheAdapter(
+        response_cache,
+        pool_connections=4,
+        pool_maxsize=int(os.getenv("GITHUB_POOL_MAXSIZE", "20")),
+    )
+    session.mount(GITHUB_API_URL, adapter)
+    session.mount(GITHUB_RAW_URL, adapter)
+    return session
+
+
+# One pooled session shared by every request handler and thread; requests
+# sessions are safe to share for plain request/response use.
+github_session = _build_session()
+
+
+def git_remote_url(token: str, owner: str, repo: str) -> str:
+    """Push URL for a repository, token embedded"""
+    return GITHUB_GIT_URL_TEMPLATE.format(token=token, owner=owner, repo=repo)
+
+
+# Userinfo in a URL (``https://<token>@github.com``) and GitHub token formats
+_CREDENTIAL_PATTERNS = (
+    re.compile(r"(?<=://)[^/\s@]+@"),
+    re.compile(r"\b(?:gh[pousr]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,})\b"),
+)
+
+
+def redact_credentials(text: str, *secrets: Optional[str]) -> str:
+    """``text`` with the given secrets and anything that looks like a credential masked, for storing or showing"""
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, "***")
+    for pattern in _CREDENTIAL_PATTERNS:
+        text = pattern.sub(lambda m: "***@" if m.group().endswith("@") else "***", text)
+    return text
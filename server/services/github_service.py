@@ -1,8 +1,72 @@
 import requests
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator, Optional, Union
 import os
 import glob
+import mmap
+from contextlib import contextmanager
 from pathlib import Path
+from services.io_executor import map_io_batched, run_io
+from services.github_http import GITHUB_API_URL
+
+# Bytes sniffed for NUL when classifying content as binary
+BINARY_SNIFF_BYTES = 8192
+
+def classify_content(data: bytes) -> Union[str, bytes]:
+    """Decode text from a single read; NUL bytes or invalid UTF-8 mean binary"""
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return data
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data
+
+class PackFile:
+    """A starter pack file's metadata; content is only read when asked for"""
+    
+    __slots__ = ("path", "absolute_path", "size", "mtime")
+    
+    def __init__(self, path: str, absolute_path: str, size: int, mtime: float):
+        self.path = path
+        self.absolute_path = absolute_path
+        self.size = size
+        self.mtime = mtime
+    
+    def read_bytes(self) -> bytes:
+        with open(self.absolute_path, "rb") as f:
+            return f.read()
+    
+    def read(self) -> Union[str, bytes]:
+        """Content as str for UTF-8 text, bytes otherwise"""
+        return classify_content(self.read_bytes())
+    
+    @contextmanager
+    def mapped(self):
+        """Memory-map the file read-only, for scanning or hashing large files without copying them"""
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        with open(self.absolute_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The eager {content, type, path} shape get_all_files has always returned"""
+        content = self.read()
+        return {
+            "content": content,
+            "type": "text" if isinstance(content, str) else "binary",
+            "path": self.path
+        }
+    
+    def __repr__(self) -> str:
+        return f"PackFile({self.path!r}, size={self.size})"
+
+def _read_entry(pack_file: PackFile) -> Optional[Dict[str, Any]]:
+    try:
+        return pack_file.to_dict()
+    except OSError as e:
+        print(f"Error reading file {pack_file.absolute_path}: {e}")
+        return None
 
 class GitHubService:
     """Service to interact with GitHub repository"""
@@ -10,10 +74,13 @@ class GitHubService:
     def __init__(self):
         self.repo_owner = "treasure-data"
         self.repo_name = "se-starter-pack"
-        self.base_url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}"
+        self.base_url = f"{GITHUB_API_URL}/repos/{self.repo_owner}/{self.repo_name}"
         self.raw_base_url = f"https://raw.githubusercontent.com/{self.repo_owner}/{self.repo_name}/main"
         # Path to the local starter pack directory
-        self.local_repo_path = Path("/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack")
+        self.local_repo_path = Path(os.getenv(
+            "STARTER_PACK_DIR",
+            "/Users/vishal.patel/Desktop/solution-work/Value Accelerator/se-starter-pack"
+        ))
     
     async def get_starter_pack_info(self, pack_name: str) -> Dict[str, Any]:
         """Get starter pack information from GitHub"""
@@ -44,6 +111,17 @@ class GitHubService:
     
     async def get_workflow_files(self, pack_name: str) -> List[Dict[str, Any]]:
         """Get workflow files for a starter pack"""
+        return await run_io(self._read_workflow_files, pack_name)
+    
+    async def get_config_files(self, pack_name: str) -> Dict[str, str]:
+        """Get configuration files for a starter pack"""
+        return await run_io(self._read_config_files, pack_name)
+    
+    async def list_files(self, pack_name: str, max_file_size: Optional[int] = None) -> List[PackFile]:
+        """Metadata for every file in a starter pack, scanned off the event loop"""
+        return await run_io(lambda: list(self.iter_files(pack_name, max_file_size)))
+    
+    def _read_workflow_files(self, pack_name: str) -> List[Dict[str, Any]]:
         try:
             workflows = []
             starter_pack_path = self.local_repo_path / f"{pack_name}-starter-pack"
@@ -76,8 +154,7 @@ class GitHubService:
             print(f"Error fetching workflow files: {e}")
             return []
     
-    async def get_config_files(self, pack_name: str) -> Dict[str, str]:
-        """Get configuration files for a starter pack"""
+    def _read_config_files(self, pack_name: str) -> Dict[str, str]:
         try:
             configs = {}
             starter_pack_path = self.local_repo_path / f"{pack_name}-starter-pack"
@@ -103,44 +180,45 @@ class GitHubService:
             print(f"Error fetching config files: {e}")
             return {}
     
-    async def get_all_files(self, pack_name: str) -> Dict[str, Any]:
+    def iter_files(self, pack_name: str, max_file_size: Optional[int] = None) -> Iterator[PackFile]:
+        """Yield metadata for every file in a starter pack, in path order, without reading content.
+        
+        Files larger than ``max_file_size`` bytes are skipped.
+        """
+        starter_pack_path = self.local_repo_path / f"{pack_name}-starter-pack"
+        if not starter_pack_path.exists():
+            print(f"Starter pack directory not found: {starter_pack_path}")
+            return
+        
+        root = str(starter_pack_path)
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name, reverse=True)
+            except OSError as e:
+                print(f"Error listing directory {directory}: {e}")
+                continue
+            files = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry)
+            for entry in reversed(files):
+                stat = entry.stat()
+                if max_file_size is not None and stat.st_size > max_file_size:
+                    print(f"Skipping {entry.path}: {stat.st_size} bytes exceeds limit of {max_file_size}")
+                    continue
+                yield PackFile(os.path.relpath(entry.path, root), entry.path, stat.st_size, stat.st_mtime)
+    
+    async def get_all_files(self, pack_name: str, max_file_size: Optional[int] = None) -> Dict[str, Any]:
         """Get all files and directories for a starter pack"""
         try:
-            all_files = {}
-            starter_pack_path = self.local_repo_path / f"{pack_name}-starter-pack"
-            
-            if not starter_pack_path.exists():
-                print(f"Starter pack directory not found: {starter_pack_path}")
-                return {}
-            
-            # Recursively get all files
-            for file_path in starter_pack_path.rglob("*"):
-                if file_path.is_file():
-                    # Get relative path from starter pack root
-                    relative_path = file_path.relative_to(starter_pack_path)
-                    
-                    try:
-                        # Try to read as text first
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        file_type = "text"
-                    except UnicodeDecodeError:
-                        # If not text, read as binary
-                        with open(file_path, 'rb') as f:
-                            content = f.read()
-                        file_type = "binary"
-                    except Exception as e:
-                        print(f"Error reading file {file_path}: {e}")
-                        continue
-                    
-                    all_files[str(relative_path)] = {
-                        "content": content,
-                        "type": file_type,
-                        "path": str(relative_path)
-                    }
-            
-            return all_files
+            pack_files = await self.list_files(pack_name, max_file_size)
+            entries = await map_io_batched(_read_entry, pack_files)
+            return {entry["path"]: entry for entry in entries if entry is not None}
             
         except Exception as e:
             print(f"Error fetching all files: {e}")
-            return {}
\ No newline at end of file
+            return {}
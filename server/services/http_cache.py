@@ -0,0 +1,65 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Catalog data only changes with a deploy of this server (or of the pack
+# checkout), so clients may reuse it briefly and then revalidate with the ETag.
+STATIC_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+# Revalidate on every use; a 304 costs a header exchange instead of the body
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class CachedJSON:
+    """A JSON payload serialized once, with a strong ETag over its bytes"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, payload: Any):
+        self.body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+
+_cache: Dict[Hashable, Tuple[Hashable, CachedJSON]] = {}
+_cache_lock = threading.Lock()
+
+
+def cached_json(key: Hashable, build: Callable[[], Any], version: Hashable = None) -> CachedJSON:
+    """Return the serialized payload for ``key``, rebuilding only when ``version`` changes.
+
+    ``version`` should be cheap to compute (a file mtime, a constant) so that
+    unchanged data is never rebuilt, re-serialized or re-hashed.
+    """
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    cached = CachedJSON(build())
+    with _cache_lock:
+        _cache[key] = (version, cached)
+    return cached
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def conditional_json_response(request: Request, cached: CachedJSON,
+                              cache_control: str = REVALIDATE_CACHE_CONTROL) -> Response:
+    """Answer 304 when the client already has this representation, else send it with its ETag"""
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Local filesystem work (pack scans, file reads, staging copies) gets its own
+# small pool, so it can't starve the default executor that to_thread and the
+# outbound HTTP calls share. The pool is FIFO: map_io_batched keeps at most
+# FILE_IO_INFLIGHT_BATCHES of one call's batches queued, so a big pack leaves
+# room for other requests' file I/O between its batches.
+FILE_IO_WORKERS = int(os.getenv("FILE_IO_WORKERS", "4"))
+FILE_IO_BATCH_SIZE = int(os.getenv("FILE_IO_BATCH_SIZE", "64"))
+FILE_IO_INFLIGHT_BATCHES = max(1, int(os.getenv("FILE_IO_INFLIGHT_BATCHES", str(FILE_IO_WORKERS // 2))))
+
+io_executor = ThreadPoolExecutor(max_workers=FILE_IO_WORKERS, thread_name_prefix="file-io")
+
+
+async def run_io(func: Callable[..., R], *args, **kwargs) -> R:
+    """Run a blocking filesystem call on the I/O executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+
+class IOCancelled(Exception):
+    """Raised inside a run_io_cancellable call once its caller has been cancelled"""
+
+
+async def run_io_cancellable(func: Callable[[threading.Event], R]) -> R:
+    """Run ``func(cancelled)`` on the I/O executor; a cancel only returns once it has stopped.
+
+    Cancelling a plain run_io leaves the thread running, e.g. still writing
+    into a directory the caller is about to remove. Here the event is set
+    instead, ``func`` is expected to check it between files (raising
+    IOCancelled), and the CancelledError is re-raised after it returns.
+    """
+    cancelled = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(io_executor, func, cancelled)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancelled.set()
+        await asyncio.wait({future})
+        if not future.cancelled():
+            future.exception()  # IOCancelled, expected; don't log it as unretrieved
+        raise
+
+
+async def map_io_batched(func: Callable[[T], Any], items: Sequence[T],
+                         batch_size: int = FILE_IO_BATCH_SIZE) -> List[Any]:
+    """Apply ``func`` to every item on the I/O executor, one executor hop per batch.
+
+    Results keep the order of ``items``. Batching keeps the per-file cost to a
+    function call instead of a future and a loop wakeup; at most
+    FILE_IO_INFLIGHT_BATCHES batches of one call are on the executor at once.
+    """
+    semaphore = asyncio.Semaphore(FILE_IO_INFLIGHT_BATCHES)
+
+    def run_batch(batch: Sequence[T]) -> List[Any]:
+        return [func(item) for item in batch]
+
+    async def limited(batch: Sequence[T]) -> List[Any]:
+        async with semaphore:
+            return await run_io(run_batch, batch)
+
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+    results = await asyncio.gather(*(limited(batch) for batch in batches))
+    return [result for batch in results for result in batch]
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from models.deployment import TDCredentials
+from services.github_http import GITHUB_API_URL, github_session
+from services.td_client import TDAPIError
+from services.td_service import TDMCPService
+
+PASS, WARN, FAIL, SKIPPED = "pass", "warn", "fail", "skipped"
+
+# GitHub repository names: ASCII letters, digits, '.', '-' and '_', up to 100
+# characters. GitHub silently rewrites anything else to '-', so we reject it.
+_REPO_NAME = re.compile(r"^[A-Za-z0-9._-]{1,100}$")
+
+# 'workflow' is needed to push files under .github/workflows
+REQUIRED_SCOPES = {"repo", "workflow"}
+
+GITHUB_HEADERS = {
+    'Accept': 'application/vnd.github+json',
+    'X-GitHub-Api-Version': '2022-11-28',
+    'User-Agent': 'TD-Value-Accelerator/1.0'
+}
+
+
+def _check(name: str, status: str, message: str, **details) -> Dict[str, Any]:
+    return {"name": name, "status": status, "message": message, "details": details}
+
+
+def check_repo_name(repo_name: Optional[str]) -> Dict[str, Any]:
+    if not repo_name:
+        return _check("repo_name_syntax", FAIL, "Repository name is required")
+    if not _REPO_NAME.match(repo_name):
+        return _check("repo_name_syntax", FAIL,
+                      "Repository names may only contain letters, digits, '.', '-' and '_' (max 100 characters)")
+    if repo_name in (".", "..") or repo_name.lower().endswith(".git"):
+        return _check("repo_name_syntax", FAIL, f"'{repo_name}' is reserved by GitHub")
+    return _check("repo_name_syntax", PASS, "Repository name is valid")
+
+
+def check_source_package(source_base: str, source_package: Optional[str]) -> Dict[str, Any]:
+    if not source_package:
+        return _check("source_package", FAIL, "Source package is required")
+    # A package is a directory directly under source_base; anything else would probe the filesystem
+    if source_package in (".", "..") or os.path.basename(source_package) != source_package \
+            or (os.altsep and os.altsep in source_package):
+        return _check("source_package", FAIL, f"Invalid package name '{source_package}'")
+    if not os.path.isdir(os.path.join(source_base, source_package)):
+        return _check("source_package", FAIL, f"Package {source_package} not found in source repository")
+    return _check("source_package", PASS, f"Package {source_package} found")
+
+
+def _github_get(token: str, path: str) -> requests.Response:
+    headers = dict(GITHUB_HEADERS, Authorization=f"Bearer {token}")
+    return github_session.get(f"{GITHUB_API_URL}{path}", headers=headers, timeout=10)
+
+
+def _github_message(response: requests.Response) -> str:
+    try:
+        return response.json().get("message", response.reason)
+    except ValueError:
+        return f"HTTP {response.status_code}"
+
+
+def check_token(token: str) -> Dict[str, Any]:
+    """Token validity and classic-token scopes (X-OAuth-Scopes) in one call"""
+    response = _github_get(token, "/user")
+    if response.status_code == 401:
+        return _check("github_token", FAIL, "Invalid GitHub token. Please check your Personal Access Token")
+    if not response.ok:
+        return _check("github_token", FAIL, f"GitHub error: {_github_message(response)}")
+
+    login = response.json().get("login")
+    scope_header = response.headers.get("X-OAuth-Scopes")
+    if scope_header is None:
+        # Fine-grained tokens don't report scopes; permissions surface on first use
+        return _check("github_token", WARN, "Token is valid, but its permissions can't be checked in advance "
+                      "(fine-grained token)", login=login, scopes=None)
+    scopes = {scope.strip() for scope in scope_header.split(",") if scope.strip()}
+    missing = sorted(REQUIRED_SCOPES - scopes)
+    if missing:
+        return _check("github_token", FAIL, f"Token is missing required scopes: {', '.join(missing)}",
+                      login=login, scopes=sorted(scopes))
+    return _check("github_token", PASS, f"Token valid for {login}", login=login, scopes=sorted(scopes))
+
+
+def check_repo_available(token: str, owner: str, repo_name: str) -> Dict[str, Any]:
+    response = _github_get(token, f"/repos/{owner}/{repo_name}")
+    if response.status_code == 404:
+        return _check("repo_available", PASS, f"{owner}/{repo_name} is available")
+    if response.ok:
+        return _check("repo_available", FAIL, f"Repository {owner}/{repo_name} already exists",
+                      url=response.json().get("html_url"))
+    return _check("repo_available", WARN, f"Could not check availability: {_github_message(response)}")
+
+
+def check_organization(token: str, organization: str) -> Dict[str, Any]:
+    """Active membership, and whether the member may create repositories and rulesets"""
+    membership = _github_get(token, f"/user/memberships/orgs/{organization}")
+    if membership.status_code in (403, 404):
+        return _check("organization", FAIL, f"Organization '{organization}' not found or you don't have access")
+    if not membership.ok:
+        return _check("organization", FAIL, f"Organization access error: {_github_message(membership)}")
+    membership_data = membership.json()
+    role = membership_data.get("role")
+    if membership_data.get("state") != "active":
+        return _check("organization", FAIL, f"Your membership in '{organization}' is not active yet", role=role)
+
+    org = _github_get(token, f"/orgs/{organization}")
+    org_data = org.json() if org.ok else {}
+    plan = (org_data.get("plan") or {}).get("name")
+    details = {"role": role, "plan": plan}
+    if role != "admin" and org_data.get("members_can_create_public_repositories") is False:
+        return _check("organization", FAIL, f"Members of '{organization}' can't create public repositories", **details)
+    if role != "admin":
+        return _check("organization", WARN, "You are not an organization admin; rulesets may need an admin to apply",
+                      **details)
+    return _check("organization", PASS, f"Admin of '{organization}' ({plan or 'unknown'} plan)", **details)
+
+
+async def check_td_token(env_name: str, token: str, region: str) -> Dict[str, Any]:
+    name = f"td_token_{env_name}"
+    try:
+        databases = await TDMCPService().list_databases(TDCredentials(apiKey=token, region=region))
+    except TDAPIError as e:
+        if e.status_code in (401, 403):
+            return _check(name, FAIL, f"{env_name} TD API key was rejected: {e.message}")
+        return _check(name, WARN, f"Could not verify {env_name} TD API key: {e.message}")
+    except requests.RequestException as e:
+        return _check(name, WARN, f"Could not reach Treasure Data to verify {env_name} key: {e}")
+    return _check(name, PASS, f"{env_name} TD API key is valid ({len(databases)} databases)")
+
+
+async def _guard(name: str, check) -> Dict[str, Any]:
+    """Turn an unexpected error in one check into a warning instead of failing the whole preflight"""
+    try:
+        if asyncio.iscoroutine(check):
+            return await check
+        return await asyncio.to_thread(check)
+    except Exception as e:
+        # e.g. a network error, or a proxy answering with HTML where JSON was expected
+        return _check(name, WARN, f"Could not complete check: {e}")
+
+
+async def run_preflight(github_token: Optional[str], repo_name: Optional[str], organization: Optional[str],
+                        source_base: str, source_package: Optional[str], td_region: str,
+                        env_tokens: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    """Run every deployment precondition concurrently and report each one"""
+    started = time.perf_counter()
+    checks: List[Dict[str, Any]] = [
+        check_repo_name(repo_name),
+        await asyncio.to_thread(check_source_package, source_base, source_package),
+    ]
+    pending = []
+
+    if not github_token:
+        checks.append(_check("github_token", FAIL, "GitHub token is required"))
+    else:
+        token_check = asyncio.ensure_future(_guard("github_token", lambda: check_token(github_token)))
+        pending.append(token_check)
+        if organization:
+            pending.append(_guard("organization", lambda: check_organization(github_token, organization)))
+
+        if checks[0]["status"] == PASS:
+            async def availability() -> Dict[str, Any]:
+                owner = organization
+                if not owner:
+                    # Personal repos live under the token's login, known once the token check is back
+                    owner = (await token_check)["details"].get("login")
+                    if not owner:
+                        return _check("repo_available", SKIPPED, "Skipped because the token could not be validated")
+                return await _guard("repo_available", lambda: check_repo_available(github_token, owner, repo_name))
+            pending.append(availability())
+
+    for env_name, token in sorted((env_tokens or {}).items()):
+        if token:
+            pending.append(_guard(f"td_token_{env_name}", check_td_token(env_name, token, td_region)))
+
+    checks.extend(await asyncio.gather(*pending))
+    return {
+        "ok": all(check["status"] != FAIL for check in checks),
+        "checks": checks,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,276 @@
+"""Repository provisioning shared by every deploy path: rulesets, environment secrets, variables.
+
+/api/github/copy-package, /api/deploy/create and minimal_server.py all call
+this engine and only reshape its results into the responses they have always
+returned. Requests go through the pooled ``github_session`` (keep-alive,
+outbound metrics, circuit breaker, deployment deadline), independent items
+are provisioned concurrently, and secret public keys are cached per
+repository environment.
+
+Every result carries ``status`` ``success``, ``skipped`` (e.g. rulesets on a
+plan without them) or ``error``, a human readable ``message``, and the HTTP
+``status_code`` when GitHub rejected the call.
+"""
+
+import asyncio
+import base64
+import functools
+import hashlib
+import os
+from typing import Any, Awaitable, Dict, List, Mapping, Optional, Tuple
+
+import requests
+
+from logging_config import logger
+from services.async_cache import AsyncTTLCache
+from services.github_http import GITHUB_API_URL, github_session
+from services.resilience import call_timeout
+
+# GitHub calls in flight at once for one provisioning step
+PROVISIONING_CONCURRENCY = int(os.getenv("PROVISIONING_CONCURRENCY", "4"))
+# Environment public keys rotate rarely; re-provisioning a repo within this window skips the lookup
+PUBLIC_KEY_TTL = float(os.getenv("SECRET_PUBLIC_KEY_TTL", "300"))
+
+SECRET_NAME = "TD_API_TOKEN"
+ENVIRONMENT_SETTINGS = {"wait_timer": 0, "reviewers": [], "deployment_branch_policy": None}
+
+US_WORKFLOW_ENDPOINT = "https://api-workflow.treasuredata.com"
+EU_WORKFLOW_ENDPOINT = "https://api-workflow.eu01.treasuredata.com"
+
+# The same rulesets the UI's CLI instructions create
+BRANCH_NAMING_RULESET = {
+    "name": "Enforce Branch Names",
+    "target": "branch",
+    "enforcement": "active",
+    "conditions": {"ref_name": {"exclude": ["refs/heads/main"], "include": ["~ALL"]}},
+    "rules": [
+        {"type": "non_fast_forward"},
+        {
+            "type": "branch_name_pattern",
+            "parameters": {
+                "operator": "regex",
+                "pattern": "^(feat|fix|hot)/[a-z0-9._-]+$",
+                "negate": False,
+                "name": "Enforce feature branch naming convention"
+            }
+        }
+    ],
+    "bypass_actors": []
+}
+
+MAIN_BRANCH_RULESET = {
+    "name": "Main Branch Protection",
+    "target": "branch",
+    "enforcement": "active",
+    "conditions": {"ref_name": {"exclude": [], "include": ["~DEFAULT_BRANCH"]}},
+    "rules": [
+        {"type": "deletion"},  # Prevent deletion of main branch
+        {"type": "non_fast_forward"}  # Prevent force pushes
+    ],
+    "bypass_actors": []
+}
+
+# Created instead of the naming ruleset when GitHub rejects the name pattern (422)
+BASIC_BRANCH_RULESET = {
+    "name": "Basic Branch Protection",
+    "target": "branch",
+    "enforcement": "active",
+    "conditions": {"ref_name": {"exclude": ["refs/heads/main"], "include": ["~ALL"]}},
+    "rules": [{"type": "non_fast_forward"}],
+    "bypass_actors": []
+}
+
+_public_keys = AsyncTTLCache(ttl=PUBLIC_KEY_TTL, max_entries=256)
+
+
+def workflow_api_endpoint(td_region: str) -> str:
+    """TD_WF_API_ENDPOINT for a TD region; anything not recognisably EU uses the US endpoint"""
+    if td_region.startswith("eu"):
+        return EU_WORKFLOW_ENDPOINT
+    return US_WORKFLOW_ENDPOINT
+
+
+def _headers(token: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+
+
+async def _call(method: str, path: str, token: str, json: Any = None, timeout: float = 10) -> requests.Response:
+    return await asyncio.to_thread(github_session.request, method, f"{GITHUB_API_URL}{path}",
+                                   headers=_headers(token), json=json, timeout=call_timeout(timeout))
+
+
+async def _gather_limited(*coroutines: Awaitable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run concurrently, at most PROVISIONING_CONCURRENCY at a time; results keep their order"""
+    semaphore = asyncio.Semaphore(PROVISIONING_CONCURRENCY)
+
+    async def limited(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return list(await asyncio.gather(*(limited(coroutine) for coroutine in coroutines)))
+
+
+def _error_detail(response: requests.Response) -> str:
+    try:
+        error_json = response.json()
+    except ValueError:
+        return f" - {response.text[:200]}"
+    detail = f" - {error_json['message']}" if "message" in error_json else ""
+    if "errors" in error_json:
+        detail += f" - Errors: {error_json['errors']}"
+    return detail
+
+
+@functools.lru_cache(maxsize=64)
+def _sealed_box(public_key: str):
+    # Imported on first use: only secrets need it
+    from nacl import public
+    return public.SealedBox(public.PublicKey(base64.b64decode(public_key)))
+
+
+def encrypt_secret(public_key: str, value: str) -> str:
+    """Seal a secret for GitHub with the repository environment's public key"""
+    try:
+        box = _sealed_box(public_key)
+    except ImportError:
+        logger.warning("PyNaCl is not installed; sending the secret base64-encoded only")
+        return base64.b64encode(value.encode("utf-8")).decode("utf-8")
+    return base64.b64encode(box.encrypt(value.encode("utf-8"))).decode("utf-8")
+
+
+def _public_key_cache_key(token: str, owner: str, repo: str, env: str) -> Tuple[str, str, str, str]:
+    # Keys are per caller as well as per environment; the token itself is never stored
+    return hashlib.sha256(token.encode()).hexdigest()[:16], owner, repo, env
+
+
+async def _public_key(token: str, owner: str, repo: str, env: str) -> Tuple[str, str]:
+    async def load():
+        response = await _call("GET", f"/repos/{owner}/{repo}/environments/{env}/secrets/public-key", token)
+        if not response.ok:
+            raise RuntimeError(f"Failed to get public key for {env}: {response.status_code}")
+        data = response.json()
+        return data["key_id"], data["key"]
+
+    return await _public_keys.get_or_load(_public_key_cache_key(token, owner, repo, env), load)
+
+
+async def _post_ruleset(token: str, owner: str, repo: str, name: str, ruleset: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        response = await _call("POST", f"/repos/{owner}/{repo}/rulesets", token, json=ruleset, timeout=15)
+    except Exception as e:
+        return {"name": name, "status": "error", "message": f"Network error creating {name} ruleset: {e}"}
+    if response.ok:
+        return {"name": name, "status": "success", "id": response.json().get("id"),
+                "message": f"{name} ruleset created successfully"}
+    if response.status_code == 403 and "billing plan" in response.text.lower():
+        return {"name": name, "status": "skipped", "status_code": 403,
+                "message": "Requires GitHub Pro/Team/Enterprise plan"}
+    return {"name": name, "status": "error", "status_code": response.status_code,
+            "message": f"Failed to create {name} ruleset: {response.status_code}{_error_detail(response)}"}
+
+
+async def create_rulesets(token: str, owner: str, repo: str) -> List[Dict[str, Any]]:
+    """Branch naming (or the basic fallback) and main branch protection, created concurrently"""
+    async def branch_naming():
+        result = await _post_ruleset(token, owner, repo, "Branch Naming", BRANCH_NAMING_RULESET)
+        if result.get("status_code") != 422:
+            return result
+        logger.info(f"Branch naming ruleset rejected for {owner}/{repo}; creating basic branch protection instead")
+        fallback = await _post_ruleset(token, owner, repo, "Basic Branch Protection (Fallback)", BASIC_BRANCH_RULESET)
+        if fallback["status"] == "success":
+            fallback["message"] = "Basic branch protection created (branch naming pattern not supported)"
+            return fallback
+        result["message"] += " (fallback also failed)"
+        return result
+
+    results = await _gather_limited(
+        branch_naming(),
+        _post_ruleset(token, owner, repo, "Main Branch Protection", MAIN_BRANCH_RULESET)
+    )
+    for result in results:
+        logger.info(f"Ruleset {result['name']} for {owner}/{repo}: {result['status']} - {result['message']}")
+    return results
+
+
+async def _set_environment_secret(token: str, owner: str, repo: str, env: str, value: str) -> Dict[str, Any]:
+    result = {"environment": env, "name": f"{env}/{SECRET_NAME}"}
+    try:
+        response = await _call("PUT", f"/repos/{owner}/{repo}/environments/{env}", token, json=ENVIRONMENT_SETTINGS)
+        if not response.ok:
+            logger.warning(f"Environment {env} creation warning: {response.status_code} - {response.text}")
+
+        for attempt in range(2):
+            key_id, public_key = await _public_key(token, owner, repo, env)
+            response = await _call("PUT", f"/repos/{owner}/{repo}/environments/{env}/secrets/{SECRET_NAME}", token,
+                                   json={"encrypted_value": encrypt_secret(public_key, value), "key_id": key_id})
+            if response.status_code != 422 or attempt:
+                break
+            # A cached key from a repository that has since been recreated; fetch the current one
+            _public_keys.invalidate(_public_key_cache_key(token, owner, repo, env))
+        if response.ok:
+            return dict(result, status="success", message=f"{SECRET_NAME} secret set for {env}")
+        return dict(result, status="error", status_code=response.status_code,
+                    message=f"Failed to set secret for {env}: {response.status_code} - {response.text}")
+    except Exception as e:
+        return dict(result, status="error", message=f"Error setting up {env} environment: {e}")
+
+
+async def create_environment_secrets(token: str, owner: str, repo: str,
+                                     secrets: Mapping[str, Optional[str]]) -> List[Dict[str, Any]]:
+    """Create each environment and set its TD_API_TOKEN secret; environments without a value are skipped"""
+    results = await _gather_limited(*(
+        _set_environment_secret(token, owner, repo, env, value) for env, value in secrets.items() if value
+    ))
+    for result in results:
+        logger.info(f"Secret {result['name']} for {owner}/{repo}: {result['status']} - {result['message']}")
+    return results
+
+
+async def _set_variable(token: str, owner: str, repo: str, name: str, value: str) -> Dict[str, Any]:
+    result = {"variable": name, "value": value}
+    try:
+        # Update first in case it exists, create on 404
+        response = await _call("PATCH", f"/repos/{owner}/{repo}/actions/variables/{name}", token, json={"value": value})
+        if response.status_code == 404:
+            response = await _call("POST", f"/repos/{owner}/{repo}/actions/variables", token,
+                                   json={"name": name, "value": value})
+        if response.ok:
+            return dict(result, status="success", message=f"Repository variable {name} set successfully")
+        return dict(result, status="error", status_code=response.status_code,
+                    message=f"Failed to set variable {name}: {response.status_code} - {response.text}")
+    except Exception as e:
+        return dict(result, status="error", message=f"Error setting variable {name}: {e}")
+
+
+async def create_variables(token: str, owner: str, repo: str, project_name: str,
+                           td_region: str) -> List[Dict[str, Any]]:
+    """TD_WF_API_ENDPOINT for the region and TD_WF_PROJS for the project, set concurrently"""
+    results = await _gather_limited(
+        _set_variable(token, owner, repo, "TD_WF_API_ENDPOINT", workflow_api_endpoint(td_region)),
+        _set_variable(token, owner, repo, "TD_WF_PROJS", project_name)
+    )
+    for result in results:
+        logger.info(f"Variable {result['variable']} = {result['value']} for {owner}/{repo}: {result['status']}")
+    return results
+
+
+async def provision(token: str, owner: str, repo: str, rulesets: bool = True,
+                    secrets: Optional[Mapping[str, Optional[str]]] = None, project_name: Optional[str] = None,
+                    td_region: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Every step at once, for callers with no progress to report between them.
+
+    Variables are only set when ``td_region`` is given.
+    """
+    steps = {}
+    if rulesets:
+        steps["rulesets"] = create_rulesets(token, owner, repo)
+    if secrets:
+        steps["secrets"] = create_environment_secrets(token, owner, repo, secrets)
+    if td_region is not None:
+        steps["variables"] = create_variables(token, owner, repo, project_name, td_region)
+    results = await asyncio.gather(*steps.values())
+    return {"rulesets": [], "secrets": [], "variables": [], **dict(zip(steps, results))}
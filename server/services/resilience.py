@@ -0,0 +1,184 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+
+from logging_config import logger
+
+# Overall budget for one deployment (copy-package or /api/deployment/create):
+# every outbound call and git command inside it gets at most what is left.
+DEPLOYMENT_DEADLINE = float(os.getenv("DEPLOYMENT_DEADLINE_SECONDS", "600"))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+Timeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+# Absolute time.monotonic() the current deployment must finish by. Tasks and
+# asyncio.to_thread copy the context, so the deadline follows the work into
+# worker threads without being passed around.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The deployment's time budget ran out before this call could start.
+
+    A ``requests`` Timeout, so existing timeout handling applies to it.
+    """
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """A call was refused because its host is known to be down"""
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Bound everything run inside the block to ``seconds``; nested deadlines can only shorten it"""
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or None outside one"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def call_timeout(timeout: Timeout) -> Timeout:
+    """A call's own timeout, capped by the remaining deadline.
+
+    Accepts the same forms as ``requests`` (a number, a (connect, read)
+    tuple or None). Raises DeadlineExceeded once the budget is spent.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Deployment deadline exceeded")
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open, calls fail immediately with CircuitOpenError. After
+    ``reset_timeout`` one trial call is let through (half-open); its outcome
+    closes the breaker again or re-opens it for another period. A trial that
+    ends without an outcome (``release_trial``, or no report within
+    ``reset_timeout``) lets the next call try instead.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_started = now
+                return
+            if self.state == self.HALF_OPEN and now - self.trial_started >= self.reset_timeout:
+                self.trial_started = now
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open); retry in a few seconds")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.rejected = 0
+
+    def release_trial(self):
+        """The call failed in a way that says nothing about the host; let the next call be the trial"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class BreakerRegistry:
+    """One breaker per host (api.github.com, raw.githubusercontent.com, each TD region, MCP)"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(host, CircuitBreaker(host))
+        return breaker
+
+    def reset(self):
+        """Close every breaker in place; holders of a breaker (e.g. MCPAvailability) keep a live one"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.reset()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.stats() for host, breaker in sorted(breakers.items())}
+
+
+breakers = BreakerRegistry()
+
+
+def is_failure(status_code: int) -> bool:
+    """Responses that say the dependency itself is unhealthy (not that our request was wrong)"""
+    return status_code >= 500
@@ -0,0 +1,267 @@
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from logging_config import logger
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "state.db")
+
+
+class StateStore(ABC):
+    """Job records (copy sessions, deployments) keyed by session ID.
+
+    Each record is a JSON object; its ``status`` is also kept separately so
+    history can be filtered by it. Every method is safe to call from any
+    thread, and with the SQLite backend from any worker process. Async code
+    uses the ``a``-prefixed variants, which keep a write that is waiting on
+    another worker's lock off the event loop.
+    """
+
+    @abstractmethod
+    def create(self, session_id: str, kind: str, data: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Merge ``fields`` into the record; returns the new record, or None if there is none"""
+
+    @abstractmethod
+    def append(self, session_id: str, field: str, value: Any):
+        """Append ``value`` to the list in ``field``"""
+
+    @abstractmethod
+    def history(self, kind: Optional[str] = None, status: Optional[str] = None,
+                limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently updated records first"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    async def acreate(self, session_id: str, kind: str, data: Dict[str, Any]):
+        await asyncio.to_thread(self.create, session_id, kind, data)
+
+    async def aget(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def aupdate(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(lambda: self.update(session_id, **fields))
+
+    async def aappend(self, session_id: str, field: str, value: Any):
+        await asyncio.to_thread(self.append, session_id, field, value)
+
+    async def ahistory(self, kind: Optional[str] = None, status: Optional[str] = None,
+                       limit: int = 50) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.history, kind, status, limit)
+
+
+class MemoryStateStore(StateStore):
+    """Process-local store; enough for a single uvicorn worker"""
+
+    def __init__(self, max_records: int = 1000):
+        self.max_records = max_records
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str, kind: str, data: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._records[session_id] = {
+                "kind": kind, "data": copy.deepcopy(data), "created_at": now, "updated_at": now
+            }
+            if len(self._records) > self.max_records:
+                oldest = min(self._records, key=lambda key: self._records[key]["updated_at"])
+                del self._records[oldest]
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(session_id)
+            return copy.deepcopy(record["data"]) if record else None
+
+    def update(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return None
+            record["data"].update(copy.deepcopy(fields))
+            record["updated_at"] = time.time()
+            return copy.deepcopy(record["data"])
+
+    def append(self, session_id: str, field: str, value: Any):
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is not None:
+                record["data"].setdefault(field, []).append(copy.deepcopy(value))
+                record["updated_at"] = time.time()
+
+    def history(self, kind: Optional[str] = None, status: Optional[str] = None,
+                limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [
+                (session_id, record) for session_id, record in self._records.items()
+                if (kind is None or record["kind"] == kind)
+                and (status is None or record["data"].get("status") == status)
+            ]
+            rows.sort(key=lambda row: -row[1]["updated_at"])
+            return [_history_entry(session_id, record["kind"], record["data"], record["created_at"],
+                                   record["updated_at"]) for session_id, record in rows[:limit]]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._records.pop(session_id, None)
+
+    # Nothing here blocks for long, so the async variants skip the thread hop
+
+    async def acreate(self, session_id: str, kind: str, data: Dict[str, Any]):
+        self.create(session_id, kind, data)
+
+    async def aget(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self.get(session_id)
+
+    async def aupdate(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        return self.update(session_id, **fields)
+
+    async def aappend(self, session_id: str, field: str, value: Any):
+        self.append(session_id, field, value)
+
+    async def ahistory(self, kind: Optional[str] = None, status: Optional[str] = None,
+                       limit: int = 50) -> List[Dict[str, Any]]:
+        return self.history(kind, status, limit)
+
+
+class SQLiteStateStore(StateStore):
+    """SQLite store in WAL mode, shared by every worker process on the host.
+
+    WAL lets pollers read while a deployment writes; read-modify-write
+    updates run in ``BEGIN IMMEDIATE`` transactions so concurrent workers
+    never lose each other's fields.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS jobs (
+            session_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_kind ON jobs (kind, updated_at)",
+    )
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads; one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._ensure_schema(connection)
+        return connection
+
+    def _ensure_schema(self, connection: sqlite3.Connection):
+        with self._schema_lock:
+            if not self._schema_ready:
+                for statement in self._SCHEMA:
+                    connection.execute(statement)
+                self._schema_ready = True
+                logger.info(f"State store ready at {self.path}")
+
+    def create(self, session_id: str, kind: str, data: Dict[str, Any]):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO jobs (session_id, kind, status, data, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, kind, data.get("status"), json.dumps(data), now, now),
+        )
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM jobs WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _modify(self, session_id: str, change) -> Optional[Dict[str, Any]]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT data FROM jobs WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            data = json.loads(row[0])
+            change(data)
+            connection.execute(
+                "UPDATE jobs SET data = ?, status = ?, updated_at = ? WHERE session_id = ?",
+                (json.dumps(data), data.get("status"), time.time(), session_id),
+            )
+            connection.execute("COMMIT")
+            return data
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def update(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        return self._modify(session_id, lambda data: data.update(fields))
+
+    def append(self, session_id: str, field: str, value: Any):
+        self._modify(session_id, lambda data: data.setdefault(field, []).append(value))
+
+    def history(self, kind: Optional[str] = None, status: Optional[str] = None,
+                limit: int = 50) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT session_id, kind, data, created_at, updated_at FROM jobs {where} "
+            f"ORDER BY updated_at DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [_history_entry(session_id, kind, json.loads(data), created_at, updated_at)
+                for session_id, kind, data, created_at, updated_at in rows]
+
+    def delete(self, session_id: str):
+        self._connection().execute("DELETE FROM jobs WHERE session_id = ?", (session_id,))
+
+
+def _history_entry(session_id: str, kind: str, data: Dict[str, Any], created_at: float,
+                   updated_at: float) -> Dict[str, Any]:
+    return {"session_id": session_id, "kind": kind, "created_at": created_at,
+            "updated_at": updated_at, **data}
+
+
+def create_state_store() -> StateStore:
+    """STATE_BACKEND=sqlite (with STATE_DB_PATH) for multi-worker deployments; memory otherwise"""
+    backend = os.getenv("STATE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteStateStore(os.getenv("STATE_DB_PATH", DEFAULT_DB_PATH))
+    if backend != "memory":
+        logger.warning(f"Unknown STATE_BACKEND '{backend}', using in-memory state")
+    return MemoryStateStore()
+
+
+state_store = create_state_store()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "TD-Value-Accelerator/1.0"
+
+# (connect, read) seconds; TD's list endpoints can be slow for large accounts
+DEFAULT_TIMEOUT: Tuple[float, float] = (
+    float(os.getenv("TD_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("TD_READ_TIMEOUT", "15")),
+)
+
+
+class TDAPIError(Exception):
+    """Non-2xx response from the Treasure Data API"""
+
+    def __init__(self, status_code: int, message: str, response: Optional[requests.Response] = None):
+        super().__init__(f"TD API error {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.response = response
+
+
+def td_api_base(region: str) -> str:
+    """Regional REST endpoint. ``TD_API_BASE_URL`` points every region at one server (e.g. a local stand-in)."""
+    override = os.getenv("TD_API_BASE_URL")
+    if override:
+        return override.rstrip("/")
+    if region == "us01":
+        return "https://api.treasuredata.com"
+    return f"https://api.{region}.treasuredata.com"
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=int(os.getenv("TD_MAX_RETRIES", "2")),
+        backoff_factor=0.3,
+        status_forcelist=(429, 502, 503, 504),
+        # Only idempotent calls are retried; a replayed POST could run a job twice
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=int(os.getenv("TD_POOL_MAXSIZE", "10")),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def session_for(base_url: str) -> requests.Session:
+    """One keep-alive session (and connection pool) per regional endpoint, shared by all callers"""
+    session = _sessions.get(base_url)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(base_url)
+            if session is None:
+                session = _sessions[base_url] = _build_session()
+    return session
+
+
+class TDClient:
+    """Treasure Data REST client for one API key and region.
+
+    Clients are cheap to create per request; connections are pooled per
+    endpoint. The blocking ``request`` is for code already running in a worker
+    thread, the async methods run it off the event loop.
+    """
+
+    def __init__(self, api_key: str, region: str, base_url: Optional[str] = None,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+        self.region = region
+        self.base_url = (base_url or td_api_base(region)).rstrip("/")
+        self.timeout = timeout
+        self._session = session_for(self.base_url)
+        self._auth = {"Authorization": f"TD1 {api_key}"}
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        headers = dict(self._auth)
+        headers.update(kwargs.pop("headers", None) or {})
+        kwargs.setdefault("timeout", self.timeout)
+        return self._session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+
+    async def arequest(self, method: str, path: str, **kwargs) -> requests.Response:
+        return await asyncio.to_thread(self.request, method, path, **kwargs)
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        response = await self.arequest("GET", path, params=params)
+        if not response.ok:
+            raise TDAPIError(response.status_code, _error_message(response), response)
+        return response.json()
+
+    async def list_databases(self) -> List[Dict[str, Any]]:
+        return (await self.get_json("/v3/database/list")).get("databases", [])
+
+    async def list_tables(self, database: str) -> List[Dict[str, Any]]:
+        # User-supplied: '/' or '?' must not rewrite the request path. requests
+        # decodes %2E back to '.', so dot segments can only be refused.
+        if database.strip(".") == "":
+            raise TDAPIError(404, f"Database '{database}' does not exist")
+        return (await self.get_json(f"/v3/table/list/{quote(database, safe='')}")).get("tables", [])
+
+
+def _error_message(response: requests.Response) -> str:
+    try:
+        data = response.json()
+    except ValueError:
+        return response.text.strip()[:200] or (response.reason or "Unknown error")
+    if isinstance(data, dict):
+        for field in ("message", "error", "detail"):
+            if data.get(field):
+                return str(data[field])
+    return str(data)[:200]
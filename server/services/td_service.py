@@ -1,7 +1,27 @@
+import asyncio
+import hashlib
+import os
 import requests
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from models.deployment import TDCredentials
+from services.async_cache import AsyncTTLCache
+from services.td_client import TDAPIError, TDClient
+
+# Database and table listings per credential. Past the TTL an entry is still
+# served for the stale window while a background call refreshes it, so large
+# accounts don't wait on TD's list endpoints on every page view.
+catalog_cache = AsyncTTLCache(
+    ttl=float(os.getenv("TD_CATALOG_TTL", "60")),
+    stale_ttl=float(os.getenv("TD_CATALOG_STALE_TTL", "600")),
+    negative_ttl=float(os.getenv("TD_CATALOG_NEGATIVE_TTL", "5")),
+    max_entries=4096,
+    cache_exception=lambda exc: isinstance(exc, TDAPIError) and 400 <= exc.status_code < 500,
+)
+
+def credential_hash(credentials: TDCredentials) -> str:
+    """Stable cache key for a credential pair that doesn't hold the API key itself"""
+    return hashlib.sha256(f"{credentials.apiKey}\0{credentials.region}".encode()).hexdigest()
 
 class TDMCPService:
     """Service to interact with TD MCP server"""
@@ -10,56 +30,74 @@ class TDMCPService:
         self.mcp_url = mcp_url
     
     async def test_connection(self, credentials: TDCredentials) -> bool:
-        """Test connection to Treasure Data via MCP"""
+        """Test connection to Treasure Data"""
         try:
-            payload = {
-                "credentials": {
-                    "api_key": credentials.apiKey,
-                    "region": credentials.region
-                },
-                "database": credentials.database
-            }
-            
-            # This would be the actual MCP call
-            # response = requests.post(f"{self.mcp_url}/test", json=payload, timeout=10)
-            # return response.status_code == 200
-            
-            # For demo purposes, simulate connection test
-            return bool(credentials.apiKey and credentials.region and credentials.database)
-            
-        except Exception as e:
-            print(f"TD MCP connection error: {e}")
+            await TDClient(credentials.apiKey, credentials.region).list_databases()
+            return True
+        except (TDAPIError, requests.RequestException) as e:
+            print(f"TD connection error: {e}")
             return False
     
     async def list_databases(self, credentials: TDCredentials) -> List[Dict[str, Any]]:
-        """List available databases"""
-        try:
-            # This would call TD MCP server
-            # For demo, return mock data
-            return [
-                {"name": "production", "description": "Production database"},
-                {"name": "staging", "description": "Staging database"}, 
-                {"name": "development", "description": "Development database"}
-            ]
-        except Exception as e:
-            print(f"Error listing databases: {e}")
-            return []
+        """List databases visible to the credentials (cached per credential)"""
+        return await catalog_cache.get_or_load(
+            (credential_hash(credentials), "databases"),
+            lambda: self._fetch_databases(credentials)
+        )
     
     async def list_tables(self, credentials: TDCredentials, database: str) -> List[Dict[str, Any]]:
-        """List tables in a database"""
-        try:
-            # This would call TD MCP server
-            # For demo, return mock data
-            return [
-                {"name": "customers", "rows": 1000000},
-                {"name": "orders", "rows": 500000},
-                {"name": "products", "rows": 10000}
-            ]
-        except Exception as e:
-            print(f"Error listing tables: {e}")
-            return []
+        """List tables in a database (cached per credential)"""
+        return await catalog_cache.get_or_load(
+            (credential_hash(credentials), "tables", database),
+            lambda: self._fetch_tables(credentials, database)
+        )
+    
+    async def list_tables_many(self, credentials: TDCredentials, databases: List[str],
+                               concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+        """List tables of several databases concurrently; one failing database doesn't fail the rest"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def one(database: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return {"tables": await self.list_tables(credentials, database)}
+                except TDAPIError as e:
+                    return {"error": e.message, "status_code": e.status_code}
+                except requests.RequestException as e:
+                    return {"error": str(e), "status_code": 502}
+        
+        results = await asyncio.gather(*(one(database) for database in databases))
+        return dict(zip(databases, results))
+    
+    async def _fetch_databases(self, credentials: TDCredentials) -> List[Dict[str, Any]]:
+        databases = await TDClient(credentials.apiKey, credentials.region).list_databases()
+        return [
+            {
+                "name": db.get("name"),
+                "tables": db.get("count"),
+                "permission": db.get("permission"),
+                "created_at": db.get("created_at"),
+                "updated_at": db.get("updated_at")
+            }
+            for db in sorted(databases, key=lambda db: db.get("name") or "")
+        ]
+    
+    async def _fetch_tables(self, credentials: TDCredentials, database: str) -> List[Dict[str, Any]]:
+        tables = await TDClient(credentials.apiKey, credentials.region).list_tables(database)
+        return [
+            {
+                "name": table.get("name"),
+                "rows": table.get("count"),
+                "type": table.get("type"),
+                "estimated_storage_size": table.get("estimated_storage_size"),
+                "created_at": table.get("created_at"),
+                "updated_at": table.get("updated_at")
+            }
+            for table in sorted(tables, key=lambda table: table.get("name") or "")
+        ]
     
-    async def execute_workflow(self, credentials: TDCredentials, workflow_content: str, workflow_name: str) -> Dict[str, Any]:
+    async def execute_workflow(self, credentials: TDCredentials, workflow_content: str, workflow_name: str,
+                               database: Optional[str] = None) -> Dict[str, Any]:
         """Execute a workflow via TD MCP"""
         try:
             payload = {
@@ -71,7 +109,7 @@ class TDMCPService:
                     "name": workflow_name,
                     "content": workflow_content
                 },
-                "database": credentials.database
+                "database": database
             }
             
             # This would be the actual MCP call to execute workflow
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+# ${NAME} placeholders. Names are whatever a parameter key can be upper-cased
+# to (dots and dashes included), as with the str.replace rendering this
+# replaced. Digdag's own ${session_time} / ${td.database} style variables share
+# the syntax, so anything without a value is left untouched.
+_PLACEHOLDER = re.compile(r"\$\{([^{}]+)\}")
+
+
+class CompiledTemplate:
+    """A template split once into literal text and placeholder names"""
+
+    __slots__ = ("literals", "names")
+
+    def __init__(self, text: str):
+        literals: List[str] = []
+        names: List[str] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(text):
+            literals.append(text[position:match.start()])
+            names.append(match.group(1))
+            position = match.end()
+        literals.append(text[position:])
+        self.literals = tuple(literals)
+        self.names = tuple(names)
+
+    @property
+    def has_placeholders(self) -> bool:
+        return bool(self.names)
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """Substitute in one pass; values are never re-scanned for placeholders"""
+        if not self.names:
+            return self.literals[0]
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = values.get(name)
+            parts.append("${" + name + "}" if value is None else value)
+            parts.append(literal)
+        return "".join(parts)
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Compiled templates by content hash: a pack file is parsed once however many
+# deployments render it. Rendered packs by (pack hash, params hash).
+_compiled = _LRU(int(os.getenv("TEMPLATE_CACHE_FILES", "4096")))
+_rendered = _LRU(int(os.getenv("TEMPLATE_CACHE_RENDERS", "64")))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def compile_template(text: str, content_hash: Optional[str] = None) -> CompiledTemplate:
+    key = content_hash or _digest(text.encode("utf-8"))
+    template = _compiled.get(key)
+    if template is None:
+        template = CompiledTemplate(text)
+        _compiled.put(key, template)
+    return template
+
+
+def template_values(parameters: Mapping[str, Any]) -> Dict[str, str]:
+    """Deployment parameters as placeholder values: upper-cased names, email lists as YAML items"""
+    values = {}
+    for key, value in parameters.items():
+        if isinstance(value, list) and "email" in key.lower():
+            values[key.upper()] = "\n".join(f"  - {email}" for email in value)
+        else:
+            values[key.upper()] = str(value)
+    return values
+
+
+def params_hash(values: Mapping[str, str]) -> str:
+    return _digest(json.dumps(values, sort_keys=True).encode("utf-8"))
+
+
+def render_files(files: Mapping[str, str], values: Mapping[str, str],
+                 pack_hash: Optional[str] = None) -> Dict[str, str]:
+    """Render a set of text files, reusing the result for an identical pack and parameters.
+
+    ``pack_hash`` can identify the pack version cheaply (e.g. pack id plus
+    mtime); without it one is computed from the file contents.
+    """
+    content_hashes = {name: _digest(content.encode("utf-8")) for name, content in files.items()}
+    if pack_hash is None:
+        pack_hash = _digest("\0".join(f"{name}:{content_hashes[name]}" for name in sorted(files)).encode("utf-8"))
+    key: Tuple[str, str] = (pack_hash, params_hash(values))
+    rendered = _rendered.get(key)
+    if rendered is None:
+        rendered = {
+            name: compile_template(content, content_hashes[name]).render(values)
+            for name, content in files.items()
+        }
+        _rendered.put(key, rendered)
+    return dict(rendered)
+
+
+def render_text(text: str, values: Mapping[str, str]) -> str:
+    return compile_template(text).render(values)
+
+
+class RenderingCopier:
+    """``copy_function`` for ``shutil.copytree`` that renders templates as files are staged.
+
+    Each file is read once: binary files (a NUL byte, or not UTF-8) and text
+    without placeholders are written back unchanged, everything else is
+    rendered in a single pass. Metadata is copied as ``copy2`` would.
+    """
+
+    def __init__(self, values: Mapping[str, str]):
+        self.values = values
+        self.rendered = 0
+
+    def __call__(self, src: str, dst: str) -> str:
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        with open(src, "rb") as f:
+            data = f.read()
+        if b"${" in data and b"\0" not in data:
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+            else:
+                template = compile_template(text, _digest(data))
+                if template.has_placeholders:
+                    data = template.render(self.values).encode("utf-8")
+                    self.rendered += 1
+        with open(dst, "wb") as f:
+            f.write(data)
+        shutil.copystat(src, dst)
+        return dst
+
+
+def precompile_tree(root: str) -> int:
+    """Compile every template under ``root`` ahead of staging; returns how many were compiled.
+
+    Entries are keyed by content hash exactly as ``RenderingCopier`` looks
+    them up, so a prefork server can build them once before its workers fork.
+    """
+    compiled = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if name != ".git"]
+        for filename in filenames:
+            try:
+                with open(os.path.join(dirpath, filename), "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if b"${" not in data or b"\0" in data:
+                continue
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                continue
+            compile_template(text, _digest(data))
+            compiled += 1
+    return compiled
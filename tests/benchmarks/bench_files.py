@@ -0,0 +1,38 @@
+"""GitHubService pack scans on synthetic packs of 100/1k/10k files"""
+
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path
+
+from harness import bench, make_pack
+
+from services.github_service import GitHubService
+
+PACK_SIZES = [100, 1000, 10000]
+
+
+def _service(files):
+    root = tempfile.mkdtemp(prefix="bench-pack-")
+    make_pack(root, files, binary_every=50)
+    service = GitHubService()
+    service.local_repo_path = Path(root)
+    return root, service
+
+
+@bench("github_service.get_all_files", params=PACK_SIZES, repeat=5)
+def get_all_files(files):
+    root, service = _service(files)
+    loop = asyncio.new_event_loop()
+    assert len(loop.run_until_complete(service.get_all_files("bench"))) == files
+    yield lambda: loop.run_until_complete(service.get_all_files("bench"))
+    loop.close()
+    shutil.rmtree(root)
+
+
+@bench("github_service.iter_files", params=PACK_SIZES)
+def iter_files(files):
+    """Metadata-only walk, without reading content"""
+    root, service = _service(files)
+    yield lambda: sum(1 for _ in service.iter_files("bench"))
+    shutil.rmtree(root)
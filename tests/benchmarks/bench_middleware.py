@@ -0,0 +1,63 @@
+"""Request logging middleware overhead, per request, against a bare ASGI app"""
+
+import asyncio
+import logging
+import os
+
+from harness import bench
+
+from logging_config import listener
+from observability.request_logging import RequestLoggingMiddleware
+
+REQUESTS_PER_CALL = 200
+
+# Keep the log listener's formatting and file writes but send stdout nowhere,
+# so the numbers aren't dominated by the terminal
+for handler in listener.handlers:
+    if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+        handler.setStream(open(os.devnull, "w"))
+
+
+async def _app(scope, receive, send):
+    status = 500 if scope["path"] == "/error" else 200
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"ok": true}'})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+def _scope(path: str):
+    return {"type": "http", "method": "GET", "path": path, "client": ("127.0.0.1", 50000), "headers": []}
+
+
+def _runner(app, path: str):
+    loop = asyncio.new_event_loop()
+    scope = _scope(path)
+
+    async def batch():
+        for _ in range(REQUESTS_PER_CALL):
+            await app(scope, _receive, _send)
+
+    return loop, lambda: loop.run_until_complete(batch())
+
+
+@bench("middleware.bare_app", ops=REQUESTS_PER_CALL)
+def bare_app():
+    loop, run = _runner(_app, "/api/github/packages")
+    yield run
+    loop.close()
+
+
+@bench("middleware.log_requests", params=["logged", "sampled_out", "error"], ops=REQUESTS_PER_CALL)
+def log_requests(mode):
+    rates = {"/api/github/copy-progress": 0.0} if mode == "sampled_out" else {}
+    path = {"logged": "/api/github/packages", "sampled_out": "/api/github/copy-progress/abc", "error": "/error"}[mode]
+    loop, run = _runner(RequestLoggingMiddleware(_app, sample_rates=rates), path)
+    yield run
+    loop.close()
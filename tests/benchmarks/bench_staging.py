@@ -0,0 +1,82 @@
+"""Staging a pack into the deployment checkout: copytree variants, and counting the result"""
+
+import itertools
+import os
+import shutil
+import tempfile
+
+from harness import bench, make_pack
+
+from services.template_engine import RenderingCopier, template_values
+
+PACK_SIZES = [100, 1000]
+
+
+def _hardlink(src, dst):
+    os.link(src, dst)
+    return dst
+
+
+STRATEGIES = {
+    "copy2": lambda: shutil.copy2,  # what copy-package uses without parameters
+    "copyfile": lambda: shutil.copyfile,  # skips copying permissions and timestamps
+    "hardlink": lambda: _hardlink,  # only valid when nothing is rendered
+    "rendering": lambda: RenderingCopier(template_values({"td_database": "analytics", "project_name": "demo"})),
+}
+
+
+def _staging(files, strategy):
+    root = tempfile.mkdtemp(prefix="bench-staging-")
+    pack = make_pack(root, files, binary_every=25)
+    counter = itertools.count()
+
+    def run():
+        destination = os.path.join(root, f"dest_{next(counter)}")
+        shutil.copytree(pack, destination, copy_function=STRATEGIES[strategy]())
+
+    return root, run
+
+
+for _strategy in STRATEGIES:
+    def _factory(files, strategy=_strategy):
+        root, run = _staging(files, strategy)
+        yield run
+        shutil.rmtree(root)
+
+    bench(f"staging.copytree_{_strategy}", params=PACK_SIZES)(_factory)
+
+
+def _count_with_walk(root):
+    # As in copy-package: every file outside .git
+    return sum(len(files) for dirpath, dirs, files in os.walk(root) if ".git" not in dirpath)
+
+
+def _count_with_scandir(root):
+    total = 0
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != ".git":
+                        pending.append(entry.path)
+                else:
+                    total += 1
+    return total
+
+
+@bench("file_count.os_walk", params=PACK_SIZES + [10000])
+def count_with_walk(files):
+    root = tempfile.mkdtemp(prefix="bench-count-")
+    pack = make_pack(root, files, size=16)
+    yield lambda: _count_with_walk(pack)
+    shutil.rmtree(root)
+
+
+@bench("file_count.scandir", params=PACK_SIZES + [10000])
+def count_with_scandir(files):
+    root = tempfile.mkdtemp(prefix="bench-count-")
+    pack = make_pack(root, files, size=16)
+    assert _count_with_scandir(pack) == _count_with_walk(pack)
+    yield lambda: _count_with_scandir(pack)
+    shutil.rmtree(root)
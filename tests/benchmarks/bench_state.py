@@ -0,0 +1,43 @@
+"""Progress-record updates and polls on each state store backend"""
+
+import itertools
+import os
+import shutil
+import tempfile
+
+from harness import bench
+
+from services.state_store import MemoryStateStore, SQLiteStateStore
+
+RECORD = {
+    "status": "copying_files", "repo_name": "bench", "organization": None, "package_name": "qsr-starter-pack",
+    "project_name": "demo", "total_files": 0, "files_processed": 0, "files_created": 0, "files_failed": 0,
+    "current_file": "", "errors": [], "started_at": None, "completed_at": None,
+}
+
+
+def _store(backend):
+    if backend == "memory":
+        return None, MemoryStateStore()
+    directory = tempfile.mkdtemp(prefix="bench-state-")
+    return directory, SQLiteStateStore(os.path.join(directory, "state.db"))
+
+
+@bench("progress.update", params=["memory", "sqlite"])
+def update(backend):
+    directory, store = _store(backend)
+    store.create("session", "copy-package", RECORD)
+    counter = itertools.count()
+    yield lambda: store.update("session", files_processed=next(counter), current_file="config/src_params.yml")
+    if directory:
+        shutil.rmtree(directory)
+
+
+@bench("progress.get", params=["memory", "sqlite"])
+def get(backend):
+    """What every /copy-progress poll costs"""
+    directory, store = _store(backend)
+    store.create("session", "copy-package", RECORD)
+    yield lambda: store.get("session")
+    if directory:
+        shutil.rmtree(directory)
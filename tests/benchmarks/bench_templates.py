@@ -0,0 +1,45 @@
+"""Config and workflow template rendering across parameter counts"""
+
+from harness import bench
+
+from services.deployment_service import DeploymentService
+from services.template_engine import _compiled, _rendered
+
+PARAM_COUNTS = [5, 50, 500]
+
+
+def _config_files(count: int):
+    body = "\n".join(f"key_{i}: ${{PARAM_{i}}}" for i in range(count))
+    return {f"config/file_{n}.yml": f"# file {n}\n{body}\n" for n in range(10)}
+
+
+@bench("templates.config", params=PARAM_COUNTS)
+def config_templates(count):
+    service = DeploymentService()
+    files = _config_files(count)
+    parameters = {f"param_{i}": f"value_{i}" for i in range(count)}
+    yield lambda: service._process_config_templates(files, parameters)
+
+
+@bench("templates.config_cold", params=PARAM_COUNTS)
+def config_templates_cold(count):
+    """Worst case: nothing compiled or rendered yet"""
+    service = DeploymentService()
+    files = _config_files(count)
+    parameters = {f"param_{i}": f"value_{i}" for i in range(count)}
+
+    def run():
+        _compiled.clear()
+        _rendered.clear()
+        service._process_config_templates(files, parameters)
+
+    yield run
+
+
+@bench("templates.workflow", params=[10, 100, 1000])
+def workflow_template(lines):
+    service = DeploymentService()
+    content = "\n".join(f"+task_{i}:\n  td>: queries/q_{i}.sql\n  database: ${{TD_DATABASE}}_${{ENVIRONMENT}}"
+                        for i in range(lines))
+    parameters = {"database": "analytics", "table_prefix": "va_", "environment": "prod"}
+    yield lambda: service._process_workflow_template(content, parameters)
@@ -0,0 +1,130 @@
+"""
+Timing harness for the server microbenchmarks.
+
+Benchmarks register with ``@bench``. Each one is a generator that does its
+setup, yields the callable to time, and cleans up after the yield:
+
+    @bench("templates.render", params=[10, 100])
+    def render(count):
+        template = ...
+        yield lambda: template.render(values)
+
+Timing follows timeit's approach: the loop count is calibrated so one sample
+takes at least ``min_sample_time``, the garbage collector is off while
+sampling, and the median of ``repeat`` samples is reported (the minimum and
+the spread are kept to judge how noisy the machine was).
+"""
+
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(BENCH_DIR)), "server")
+
+# Importing server modules configures logging; keep its files out of the tree
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "va-benchmark-logs"))
+sys.path.append(SERVER_DIR)
+
+_registry: List[Dict[str, Any]] = []
+
+
+def bench(name: str, params: Optional[List[Any]] = None, ops: int = 1, repeat: Optional[int] = None):
+    """Register a benchmark generator.
+
+    ``ops`` is the number of operations one call of the yielded callable
+    performs (e.g. requests in a batch); results are reported per operation.
+    ``repeat`` overrides the sample count for very slow cases.
+    """
+    def register(factory: Callable[..., Iterator[Callable[[], Any]]]):
+        _registry.append({"name": name, "factory": factory, "params": params, "ops": ops, "repeat": repeat})
+        return factory
+    return register
+
+
+def cases(name_filter: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    for entry in _registry:
+        for param in entry["params"] if entry["params"] is not None else [None]:
+            name = entry["name"] if param is None else f"{entry['name']}[{param}]"
+            if name_filter and name_filter not in name:
+                continue
+            yield dict(entry, name=name, param=param)
+
+
+def measure(func: Callable[[], Any], repeat: int = 7, min_sample_time: float = 0.1,
+            max_loops: int = 1_000_000) -> Dict[str, Any]:
+    """Seconds per call of ``func``: calibrated loops, ``repeat`` samples"""
+    func()  # warm-up: imports, caches, first-touch page faults
+
+    loops = 1
+    while True:
+        elapsed = _sample(func, loops)
+        if elapsed >= min_sample_time or loops >= max_loops:
+            break
+        # Jump straight to roughly the right count instead of doubling blindly
+        loops = min(max_loops, max(loops * 2, int(loops * min_sample_time / max(elapsed, 1e-9) * 1.2)))
+
+    samples = [_sample(func, loops) / loops for _ in range(repeat)]
+    median = statistics.median(samples)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "median": median,
+        "min": min(samples),
+        "stdev_pct": round(statistics.pstdev(samples) / median * 100, 1) if median else 0.0,
+    }
+
+
+def _sample(func: Callable[[], Any], loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def run_case(case: Dict[str, Any], repeat: int, min_sample_time: float) -> Dict[str, Any]:
+    factory = case["factory"]
+    generator = factory(case["param"]) if case["param"] is not None else factory()
+    func = next(generator)
+    try:
+        timing = measure(func, repeat=case["repeat"] or repeat, min_sample_time=min_sample_time)
+    finally:
+        generator.close()
+
+    ops = case["ops"]
+    return {
+        "name": case["name"],
+        "ops_per_call": ops,
+        "loops": timing["loops"],
+        "repeat": timing["repeat"],
+        "median_us": round(timing["median"] / ops * 1e6, 3),
+        "min_us": round(timing["min"] / ops * 1e6, 3),
+        "stdev_pct": timing["stdev_pct"],
+    }
+
+
+def make_pack(root: str, files: int, size: int = 512, binary_every: int = 0) -> str:
+    """A synthetic starter pack: ``files`` templated text files across nested folders"""
+    pack = os.path.join(root, "bench-starter-pack")
+    body = ("database: ${TD_DATABASE}\nproject: ${PROJECT_NAME}\n" + "x" * max(size - 48, 0) + "\n")
+    for i in range(files):
+        folder = os.path.join(pack, f"group_{i % 10}", f"sub_{i % 7}")
+        os.makedirs(folder, exist_ok=True)
+        if binary_every and i % binary_every == 0:
+            with open(os.path.join(folder, f"asset_{i:05d}.png"), "wb") as f:
+                f.write(b"\x89PNG\0" + os.urandom(size))
+        else:
+            with open(os.path.join(folder, f"file_{i:05d}.yml"), "w") as f:
+                f.write(body)
+    return pack
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Run the server microbenchmarks.
+
+    python tests/benchmarks/run_benchmarks.py                      # all, writes benchmark_results.json
+    python tests/benchmarks/run_benchmarks.py --filter templates   # names containing "templates"
+    python tests/benchmarks/run_benchmarks.py --baseline before.json --tolerance 0.2
+    python tests/benchmarks/run_benchmarks.py --thresholds         # also check thresholds.json
+
+Exits non-zero when a benchmark is more than --tolerance slower than a
+--baseline run from the same machine. The absolute ceilings in thresholds.json
+were measured on one machine, so they are only checked when asked for with
+--thresholds (optionally naming another file calibrated for the host).
+"""
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness
+
+THRESHOLDS_FILE = os.path.join(harness.BENCH_DIR, "thresholds.json")
+
+
+def load_benchmarks():
+    for path in sorted(glob.glob(os.path.join(harness.BENCH_DIR, "bench_*.py"))):
+        importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=harness.BENCH_DIR,
+                            capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def check(results, thresholds, baseline, tolerance):
+    failures = []
+    previous = {row["name"]: row for row in (baseline or {}).get("results", [])}
+    for row in results:
+        limit = thresholds.get(row["name"])
+        if limit is not None and row["median_us"] > limit:
+            failures.append(f"{row['name']}: {row['median_us']} us exceeds threshold {limit} us")
+        before = previous.get(row["name"])
+        if before and row["median_us"] > before["median_us"] * (1 + tolerance):
+            change = (row["median_us"] - before["median_us"]) / before["median_us"] * 100
+            failures.append(f"{row['name']}: {row['median_us']} us is {change:.0f}% slower than baseline "
+                            f"({before['median_us']} us)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server hot-path microbenchmarks")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7, help="samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per sample")
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter samples (smoke run)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against --baseline")
+    parser.add_argument("--thresholds", nargs="?", const=THRESHOLDS_FILE,
+                        help="also fail on absolute ceilings from this file (default thresholds.json)")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.repeat, args.min_time = 3, 0.02
+
+    load_benchmarks()
+    results = []
+    for case in harness.cases(args.filter):
+        row = harness.run_case(case, repeat=args.repeat, min_sample_time=args.min_time)
+        results.append(row)
+        print(f"{row['name']:<48}{row['median_us']:>14,.2f} us  (min {row['min_us']:,.2f}, "
+              f"±{row['stdev_pct']}%, {row['loops']}x{row['repeat']})", flush=True)
+
+    thresholds = {}
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = check(results, thresholds, baseline, args.tolerance)
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "git_commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+            "settings": {"repeat": args.repeat, "min_time": args.min_time, "filter": args.filter},
+            "results": results,
+            "failures": failures,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if failures:
+        print("\n❌ Performance regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("✅ No performance regressions" if baseline or thresholds else "✅ Benchmarks done (nothing to compare against)")
+
+
+if __name__ == "__main__":
+    main()
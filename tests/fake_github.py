@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GitHub REST API and git remote, for offline tests.
+
+Implements the endpoints the server calls (/user, repository create/delete,
+environments, secret public keys, secrets, variables, rulesets, contents and
+trees). Created repositories are bare git repositories under ``root``, so the
+server's ``git push`` lands somewhere real and pushed files can be inspected.
+
+Point the server at it with:
+
+    GITHUB_API_URL=<fake url>
+    GITHUB_RAW_URL=<fake url>
+    GITHUB_GIT_URL_TEMPLATE=<root>/{owner}/{repo}.git
+
+Run standalone (e.g. for load tests):
+
+    python tests/fake_github.py --port 9100 --root /tmp/fake-github --latency 0.05
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+DEFAULT_TOKEN = "ghp_fake_token"
+DEFAULT_LOGIN = "octocat"
+
+
+class FakeGitHub:
+    """In-memory GitHub state plus bare repositories on disk"""
+
+    def __init__(self, root: str, latency: float = 0.0, tokens: Optional[Dict[str, str]] = None,
+                 scopes: Optional[str] = "repo, workflow", organizations: Optional[Dict[str, str]] = None):
+        self.root = root
+        self.latency = latency
+        self.tokens = tokens or {DEFAULT_TOKEN: DEFAULT_LOGIN}  # token -> login
+        self.scopes = scopes  # None behaves like a fine-grained token
+        self.organizations = organizations or {"fake-org": "admin"}  # org -> caller's role
+        self.public_key = base64.b64encode(os.urandom(32)).decode()
+
+        self.repos: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.environments: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self.secrets: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.variables: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.rulesets: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.contents: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.requests: List[Tuple[str, str]] = []
+
+        self._failures: List[List[Any]] = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+        os.makedirs(root, exist_ok=True)
+        self.app = self._build_app()
+
+    # -- test controls ---------------------------------------------------
+
+    def fail(self, method: str, path_pattern: str, status: int = 500, times: int = 1,
+             message: str = "Injected failure"):
+        """Answer the next ``times`` matching requests with ``status``"""
+        with self._lock:
+            self._failures.append([method.upper(), re.compile(path_pattern), status, times, message])
+
+    def git_url_template(self) -> str:
+        return os.path.join(self.root, "{owner}", "{repo}.git")
+
+    def repo_path(self, owner: str, repo: str) -> str:
+        return os.path.join(self.root, owner, f"{repo}.git")
+
+    def files(self, owner: str, repo: str, ref: str = "main") -> List[str]:
+        """Paths committed to ``ref`` of a pushed repository"""
+        result = subprocess.run(["git", "ls-tree", "-r", "--name-only", ref], cwd=self.repo_path(owner, repo),
+                                capture_output=True, text=True)
+        return result.stdout.split() if result.returncode == 0 else []
+
+    def read_file(self, owner: str, repo: str, path: str, ref: str = "main") -> Optional[bytes]:
+        result = subprocess.run(["git", "show", f"{ref}:{path}"], cwd=self.repo_path(owner, repo),
+                                capture_output=True)
+        return result.stdout if result.returncode == 0 else None
+
+    def reset(self):
+        with self._lock:
+            self._failures.clear()
+            self.requests.clear()
+
+    # -- helpers ---------------------------------------------------------
+
+    def _take_failure(self, method: str, path: str) -> Optional[Tuple[int, str]]:
+        with self._lock:
+            for failure in self._failures:
+                if failure[0] == method and failure[1].search(path) and failure[3] > 0:
+                    failure[3] -= 1
+                    return failure[2], failure[4]
+        return None
+
+    def _login(self, request: Request) -> str:
+        header = request.headers.get("Authorization", "")
+        token = header.split(" ", 1)[1] if " " in header else ""
+        login = self.tokens.get(token)
+        if login is None:
+            raise HTTPException(status_code=401, detail="Bad credentials")
+        return login
+
+    def _repo(self, owner: str, repo: str) -> Dict[str, Any]:
+        data = self.repos.get((owner, repo))
+        if data is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return data
+
+    def _id(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def _repo_json(self, owner: str, name: str, description: str, private: bool) -> Dict[str, Any]:
+        return {
+            "id": self._id(),
+            "name": name,
+            "full_name": f"{owner}/{name}",
+            "owner": {"login": owner, "type": "Organization" if owner in self.organizations else "User"},
+            "private": private,
+            "description": description,
+            "html_url": f"https://github.com/{owner}/{name}",
+            "url": f"/repos/{owner}/{name}",
+            "clone_url": self.repo_path(owner, name),
+            "default_branch": "main",
+        }
+
+    def _create_repo(self, owner: str, body: Dict[str, Any]) -> JSONResponse:
+        name = body.get("name")
+        if (owner, name) in self.repos:
+            return JSONResponse(status_code=422, content={
+                "message": "Repository creation failed.",
+                "errors": [{"resource": "Repository", "field": "name", "message": "name already exists on this account"}],
+            })
+        path = self.repo_path(owner, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        subprocess.run(["git", "init", "--bare", "-q", "-b", "main", path], check=True)
+        data = self._repo_json(owner, name, body.get("description", ""), bool(body.get("private")))
+        self.repos[(owner, name)] = data
+        return JSONResponse(status_code=201, content=data)
+
+    def _git_blob(self, owner: str, repo: str, path: str) -> Optional[bytes]:
+        if path in self.contents.get((owner, repo), {}):
+            return base64.b64decode(self.contents[(owner, repo)][path])
+        return self.read_file(owner, repo, path)
+
+    # -- app -------------------------------------------------------------
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake GitHub")
+        fake = self
+
+        @app.middleware("http")
+        async def latency_and_failures(request: Request, call_next):
+            fake.requests.append((request.method, request.url.path))
+            if fake.latency:
+                await asyncio.sleep(fake.latency)
+            failure = fake._take_failure(request.method, request.url.path)
+            if failure is not None:
+                status, message = failure
+                return JSONResponse(status_code=status, content={"message": message})
+            return await call_next(request)
+
+        @app.exception_handler(HTTPException)
+        async def github_style_errors(request: Request, exc: HTTPException):
+            return JSONResponse(status_code=exc.status_code, content={"message": exc.detail})
+
+        @app.get("/user")
+        def user(request: Request):
+            login = fake._login(request)
+            headers = {"X-OAuth-Scopes": fake.scopes} if fake.scopes is not None else {}
+            return JSONResponse(headers=headers, content={
+                "login": login, "id": 1, "type": "User", "url": "/user",
+                "html_url": f"https://github.com/{login}",
+            })
+
+        @app.get("/user/repos")
+        def user_repos(request: Request):
+            login = fake._login(request)
+            return [data for (owner, _), data in fake.repos.items() if owner == login]
+
+        @app.post("/user/repos")
+        async def create_user_repo(request: Request):
+            return fake._create_repo(fake._login(request), await request.json())
+
+        @app.get("/orgs/{org}")
+        def organization(org: str, request: Request):
+            fake._login(request)
+            if org not in fake.organizations:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return {"login": org, "url": f"/orgs/{org}", "plan": {"name": "team"},
+                    "members_can_create_public_repositories": True}
+
+        @app.get("/user/memberships/orgs/{org}")
+        def membership(org: str, request: Request):
+            fake._login(request)
+            if org not in fake.organizations:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return {"state": "active", "role": fake.organizations[org], "organization": {"login": org}}
+
+        @app.get("/orgs/{org}/repos")
+        def org_repos(org: str, request: Request):
+            fake._login(request)
+            if org not in fake.organizations:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return [data for (owner, _), data in fake.repos.items() if owner == org]
+
+        @app.post("/orgs/{org}/repos")
+        async def create_org_repo(org: str, request: Request):
+            fake._login(request)
+            if org not in fake.organizations:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return fake._create_repo(org, await request.json())
+
+        @app.get("/repos/{owner}/{repo}")
+        def get_repo(owner: str, repo: str, request: Request):
+            fake._login(request)
+            return fake._repo(owner, repo)
+
+        @app.delete("/repos/{owner}/{repo}")
+        def delete_repo(owner: str, repo: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            del fake.repos[(owner, repo)]
+            subprocess.run(["rm", "-rf", fake.repo_path(owner, repo)], check=True)
+            return Response(status_code=204)
+
+        @app.put("/repos/{owner}/{repo}/environments/{env}")
+        async def put_environment(owner: str, repo: str, env: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            body = await request.json() if await request.body() else {}
+            fake.environments.setdefault((owner, repo), {})[env] = body
+            return {"name": env, "url": f"/repos/{owner}/{repo}/environments/{env}"}
+
+        @app.get("/repos/{owner}/{repo}/environments/{env}/secrets/public-key")
+        def public_key(owner: str, repo: str, env: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            return {"key_id": "fake-key-id", "key": fake.public_key}
+
+        @app.put("/repos/{owner}/{repo}/environments/{env}/secrets/{name}")
+        async def put_secret(owner: str, repo: str, env: str, name: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            body = await request.json()
+            secrets = fake.secrets.setdefault((owner, repo), {})
+            existed = f"{env}/{name}" in secrets
+            secrets[f"{env}/{name}"] = body.get("encrypted_value")
+            return Response(status_code=204 if existed else 201)
+
+        @app.patch("/repos/{owner}/{repo}/actions/variables/{name}")
+        async def patch_variable(owner: str, repo: str, name: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            variables = fake.variables.setdefault((owner, repo), {})
+            if name not in variables:
+                raise HTTPException(status_code=404, detail="Not Found")
+            variables[name] = (await request.json()).get("value")
+            return Response(status_code=204)
+
+        @app.post("/repos/{owner}/{repo}/actions/variables")
+        async def create_variable(owner: str, repo: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            body = await request.json()
+            variables = fake.variables.setdefault((owner, repo), {})
+            if body.get("name") in variables:
+                raise HTTPException(status_code=409, detail="Already exists")
+            variables[body.get("name")] = body.get("value")
+            return JSONResponse(status_code=201, content={})
+
+        @app.get("/repos/{owner}/{repo}/rulesets")
+        def list_rulesets(owner: str, repo: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            return fake.rulesets.get((owner, repo), [])
+
+        @app.post("/repos/{owner}/{repo}/rulesets")
+        async def create_ruleset(owner: str, repo: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            ruleset = dict(await request.json(), id=fake._id())
+            fake.rulesets.setdefault((owner, repo), []).append(ruleset)
+            return JSONResponse(status_code=201, content=ruleset)
+
+        @app.get("/repos/{owner}/{repo}/git/trees/{ref}")
+        def tree(owner: str, repo: str, ref: str):
+            fake._repo(owner, repo)
+            return {"sha": ref, "tree": [{"path": path, "type": "blob"} for path in fake.files(owner, repo, ref)],
+                    "truncated": False}
+
+        @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+        def get_contents(owner: str, repo: str, path: str):
+            fake._repo(owner, repo)
+            blob = fake._git_blob(owner, repo, path)
+            if blob is not None:
+                return {"type": "file", "name": os.path.basename(path), "path": path, "encoding": "base64",
+                        "content": base64.b64encode(blob).decode(), "sha": "fake"}
+            prefix = path.rstrip("/") + "/"
+            children = sorted({p[len(prefix):].split("/")[0] for p in fake.files(owner, repo) if p.startswith(prefix)})
+            if not children:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return [{"type": "file" if f"{prefix}{child}" in fake.files(owner, repo) else "dir",
+                     "name": child, "path": f"{prefix}{child}", "download_url": None} for child in children]
+
+        @app.put("/repos/{owner}/{repo}/contents/{path:path}")
+        async def put_contents(owner: str, repo: str, path: str, request: Request):
+            fake._login(request)
+            fake._repo(owner, repo)
+            body = await request.json()
+            contents = fake.contents.setdefault((owner, repo), {})
+            status = 200 if path in contents else 201
+            contents[path] = body.get("content", "")
+            return JSONResponse(status_code=status, content={"content": {"path": path, "sha": "fake"}})
+
+        return app
+
+
+class AppServer:
+    """Serve an ASGI app with uvicorn on a background thread"""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self.url = f"http://{host}:{self._socket.getsockname()[1]}"
+        self._server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._socket]}, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{type(self).__name__} did not start")
+            time.sleep(0.01)
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread (standalone use)"""
+        self._server.run(sockets=[self._socket])
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+        self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeGitHubServer(AppServer):
+    def __init__(self, fake: FakeGitHub, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(fake.app, host, port)
+        self.fake = fake
+
+    def environment(self) -> Dict[str, str]:
+        """Variables that point the server at this fake"""
+        return {
+            "GITHUB_API_URL": self.url,
+            "GITHUB_RAW_URL": self.url,
+            "GITHUB_GIT_URL_TEMPLATE": self.fake.git_url_template(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the GitHub API")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--root", default="/tmp/fake-github", help="directory for the bare repositories")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--token", default=DEFAULT_TOKEN)
+    args = parser.parse_args()
+
+    fake = FakeGitHub(args.root, latency=args.latency, tokens={args.token: DEFAULT_LOGIN})
+    server = FakeGitHubServer(fake, port=args.port)
+    for name, value in server.environment().items():
+        print(f"export {name}='{value}'")
+    print(f"Token: {args.token}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
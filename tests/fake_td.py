@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Treasure Data REST API, for offline and load tests.
+
+Serves ``/v3/database/list`` and ``/v3/table/list/{database}`` for any API
+key that doesn't start with ``bad``. Point the server at it with
+``TD_API_BASE_URL=<fake url>``.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fake_github import AppServer
+
+
+class FakeTD:
+    def __init__(self, latency: float = 0.0, databases: int = 20, tables: int = 5):
+        self.latency = latency
+        self.database_count = databases
+        self.table_count = tables
+        self.requests = 0
+        self.app = self._build_app()
+
+    def _api_key(self, request: Request) -> Optional[str]:
+        header = request.headers.get("Authorization", "")
+        return header[4:] if header.startswith("TD1 ") else None
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake TD")
+        fake = self
+
+        @app.middleware("http")
+        async def latency_and_auth(request: Request, call_next):
+            fake.requests += 1
+            if fake.latency:
+                await asyncio.sleep(fake.latency)
+            key = fake._api_key(request)
+            if not key or key.startswith("bad"):
+                return JSONResponse(status_code=401, content={"error": "Authentication failed", "message": "invalid key"})
+            return await call_next(request)
+
+        @app.get("/v3/database/list")
+        def databases():
+            return {"databases": [
+                {"name": f"db_{i:03d}", "count": i, "permission": "owner",
+                 "created_at": "2024-01-01 00:00:00 UTC", "updated_at": "2024-01-01 00:00:00 UTC"}
+                for i in range(fake.database_count)
+            ]}
+
+        @app.get("/v3/table/list/{database}")
+        def tables(database: str):
+            if not database.startswith("db_"):
+                return JSONResponse(status_code=404, content={"message": f"Database '{database}' does not exist"})
+            return {"database": database, "tables": [
+                {"name": f"table_{i}", "count": i * 100, "type": "log", "estimated_storage_size": i * 1024,
+                 "created_at": "2024-01-01 00:00:00 UTC", "updated_at": "2024-01-01 00:00:00 UTC"}
+                for i in range(fake.table_count)
+            ]}
+
+        return app
+
+
+class FakeTDServer(AppServer):
+    def __init__(self, fake: FakeTD, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(fake.app, host, port)
+        self.fake = fake
+
+    def environment(self):
+        """Variables that point the server at this fake"""
+        return {"TD_API_BASE_URL": self.url}
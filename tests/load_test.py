@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Deployment load-test harness.
+
+Fires a weighted mix of copy-package deployments (each with its own
+/copy-progress poller), /deploy/create deployments and TD /test-connection
+calls at the server for a fixed duration, then reports:
+
+- throughput (requests/s and completed deployments/s)
+- p50/p95/p99/max latency per endpoint
+- p50/p95/p99/max duration per copy-package step, as seen by the pollers
+  (resolution is the poll interval)
+- event-loop lag and outbound call totals from the server's /debug endpoints
+
+By default the server is started in a subprocess against local stand-ins for
+GitHub (tests/fake_github.py) and TD (tests/fake_td.py), so no network or
+tokens are needed. Results are written as JSON; pass a previous file with
+--compare to see the change against another commit.
+
+Examples:
+
+    python tests/load_test.py --duration 30 --concurrency 16 --output before.json
+    python tests/load_test.py --duration 30 --concurrency 16 --output after.json --compare before.json
+    python tests/load_test.py --mix copy=1,test=10 --github-latency 0.1 --td-latency 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import DEFAULT_TOKEN, FakeGitHub, FakeGitHubServer
+from fake_td import FakeTD, FakeTDServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(REPO_ROOT, "server")
+ADMIN_TOKEN = "load-test"
+DEFAULT_MIX = "copy=2,deploy=1,test=5"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1) if values else 0.0,
+    }
+
+
+class Recorder:
+    """Thread-safe latency and status samples per endpoint and per deployment step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._steps: Dict[str, List[float]] = defaultdict(list)
+        self.deployments_completed = 0
+
+    def record(self, endpoint: str, seconds: float, status: str):
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+            self._statuses[endpoint][status] += 1
+
+    def record_step(self, step: str, seconds: float):
+        with self._lock:
+            self._steps[step].append(seconds)
+
+    def deployment_completed(self):
+        with self._lock:
+            self.deployments_completed += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for endpoint, latencies in sorted(self._latencies.items()):
+                statuses = dict(self._statuses[endpoint])
+                errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+                endpoints[endpoint] = {
+                    "count": len(latencies),
+                    "errors": errors,
+                    "statuses": statuses,
+                    "rps": round(len(latencies) / elapsed, 2),
+                    **latency_summary(latencies),
+                }
+            steps = {step: {"count": len(durations), **latency_summary(durations)}
+                     for step, durations in self._steps.items()}
+            total = sum(len(latencies) for latencies in self._latencies.values())
+            return {
+                "throughput": {
+                    "requests_per_s": round(total / elapsed, 2),
+                    "deployments_per_s": round(self.deployments_completed / elapsed, 3),
+                    "deployments_completed": self.deployments_completed,
+                },
+                "endpoints": endpoints,
+                "steps": steps,
+            }
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in LoadGenerator.OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}' in --mix (choose from {', '.join(LoadGenerator.OPERATIONS)})")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class LoadGenerator:
+    OPERATIONS = ("copy", "deploy", "test")
+
+    def __init__(self, base_url: str, args, recorder: Recorder):
+        self.base_url = base_url
+        self.args = args
+        self.recorder = recorder
+        self.weights = parse_mix(args.mix)
+        self._local = threading.local()
+        self._pollers = ThreadPoolExecutor(max_workers=max(args.concurrency, 1), thread_name_prefix="poller")
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, endpoint: str, method: str, path: str, **kwargs) -> Optional[requests.Response]:
+        start = time.perf_counter()
+        try:
+            response = self._session().request(method, f"{self.base_url}{path}", timeout=self.args.timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, str(response.status_code))
+        return response
+
+    def _repo_name(self) -> str:
+        return f"load-{uuid.uuid4().hex[:12]}"
+
+    def copy(self):
+        session_id = str(uuid.uuid4())
+        done = threading.Event()
+        poller = self._pollers.submit(self._poll_progress, session_id, done)
+        response = self._request("POST /copy-package", "POST", "/api/github/copy-package", json={
+            "github_token": self.args.github_token,
+            "repo_name": self._repo_name(),
+            "package_name": "qsr-starter-pack",
+            "project_name": "load",
+            "session_id": session_id,
+            "environment_secrets": {"prod": "td-prod-key", "dev": "td-dev-key"},
+            "td_credentials": {"apiKey": "td-key", "region": "us01"},
+            "parameters": {"td_database": "load_db", "project_name": "load"},
+        })
+        done.set()
+        poller.result()
+        if response is not None and response.ok:
+            self.recorder.deployment_completed()
+
+    def _poll_progress(self, session_id: str, done: threading.Event):
+        """Poll one session until its deployment returns, timing each status it passes through"""
+        current, since = None, None
+        while True:
+            finished = done.is_set()
+            response = self._request("GET /copy-progress", "GET", f"/api/github/copy-progress/{session_id}")
+            now = time.perf_counter()
+            status = response.json().get("status") if response is not None and response.ok else None
+            if status is not None and status != current:
+                if current is not None:
+                    self.recorder.record_step(current, now - since)
+                current, since = status, now
+            if finished or status in ("completed", "error", "cancelled"):
+                return
+            done.wait(self.args.poll_interval)
+
+    def deploy(self):
+        response = self._request("POST /deploy/create", "POST", "/api/deploy/create", json={
+            "github_token": self.args.github_token,
+            "repo_name": self._repo_name(),
+            "source_package": "qsr-starter-pack",
+            "project_name": "load",
+            "create_rulesets": True,
+            "td_region": "us01",
+            "env_tokens": {"prod": "td-prod-key"},
+        })
+        if response is not None and response.ok:
+            self.recorder.deployment_completed()
+
+    def test(self):
+        # A small pool of keys, so the connection-test cache sees both hits and misses
+        key = f"td-key-{random.randrange(self.args.td_keys)}"
+        self._request("POST /test-connection", "POST", "/api/td/test-connection",
+                      json={"apiKey": key, "region": "us01"})
+
+    def _worker(self, stop_at: float, seed: int):
+        rng = random.Random(seed)
+        operations = list(self.weights)
+        weights = [self.weights[name] for name in operations]
+        while time.monotonic() < stop_at:
+            getattr(self, rng.choices(operations, weights)[0])()
+
+    def run(self, duration: float) -> float:
+        start = time.monotonic()
+        stop_at = start + duration
+        with ThreadPoolExecutor(max_workers=self.args.concurrency, thread_name_prefix="load") as pool:
+            for future in [pool.submit(self._worker, stop_at, seed) for seed in range(self.args.concurrency)]:
+                future.result()
+        self._pollers.shutdown()
+        return time.monotonic() - start
+
+
+def build_pack(root: str, files: int):
+    """A synthetic starter pack with ``files`` templated files spread over a few folders"""
+    pack = os.path.join(root, "qsr-starter-pack")
+    for i in range(files):
+        folder = os.path.join(pack, ["config", "workflows", "queries", "segments"][i % 4])
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file_{i:04d}.yml"), "w") as f:
+            f.write(f"# file {i}\ndatabase: ${{TD_DATABASE}}\nproject: ${{PROJECT_NAME}}\n" + "key: value\n" * 40)
+    workflows = os.path.join(root, ".github", "workflows")
+    os.makedirs(workflows, exist_ok=True)
+    with open(os.path.join(workflows, "deploy.yml"), "w") as f:
+        f.write("name: deploy\non: push\n")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stack(args, workdir: str):
+    """Fake GitHub and TD plus the server in a subprocess; returns (base_url, stop)"""
+    packs = os.path.join(workdir, "packs")
+    build_pack(packs, args.pack_files)
+
+    github = FakeGitHubServer(FakeGitHub(os.path.join(workdir, "github"), latency=args.github_latency)).start()
+    td = FakeTDServer(FakeTD(latency=args.td_latency)).start()
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        STARTER_PACK_DIR=packs,
+        LOG_DIR=os.path.join(workdir, "logs"),
+        LOG_LEVEL="WARNING",
+        DEBUG_ADMIN_TOKEN=ADMIN_TOKEN,
+        TD_MCP_URL="http://127.0.0.1:9",  # nothing listens there: MCP is reported down
+        GIT_TERMINAL_PROMPT="0",
+        **github.environment(),
+        **td.environment(),
+    )
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL,
+                              stderr=open(os.path.join(workdir, "server.err"), "w"))
+    base_url = f"http://127.0.0.1:{port}"
+
+    def stop():
+        server.terminate()
+        server.wait(timeout=15)
+        github.stop()
+        td.stop()
+
+    for _ in range(150):
+        try:
+            requests.get(f"{base_url}/", timeout=1)
+            return base_url, stop
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    stop()
+    raise SystemExit(f"Server did not start; see {os.path.join(workdir, 'server.err')}")
+
+
+def _debug(base_url: str, method: str, path: str) -> Optional[Dict[str, Any]]:
+    try:
+        response = requests.request(method, f"{base_url}/debug{path}", headers={"X-Admin-Token": ADMIN_TOKEN},
+                                    timeout=10)
+    except requests.exceptions.RequestException:
+        return None
+    return response.json() if response.ok else None
+
+
+def server_stats(base_url: str) -> Dict[str, Any]:
+    loop = _debug(base_url, "GET", "/loop-lag?top=5") or {}
+    outbound = _debug(base_url, "GET", "/outbound") or {}
+    return {
+        "loop_lag_ms": loop.get("lag_ms"),
+        "loop_offenders": [
+            {"route": offender["route"], "blocked_total_ms": offender["blocked_total_ms"],
+             "blocked_max_ms": offender["blocked_max_ms"]}
+            for offender in loop.get("offenders", [])
+        ],
+        "outbound_hosts": outbound.get("hosts"),
+    }
+
+
+def git_commit() -> Optional[str]:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    throughput = result["throughput"]
+    print(f"\n{result['label'] or result['git_commit']}: {result['elapsed_s']}s, "
+          f"concurrency {result['config']['concurrency']}, mix {result['config']['mix']}")
+    print(f"  {throughput['requests_per_s']} req/s, {throughput['deployments_per_s']} deployments/s "
+          f"({throughput['deployments_completed']} completed)")
+
+    def delta(section: str, name: str, field: str) -> str:
+        if not baseline or name not in baseline.get(section, {}):
+            return ""
+        before = baseline[section][name][field]
+        now = result[section][name][field]
+        return f" ({(now - before) / before * 100:+.0f}%)" if before else ""
+
+    print(f"\n  {'endpoint':<24}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in result["endpoints"].items():
+        print(f"  {name:<24}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}{delta('endpoints', name, 'p95_ms')}")
+
+    if result["steps"]:
+        print(f"\n  {'copy-package step':<24}{'count':>7}{'p50 ms':>18}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, row in result["steps"].items():
+            print(f"  {name:<24}{row['count']:>7}{row['p50_ms']:>18}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+                  f"{row['max_ms']:>10}{delta('steps', name, 'p95_ms')}")
+
+    lag = result.get("loop_lag_ms")
+    if lag:
+        print(f"\n  event-loop lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    for offender in result.get("loop_offenders", []):
+        print(f"    blocked by {offender['route']}: {offender['blocked_total_ms']} ms total, "
+              f"{offender['blocked_max_ms']} ms max")
+    if baseline:
+        before = baseline["throughput"]["requests_per_s"]
+        if before:
+            change = (throughput["requests_per_s"] - before) / before * 100
+            print(f"\n  throughput vs {baseline.get('label') or baseline.get('git_commit')}: {change:+.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test deployments against local GitHub and TD stand-ins")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="seconds between /copy-progress polls")
+    parser.add_argument("--td-keys", type=int, default=20, help="distinct TD keys used by test-connection")
+    parser.add_argument("--pack-files", type=int, default=200, help="files in the synthetic starter pack")
+    parser.add_argument("--github-latency", type=float, default=0.02, help="seconds added to each fake GitHub response")
+    parser.add_argument("--td-latency", type=float, default=0.02, help="seconds added to each fake TD response")
+    parser.add_argument("--timeout", type=float, default=300, help="client timeout per request")
+    parser.add_argument("--server", help="load an already running server instead (it must use the fakes)")
+    parser.add_argument("--github-token", default=DEFAULT_TOKEN)
+    parser.add_argument("--label", help="name for this run in the results file")
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    stop = None
+    try:
+        if args.server:
+            base_url = args.server.rstrip("/")
+        else:
+            base_url, stop = start_stack(args, workdir)
+        _debug(base_url, "DELETE", "/loop-lag")
+        _debug(base_url, "DELETE", "/outbound")
+
+        recorder = Recorder()
+        print(f"Loading {base_url} for {args.duration}s with {args.concurrency} clients ({args.mix})...")
+        elapsed = LoadGenerator(base_url, args, recorder).run(args.duration)
+
+        result = {
+            "label": args.label,
+            "git_commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: value for key, value in vars(args).items()
+                       if key not in ("github_token", "output", "compare", "label")},
+            "elapsed_s": round(elapsed, 2),
+            **recorder.summary(elapsed),
+            **server_stats(base_url),
+        }
+    finally:
+        if stop is not None:
+            stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-flight TTL cache used by the TD connection test
+"""
+
+import sys
+import asyncio
+
+# Add server to Python path
+sys.path.append('server')
+
+from services.async_cache import AsyncTTLCache
+
+
+class LoadFailed(Exception):
+    pass
+
+
+def test_concurrent_loads_are_coalesced():
+    """Identical concurrent requests should share one backend call"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "success"}
+
+    async def run():
+        cache = AsyncTTLCache(ttl=60)
+        results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+        again = await cache.get_or_load("key", loader)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"status": "success"} for result in results)
+    assert again == {"status": "success"}
+    assert cache.stats()["coalesced"] == 9
+    assert cache.stats()["hits"] == 1
+
+
+def test_negative_results_use_their_own_ttl():
+    """Cached failures are re-raised until the shorter negative TTL expires"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        raise LoadFailed("bad credentials")
+
+    async def run():
+        cache = AsyncTTLCache(ttl=60, negative_ttl=0.05,
+                              cache_exception=lambda exc: isinstance(exc, LoadFailed))
+        for _ in range(3):
+            try:
+                await cache.get_or_load("key", loader)
+            except LoadFailed:
+                pass
+        first_round = len(calls)
+        await asyncio.sleep(0.06)
+        try:
+            await cache.get_or_load("key", loader)
+        except LoadFailed:
+            pass
+        return first_round
+
+    first_round = asyncio.run(run())
+    assert first_round == 1
+    assert len(calls) == 2
+
+
+def test_uncached_exceptions_are_retried():
+    """Exceptions not accepted by cache_exception are never cached"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        raise RuntimeError("transient")
+
+    async def run():
+        cache = AsyncTTLCache(ttl=60, negative_ttl=60)
+        for _ in range(2):
+            try:
+                await cache.get_or_load("key", loader)
+            except RuntimeError:
+                pass
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_stale_entries_refresh_in_background():
+    """Past the TTL, callers get the stale value at once while one background load refreshes it"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    async def run():
+        cache = AsyncTTLCache(ttl=0.05, stale_ttl=60)
+        first = await cache.get_or_load("key", loader)
+        await asyncio.sleep(0.06)
+        stale = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+        await asyncio.sleep(0.05)
+        fresh = await cache.get_or_load("key", loader)
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(run())
+    assert first == 1
+    assert stale == [1] * 5
+    assert fresh == 2
+    assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    test_concurrent_loads_are_coalesced()
+    test_negative_results_use_their_own_ttl()
+    test_uncached_exceptions_are_retried()
+    test_stale_entries_refresh_in_background()
+    print("✅ All async cache tests passed")
@@ -6,10 +6,13 @@ Test script to validate all deployment fixes
 import sys
 import os
 import asyncio
+import tempfile
 from pathlib import Path
 
 # Add server to Python path
 sys.path.append('server')
+# Keep the server's log file out of the repository
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "va-test-logs"))
 
 async def test_github_service():
     """Test GitHubService functionality"""
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end deployment tests.
+
+Runs the real server in a subprocess against tests/fake_github.py: no token,
+network access or running server needed. Pushes land in local bare repos.
+"""
+
+import sys
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import DEFAULT_LOGIN, DEFAULT_TOKEN, FakeGitHub, FakeGitHubServer
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+
+ADMIN_TOKEN = "offline-admin"
+
+state = {}
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def setup_module(module=None):
+    workdir = tempfile.mkdtemp(prefix="offline-deploy-")
+    packs = os.path.join(workdir, "packs")
+    _write(os.path.join(packs, "qsr-starter-pack", "config", "src_params.yml"), "database: ${TD_DATABASE}\n")
+    _write(os.path.join(packs, "qsr-starter-pack", "wf02_mapping.dig"), "timezone: UTC\n+map:\n  echo>: ${session_time}\n")
+    _write(os.path.join(packs, ".github", "workflows", "deploy.yml"), "name: deploy\n")
+
+    fake = FakeGitHub(os.path.join(workdir, "github"))
+    github = FakeGitHubServer(fake).start()
+
+    port = _free_port()
+    env = dict(os.environ, STARTER_PACK_DIR=packs, LOG_DIR=os.path.join(workdir, "logs"),
+               GIT_TERMINAL_PROMPT="0", DEBUG_ADMIN_TOKEN=ADMIN_TOKEN, **github.environment())
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                              cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base_url}/", timeout=1)
+            break
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    else:
+        server.kill()
+        github.stop()
+        raise RuntimeError("Server did not start")
+
+    state.update(workdir=workdir, fake=fake, github=github, server=server, base_url=base_url)
+
+
+def teardown_module(module=None):
+    state["server"].terminate()
+    state["server"].wait(timeout=10)
+    state["github"].stop()
+    shutil.rmtree(state["workdir"], ignore_errors=True)
+
+
+def _copy_package(repo_name, **overrides):
+    payload = {
+        "github_token": DEFAULT_TOKEN,
+        "repo_name": repo_name,
+        "package_name": "qsr-starter-pack",
+        "project_name": "demo",
+        "environment_secrets": {"prod": "td-prod-key"},
+        "td_credentials": {"apiKey": "td-key", "region": "us01"},
+        "parameters": {"td_database": "analytics"},
+    }
+    payload.update(overrides)
+    return requests.post(f"{state['base_url']}/api/github/copy-package", json=payload, timeout=60)
+
+
+def test_copy_package_pushes_and_configures_repository():
+    fake = state["fake"]
+    response = _copy_package("offline-copy")
+    assert response.status_code == 200, response.text
+    assert response.json()["success"] is True
+
+    files = fake.files(DEFAULT_LOGIN, "offline-copy")
+    assert "demo/wf02_mapping.dig" in files
+    assert ".github/workflows/deploy.yml" in files
+    assert fake.read_file(DEFAULT_LOGIN, "offline-copy", "demo/config/src_params.yml") == b"database: analytics\n"
+
+    key = (DEFAULT_LOGIN, "offline-copy")
+    assert "prod/TD_API_TOKEN" in fake.secrets[key]
+    assert fake.variables[key]
+    assert fake.rulesets[key]
+
+
+def test_injected_github_failure_is_reported():
+    fake = state["fake"]
+    fake.fail("POST", r"^/user/repos$", status=503)
+    response = _copy_package("offline-unavailable")
+    assert response.status_code == 503, response.text
+
+    history_url = f"{state['base_url']}/api/github/copy-history"
+    assert requests.get(history_url, timeout=10).status_code == 401
+    session_id = None
+    for entry in requests.get(history_url, headers={"X-Admin-Token": ADMIN_TOKEN}, timeout=10).json()["sessions"]:
+        if entry["repo_name"] == "offline-unavailable":
+            session_id = entry["session_id"]
+    assert session_id is not None
+    progress = requests.get(f"{state['base_url']}/api/github/copy-progress/{session_id}", timeout=10).json()
+    assert progress["status"] == "error"
+
+
+def test_deploy_create_through_pygithub():
+    fake = state["fake"]
+    response = requests.post(f"{state['base_url']}/api/deploy/create", json={
+        "github_token": DEFAULT_TOKEN,
+        "repo_name": "offline-deploy",
+        "source_package": "qsr-starter-pack",
+        "project_name": "demo",
+        "organization": "fake-org",
+        "create_rulesets": True,
+        "td_region": "us01",
+        "env_tokens": {"prod": "td-prod-key"},
+    }, timeout=60)
+    assert response.status_code == 200, response.text
+    assert response.json()["success"] is True
+    assert "demo/config/src_params.yml" in fake.files("fake-org", "offline-deploy")
+    assert "prod/TD_API_TOKEN" in fake.secrets[("fake-org", "offline-deploy")]
+
+
+def test_invalid_token_is_rejected():
+    response = _copy_package("offline-bad-token", github_token="ghp_not_a_real_token")
+    assert response.status_code == 401
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_copy_package_pushes_and_configures_repository()
+        test_injected_github_failure_is_reported()
+        test_deploy_create_through_pygithub()
+        test_invalid_token_is_rejected()
+    finally:
+        teardown_module()
+    print("✅ All offline deployment tests passed")
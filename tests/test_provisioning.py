@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared repository provisioning engine (server/services/provisioning.py).
+
+The engine reads GITHUB_API_URL at import, so each run happens in a fresh
+interpreter pointed at tests/fake_github.py; no token or network access is needed.
+"""
+
+import sys
+import os
+import base64
+import json
+import shutil
+import subprocess
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import DEFAULT_LOGIN, DEFAULT_TOKEN, FakeGitHub, FakeGitHubServer
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+
+PROBE = """
+import asyncio, json, sys
+from services import provisioning
+kwargs = json.loads(sys.argv[1])
+print(json.dumps(asyncio.run(provisioning.provision(**kwargs))))
+"""
+
+
+def _provision(github, workdir, **kwargs):
+    kwargs = dict(token=DEFAULT_TOKEN, owner=DEFAULT_LOGIN, **kwargs)
+    # One call at a time, so injected failures land on a predictable request
+    env = dict(os.environ, LOG_DIR=os.path.join(workdir, "logs"), PROVISIONING_CONCURRENCY="1", **github.environment())
+    result = subprocess.run([sys.executable, "-c", PROBE, json.dumps(kwargs)], cwd=SERVER_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    # print() is routed through the logger, so the JSON is the tail of the last line
+    line = result.stdout.strip().splitlines()[-1]
+    return json.loads(line[line.index("{"):])
+
+
+def _fake(workdir, repo):
+    from nacl import public
+
+    fake = FakeGitHub(os.path.join(workdir, "github"))
+    fake._create_repo(DEFAULT_LOGIN, {"name": repo})
+    # A key pair we hold the private half of, so sealed secrets can be opened
+    private_key = public.PrivateKey.generate()
+    fake.public_key = base64.b64encode(bytes(private_key.public_key)).decode()
+    return fake, public.SealedBox(private_key)
+
+
+def test_provisions_rulesets_secrets_and_variables():
+    workdir = tempfile.mkdtemp(prefix="provisioning-")
+    fake, box = _fake(workdir, "provisioned")
+    github = FakeGitHubServer(fake).start()
+    try:
+        result = _provision(github, workdir, repo="provisioned", secrets={"prod": "td-prod-key", "qa": None},
+                            project_name="demo", td_region="eu01")
+
+        assert [r["status"] for r in result["rulesets"]] == ["success", "success"]
+        assert [r["name"] for r in fake.rulesets[(DEFAULT_LOGIN, "provisioned")]] == \
+            ["Enforce Branch Names", "Main Branch Protection"]
+
+        assert [r["name"] for r in result["secrets"]] == ["prod/TD_API_TOKEN"]
+        sealed = fake.secrets[(DEFAULT_LOGIN, "provisioned")]["prod/TD_API_TOKEN"]
+        assert box.decrypt(base64.b64decode(sealed)) == b"td-prod-key"
+
+        assert fake.variables[(DEFAULT_LOGIN, "provisioned")] == {
+            "TD_WF_API_ENDPOINT": "https://api-workflow.eu01.treasuredata.com", "TD_WF_PROJS": "demo"}
+    finally:
+        github.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_rejected_rulesets_and_secrets_recover():
+    workdir = tempfile.mkdtemp(prefix="provisioning-")
+    fake, box = _fake(workdir, "recovered")
+    fake.fail("POST", r"/rulesets$", status=422)
+    fake.fail("PUT", r"/secrets/TD_API_TOKEN$", status=422)
+    github = FakeGitHubServer(fake).start()
+    try:
+        result = _provision(github, workdir, repo="recovered", secrets={"dev": "td-dev-key"})
+
+        # The naming pattern was refused, so the basic protection stands in for it
+        assert [(r["name"], r["status"]) for r in result["rulesets"]] == [
+            ("Basic Branch Protection (Fallback)", "success"), ("Main Branch Protection", "success")]
+
+        # The refused secret is retried once with a freshly fetched key
+        assert result["secrets"][0]["status"] == "success", result["secrets"]
+        assert fake.requests.count(("GET", f"/repos/{DEFAULT_LOGIN}/recovered/environments/dev/secrets/public-key")) == 2
+        sealed = fake.secrets[(DEFAULT_LOGIN, "recovered")]["dev/TD_API_TOKEN"]
+        assert box.decrypt(base64.b64decode(sealed)) == b"td-dev-key"
+
+        assert result["variables"] == []
+    finally:
+        github.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_provisions_rulesets_secrets_and_variables()
+    test_rejected_rulesets_and_secrets_recover()
+    print("✅ All provisioning tests passed")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for deployment deadlines and per-host circuit breakers
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import tempfile
+import time
+
+import requests
+
+# Add server to Python path
+sys.path.append('server')
+# Keep the server's log file out of the repository
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "va-test-logs"))
+
+from services.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, breakers, call_timeout, deadline, remaining
+)
+from observability import outbound
+
+
+def test_deadline_caps_call_timeouts():
+    assert call_timeout(30) == 30
+    assert remaining() is None
+
+    with deadline(5):
+        assert call_timeout(30) <= 5
+        assert call_timeout(2) == 2
+        connect, read = call_timeout((3.05, 15))
+        assert connect == 3.05 and read <= 5
+        with deadline(60):
+            # Nested deadlines can only shorten the budget
+            assert remaining() <= 5
+
+    with deadline(0):
+        try:
+            call_timeout(10)
+            assert False, "expected DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+
+
+def test_deadline_follows_work_into_threads():
+    async def main():
+        with deadline(5):
+            return await asyncio.to_thread(remaining)
+
+    left = asyncio.run(main())
+    assert left is not None and 0 < left <= 5
+
+
+def test_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker("example", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.is_open()
+    try:
+        breaker.before_call()
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+
+    time.sleep(0.06)
+    breaker.before_call()  # trial call
+    breaker.record_failure()
+    assert breaker.is_open()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats() == {"state": "closed", "failures": 0, "rejected": 1}
+
+
+def test_half_open_trial_is_never_stranded():
+    outbound.install()
+    breakers.reset()
+    breaker = breakers.get("127.0.0.1:9")
+    breaker.reset_timeout = 0.05
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    time.sleep(0.06)
+
+    # A spent deadline fails the call before it can take the trial
+    with deadline(0):
+        try:
+            requests.get("http://127.0.0.1:9/", timeout=1)
+            assert False, "expected DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+    assert breaker.stats()["state"] == "open"
+
+    # A trial that ends without a verdict hands it to the next call
+    breaker.before_call()
+    breaker.release_trial()
+    breaker.before_call()
+    assert breaker.stats()["state"] == "half_open"
+
+    # ...as does one that never reports back
+    time.sleep(0.06)
+    breaker.before_call()
+
+    # Resetting the registry closes the breakers callers already hold
+    breaker.record_failure()
+    breakers.reset()
+    assert breakers.get("127.0.0.1:9") is breaker
+    assert breaker.stats() == {"state": "closed", "failures": 0, "rejected": 0}
+
+
+def test_outbound_hook_fails_fast_for_a_down_host():
+    outbound.install()
+    breakers.reset()
+    # A port nobody listens on: connection refused
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}/"
+
+    breaker = breakers.get(f"127.0.0.1:{port}")
+    for _ in range(breaker.failure_threshold):
+        try:
+            requests.get(url, timeout=1)
+        except requests.exceptions.ConnectionError as e:
+            assert not isinstance(e, CircuitOpenError)
+
+    try:
+        requests.get(url, timeout=1)
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+    assert breaker.stats()["rejected"] == 1
+    breakers.reset()
+
+
+if __name__ == "__main__":
+    test_deadline_caps_call_timeouts()
+    test_deadline_follows_work_into_threads()
+    test_breaker_opens_and_half_opens()
+    test_half_open_trial_is_never_stranded()
+    test_outbound_hook_fails_fast_for_a_down_host()
+    print("✅ All resilience tests passed")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for the preforking production launcher (server/serve.py).
+
+Each test runs serve.py in a subprocess with two workers; the drain test
+deploys to tests/fake_github.py, so no token or network access is needed.
+"""
+
+import sys
+import os
+import gzip
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import DEFAULT_TOKEN, FakeGitHub, FakeGitHubServer
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _accepting(port):
+    # A plain socket rather than requests: another test module may have installed the
+    # outbound hook in this process, whose circuit breaker trips on refused connections
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _start(workdir, **env):
+    port = _free_port()
+    env = dict(os.environ, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY="2",
+               LOG_DIR=os.path.join(workdir, "logs"), STATE_DB_PATH=os.path.join(workdir, "state.db"),
+               STARTER_PACK_DIR=os.path.join(workdir, "packs"), GIT_TERMINAL_PROMPT="0", **env)
+    server = subprocess.Popen([sys.executable, "serve.py"], cwd=SERVER_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        if _accepting(port):
+            break
+        time.sleep(0.1)
+    else:
+        server.kill()
+        raise RuntimeError("serve.py did not start")
+    # The socket is bound before the app loads; the first answer means workers are serving
+    base_url = f"http://127.0.0.1:{port}"
+    requests.get(f"{base_url}/", timeout=30)
+    return server, base_url, port
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return f.read().split()
+
+
+def test_forks_workers_and_stops_on_sigterm():
+    workdir = tempfile.mkdtemp(prefix="serve-")
+    _write(os.path.join(workdir, "packs", "qsr-starter-pack", "config", "src_params.yml"), "database: ${TD_DATABASE}\n")
+    server, base_url, _ = _start(workdir)
+    try:
+        if os.path.exists(f"/proc/{server.pid}/task"):
+            assert len(_children(server.pid)) == 2
+
+        response = requests.get(f"{base_url}/api/deploy/packages", timeout=5)
+        assert response.json() == {"packages": [{"id": "qsr-starter-pack", "name": "Qsr Starter Pack"}]}
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_sigterm_lets_inflight_deployment_finish():
+    workdir = tempfile.mkdtemp(prefix="serve-")
+    _write(os.path.join(workdir, "packs", "qsr-starter-pack", "config", "src_params.yml"), "database: ${TD_DATABASE}\n")
+    # Every fake GitHub call is slow, so the deployment is still running when SIGTERM arrives
+    github = FakeGitHubServer(FakeGitHub(os.path.join(workdir, "github"), latency=0.5)).start()
+    server, base_url, port = _start(workdir, **github.environment())
+    result = {}
+
+    def deploy():
+        result["response"] = requests.post(f"{base_url}/api/github/copy-package", timeout=60, json={
+            "github_token": DEFAULT_TOKEN, "repo_name": "drained", "package_name": "qsr-starter-pack",
+            "project_name": "demo", "environment_secrets": {"prod": "td-prod-key"},
+            "td_credentials": {"apiKey": "td-key", "region": "us01"}, "parameters": {"td_database": "analytics"},
+        })
+
+    try:
+        request = threading.Thread(target=deploy)
+        request.start()
+        time.sleep(1.5)
+        server.send_signal(signal.SIGTERM)
+        time.sleep(0.5)
+
+        assert not _accepting(port), "a draining server should refuse new connections"
+
+        request.join(timeout=60)
+        assert result["response"].status_code == 200, result["response"].text
+        assert result["response"].json()["success"] is True
+        assert server.wait(timeout=15) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+        github.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_workers_share_one_rotating_log():
+    workdir = tempfile.mkdtemp(prefix="serve-")
+    # Rotating every few KB; compressing a rotated file is where a second writer's lines got lost
+    server, base_url, _ = _start(workdir, LOG_MAX_BYTES="4096", LOG_BACKUP_COUNT="100", LOG_COMPRESS="1")
+    try:
+        # A connection per request, from several threads, so both workers log and rotate
+        def hit(numbers):
+            for n in numbers:
+                requests.get(f"{base_url}/?marker={n}", timeout=5)
+
+        clients = [threading.Thread(target=hit, args=(range(i, 200, 4),)) for i in range(4)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+
+        log_dir = os.path.join(workdir, "logs")
+        text = ""
+        time.sleep(0.5)  # the last rotation compresses on a background thread
+        for name in os.listdir(log_dir):
+            opener = gzip.open if name.endswith(".gz") else open
+            with opener(os.path.join(log_dir, name), "rt", encoding="utf-8") as f:
+                text += f.read()
+        assert len(os.listdir(log_dir)) > 2, "expected the log to rotate"
+        missing = [n for n in range(200) if f"marker={n} " not in text]
+        assert not missing, f"access log lines lost across rotation: {missing[:10]}"
+    finally:
+        if server.poll() is None:
+            server.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_forks_workers_and_stops_on_sigterm()
+    test_sigterm_lets_inflight_deployment_finish()
+    test_workers_share_one_rotating_log()
+    print("✅ All serve tests passed")
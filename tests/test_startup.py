@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget tests.
+
+Each test starts a fresh interpreter so nothing is already imported. Budgets
+are generous for CI machines and can be tightened per environment:
+
+    STARTUP_IMPORT_BUDGET_SECONDS=1.5 STARTUP_FIRST_REQUEST_BUDGET_SECONDS=3 python tests/test_startup.py
+"""
+
+import sys
+import os
+import json
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+
+IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "3"))
+FIRST_REQUEST_BUDGET = float(os.getenv("STARTUP_FIRST_REQUEST_BUDGET_SECONDS", "6"))
+
+IMPORT_PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "github_loaded": "github" in sys.modules,
+    "nacl_loaded": "nacl" in sys.modules,
+    "log_dir_created": os.path.exists(os.environ["LOG_DIR"]),
+    "report": main.startup.report(),
+}))
+"""
+
+
+def _get(url, headers=None):
+    # urllib rather than requests: another test module may have installed the outbound
+    # hook in this process, whose circuit breaker would trip while the port is still closed
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}), timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_import_stays_within_budget_and_defers_heavy_dependencies():
+    workdir = tempfile.mkdtemp(prefix="startup-")
+    try:
+        env = dict(os.environ, LOG_DIR=os.path.join(workdir, "logs"))
+        result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=SERVER_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        # print() is routed through the logger, so the JSON is the tail of the last line
+        line = result.stdout.strip().splitlines()[-1]
+        probe = json.loads(line[line.index("{"):])
+
+        assert not probe["github_loaded"], "PyGithub should load on the first deployment, not at import"
+        assert not probe["nacl_loaded"], "nacl should load on the first secret, not at import"
+        assert not probe["log_dir_created"], "the log directory should appear with the first record"
+        assert "fastapi" in probe["report"]["phases_ms"]
+        assert probe["seconds"] < IMPORT_BUDGET, \
+            f"importing main took {probe['seconds']:.2f}s (budget {IMPORT_BUDGET}s): {probe['report']['phases_ms']}"
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_first_request_within_budget():
+    workdir = tempfile.mkdtemp(prefix="startup-")
+    port = _free_port()
+    env = dict(os.environ, LOG_DIR=os.path.join(workdir, "logs"), DEBUG_ADMIN_TOKEN="startup-test")
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                              cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        elapsed = None
+        while time.perf_counter() - started < 30:
+            try:
+                if _get(f"{base_url}/")[0] == 200:
+                    elapsed = time.perf_counter() - started
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        assert elapsed is not None, "server did not answer within 30s"
+
+        _, report = _get(f"{base_url}/debug/startup", headers={"X-Admin-Token": "startup-test"})
+        assert report["first_request_path"] == "/"
+        assert report["ready_ms"] is not None and report["first_request_ms"] >= report["ready_ms"]
+        assert report["lazy_modules_loaded"] == {"github": False, "nacl": False}
+        assert elapsed < FIRST_REQUEST_BUDGET, \
+            f"first request answered after {elapsed:.2f}s (budget {FIRST_REQUEST_BUDGET}s): {report}"
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_import_stays_within_budget_and_defers_heavy_dependencies()
+    test_first_request_within_budget()
+    print("✅ All startup tests passed")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the deployment state store backends
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+
+# Add server to Python path
+sys.path.append('server')
+# Keep the server's log file out of the repository
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "va-test-logs"))
+
+from services.github_http import redact_credentials
+from services.state_store import MemoryStateStore, SQLiteStateStore, StateStore
+
+
+def exercise_store(store):
+    store.create("s1", "copy-package", {"status": "starting", "files_created": 0, "errors": []})
+    store.create("s2", "deploy", {"status": "running"})
+
+    progress = store.update("s1", status="pushing", files_created=12)
+    assert progress["status"] == "pushing"
+    assert progress["files_created"] == 12
+    store.append("s1", "errors", "Fatal error: boom")
+    store.update("s1", status="error")
+
+    assert store.get("s1") == {"status": "error", "files_created": 12, "errors": ["Fatal error: boom"]}
+    assert store.get("missing") is None
+    assert store.update("missing", status="x") is None
+
+    assert [entry["session_id"] for entry in store.history()] == ["s1", "s2"]
+    assert [entry["session_id"] for entry in store.history(kind="deploy")] == ["s2"]
+    assert [entry["session_id"] for entry in store.history(status="error")] == ["s1"]
+
+    store.delete("s2")
+    assert store.get("s2") is None
+
+
+def test_memory_store():
+    exercise_store(MemoryStateStore())
+
+
+def test_sqlite_store():
+    with tempfile.TemporaryDirectory() as directory:
+        exercise_store(SQLiteStateStore(os.path.join(directory, "state.db")))
+
+
+def test_sqlite_store_is_shared_between_instances():
+    """Two stores on one file stand in for two uvicorn workers"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.db")
+        writer, reader = SQLiteStateStore(path), SQLiteStateStore(path)
+        writer.create("session", "copy-package", {"status": "starting", "errors": []})
+
+        def add_errors(store, prefix):
+            for i in range(25):
+                store.append("session", "errors", f"{prefix}{i}")
+
+        threads = [threading.Thread(target=add_errors, args=(store, prefix))
+                   for store, prefix in ((writer, "w"), (reader, "r"))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        progress = reader.get("session")
+        assert progress["status"] == "starting"
+        assert len(progress["errors"]) == 50  # no lost updates
+
+
+def test_async_variants():
+    async def exercise(store):
+        await store.acreate("s1", "deploy", {"status": "running", "errors": []})
+        await store.aappend("s1", "errors", "boom")
+        assert (await store.aupdate("s1", status="error"))["errors"] == ["boom"]
+        assert (await store.aget("s1"))["status"] == "error"
+        assert [entry["session_id"] for entry in await store.ahistory(status="error")] == ["s1"]
+
+    asyncio.run(exercise(MemoryStateStore()))
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(exercise(SQLiteStateStore(os.path.join(directory, "state.db"))))
+
+    try:
+        StateStore()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("StateStore is abstract")
+
+
+def test_stored_errors_can_be_redacted():
+    token = "ghp_" + "a" * 36
+    error = (f"Fatal error: Command '['git', 'remote', 'add', 'origin', "
+             f"'https://{token}@github.com/me/repo.git']' returned non-zero exit status 3.")
+    redacted = redact_credentials(error, token)
+    assert token not in redacted
+    assert "https://***@github.com/me/repo.git" in redacted
+    # Tokens we weren't told about are still caught by their format
+    assert redact_credentials(f"bad credentials for {token}") == "bad credentials for ***"
+
+
+if __name__ == "__main__":
+    test_memory_store()
+    test_sqlite_store()
+    test_sqlite_store_is_shared_between_instances()
+    test_async_variants()
+    test_stored_errors_can_be_redacted()
+    print("✅ All state store tests passed")
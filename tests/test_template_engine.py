@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled ${VAR} template renderer
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# Add server to Python path
+sys.path.append('server')
+
+from services.template_engine import (
+    CompiledTemplate, RenderingCopier, precompile_tree, render_files, template_values
+)
+from services import template_engine
+from services.deployment_service import DeploymentService
+
+
+def test_single_pass_render_leaves_unknown_placeholders():
+    """Known names are substituted once; digdag variables and unknown names survive"""
+    template = CompiledTemplate("db: ${TD_DATABASE}\ntime: ${session_time}\nx: ${td.database}\n")
+    rendered = template.render({"TD_DATABASE": "${ENVIRONMENT}", "ENVIRONMENT": "prod"})
+    assert rendered == "db: ${ENVIRONMENT}\ntime: ${session_time}\nx: ${td.database}\n"
+
+
+def test_keys_with_dots_and_dashes_are_rendered():
+    values = template_values({"td.database": "analytics", "table-prefix": "raw_"})
+    rendered = CompiledTemplate("db: ${TD.DATABASE}\nprefix: ${TABLE-PREFIX}\nx: ${td.database}\n").render(values)
+    assert rendered == "db: analytics\nprefix: raw_\nx: ${td.database}\n"
+
+
+def test_config_templates_match_previous_behaviour():
+    """Upper-cased parameter names, email lists rendered as YAML items"""
+    service = DeploymentService()
+    processed = service._process_config_templates(
+        {"config.yml": "project: ${PROJECT_NAME}\nnotify:\n${EMAIL_IDS}\n"},
+        {"project_name": "demo", "email_ids": ["a@x.com", "b@x.com"]},
+    )
+    assert processed["config.yml"] == "project: demo\nnotify:\n  - a@x.com\n  - b@x.com\n"
+
+
+def test_rendered_packs_are_cached_by_pack_and_params():
+    files = {"a.yml": "name: ${NAME}"}
+    first = render_files(files, {"NAME": "one"}, pack_hash="pack-v1")
+    # Same pack hash and parameters: served from cache even if the caller's dict differs
+    cached = render_files({"a.yml": "changed ${NAME}"}, {"NAME": "one"}, pack_hash="pack-v1")
+    other = render_files(files, {"NAME": "two"}, pack_hash="pack-v1")
+    assert first == cached == {"a.yml": "name: one"}
+    assert other == {"a.yml": "name: two"}
+
+
+def test_rendering_copier_renders_text_and_copies_binary():
+    source = tempfile.mkdtemp()
+    dest = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(source, "config"))
+        with open(os.path.join(source, "config", "src.yml"), "w") as f:
+            f.write("database: ${TD_DATABASE}\n")
+        binary = b"\x89PNG\0${TD_DATABASE}"
+        with open(os.path.join(source, "logo.png"), "wb") as f:
+            f.write(binary)
+
+        copier = RenderingCopier(template_values({"td_database": "analytics"}))
+        shutil.copytree(source, dest, dirs_exist_ok=True, copy_function=copier)
+
+        with open(os.path.join(dest, "config", "src.yml")) as f:
+            assert f.read() == "database: analytics\n"
+        with open(os.path.join(dest, "logo.png"), "rb") as f:
+            assert f.read() == binary
+        assert copier.rendered == 1
+    finally:
+        shutil.rmtree(source)
+        shutil.rmtree(dest)
+
+
+def test_precompile_tree_warms_what_the_copier_looks_up():
+    """Only UTF-8 text with placeholders is compiled, under the copier's content-hash key"""
+    source = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(source, "config"))
+        os.makedirs(os.path.join(source, ".git"))
+        with open(os.path.join(source, "config", "src_params.yml"), "w") as f:
+            f.write("database: ${TD_DATABASE}\n")
+        with open(os.path.join(source, "plain.txt"), "w") as f:
+            f.write("no placeholders\n")
+        with open(os.path.join(source, "logo.png"), "wb") as f:
+            f.write(b"\x89PNG\0${TD_DATABASE}")
+        with open(os.path.join(source, ".git", "HEAD"), "w") as f:
+            f.write("${IGNORED}\n")
+
+        template_engine._compiled.clear()
+        assert precompile_tree(source) == 1
+        key = template_engine._digest(b"database: ${TD_DATABASE}\n")
+        assert template_engine._compiled.get(key).names == ("TD_DATABASE",)
+    finally:
+        shutil.rmtree(source)
+
+
+if __name__ == "__main__":
+    test_single_pass_render_leaves_unknown_placeholders()
+    test_keys_with_dots_and_dashes_are_rendered()
+    test_config_templates_match_previous_behaviour()
+    test_rendered_packs_are_cached_by_pack_and_params()
+    test_rendering_copier_renders_text_and_copies_binary()
+    test_precompile_tree_warms_what_the_copier_looks_up()
+    print("✅ All template engine tests passed")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for dependency-aware workflow scheduling in DeploymentService
+"""
+
+import sys
+import asyncio
+import time
+
+# Add server to Python path
+sys.path.append('server')
+
+from services.deployment_service import DeploymentService, build_workflow_graph
+
+
+def workflow(name, content=""):
+    return {"name": name, "path": f"qsr-starter-pack/{name}", "content": content}
+
+
+class FakeTDService:
+    """Records execution order; workflows named in ``failing`` return an error"""
+
+    def __init__(self, delay=0.05, failing=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    async def execute_workflow(self, credentials, workflow_content, workflow_name, database=None):
+        self.started.append(workflow_name)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        if workflow_name in self.failing:
+            return {"status": "error", "message": "boom"}
+        return {"status": "success", "workflow_id": workflow_name}
+
+
+class Config:
+    parameters = {"region": "us01", "database": "demo"}
+
+
+def run_workflows(workflows, td_service, max_parallel=4):
+    service = DeploymentService()
+    service.td_service = td_service
+
+    async def collect():
+        return [result async for result in service.stream_workflow_results(workflows, Config(), "dep-1", max_parallel)]
+
+    return asyncio.run(collect())
+
+
+def test_numeric_prefix_fallback_builds_chain_with_parallel_siblings():
+    """Without explicit references, wfNN waits for every wf with the previous number"""
+    graph = build_workflow_graph([
+        workflow("wf02_mapping.dig"),
+        workflow("wf03_validate.dig"),
+        workflow("wf04_stage_a.dig"),
+        workflow("wf04_stage_b.dig"),
+        workflow("wf05_unify.dig"),
+        workflow("wf_utils.dig"),
+    ])
+    assert graph["wf02_mapping"] == set()
+    assert graph["wf03_validate"] == {"wf02_mapping"}
+    assert graph["wf04_stage_a"] == {"wf03_validate"}
+    assert graph["wf04_stage_b"] == {"wf03_validate"}
+    assert graph["wf05_unify"] == {"wf04_stage_a", "wf04_stage_b"}
+    assert graph["wf_utils"] == set()
+
+
+def test_explicit_references_define_graph():
+    """require>/call> references override the numeric ordering"""
+    graph = build_workflow_graph([
+        workflow("wf02_mapping.dig"),
+        workflow("wf03_validate.dig", "+wait:\n  require>: wf02_mapping\n"),
+        workflow("wf04_report.dig"),
+        workflow("wf05_segment.dig", "+run:\n  call>: wf03_validate.dig\n+ext:\n  require>: other_project\n"),
+    ])
+    assert graph == {
+        "wf02_mapping": set(),
+        "wf03_validate": {"wf02_mapping"},
+        "wf04_report": set(),
+        "wf05_segment": {"wf03_validate"},
+    }
+
+
+def test_independent_workflows_run_in_parallel():
+    """Siblings run concurrently, bounded by max_parallel, with no artificial delay"""
+    td = FakeTDService(delay=0.1)
+    workflows = [workflow("wf01_base.dig")] + [workflow(f"wf02_part{i}.dig") for i in range(4)]
+    start = time.perf_counter()
+    results = run_workflows(workflows, td, max_parallel=2)
+    elapsed = time.perf_counter() - start
+
+    assert [r["status"] for r in results] == ["success"] * 5
+    assert td.started[0] == "wf01_base.dig"
+    assert td.max_running == 2
+    assert elapsed < 0.5  # 3 rounds of 0.1s, not 5 sequential runs plus sleeps
+
+
+def test_failure_skips_only_downstream_workflows():
+    """A failed workflow skips its dependents; other branches still complete"""
+    td = FakeTDService(failing={"wf03_validate.dig"})
+    workflows = [
+        workflow("wf02_mapping.dig"),
+        workflow("wf03_validate.dig", "+w:\n  require>: wf02_mapping\n"),
+        workflow("wf04_unify.dig", "+w:\n  require>: wf03_validate\n"),
+        workflow("wf05_segment.dig", "+w:\n  require>: wf04_unify\n"),
+        workflow("wf06_report.dig", "+w:\n  require>: wf02_mapping\n"),
+    ]
+    results = {r["workflow"]: r["status"] for r in run_workflows(workflows, td)}
+
+    assert results == {
+        "wf02_mapping.dig": "success",
+        "wf03_validate.dig": "error",
+        "wf04_unify.dig": "skipped",
+        "wf05_segment.dig": "skipped",
+        "wf06_report.dig": "success",
+    }
+    assert "wf04_unify.dig" not in td.started
+
+
+if __name__ == "__main__":
+    test_numeric_prefix_fallback_builds_chain_with_parallel_siblings()
+    test_explicit_references_define_graph()
+    test_independent_workflows_run_in_parallel()
+    test_failure_skips_only_downstream_workflows()
+    print("✅ All workflow scheduling tests passed")